@@ -0,0 +1,81 @@
+import tracemalloc
+
+import numpy as np
+
+from src.petrophysics import pad_layers, porosity_to_permeability
+
+
+def concatenated_fields(layer_poro, nx, ny, overburden):
+    """The fields as the drivers and Model built them, one array per layer which are concatenated twice"""
+    # the driver keeps its fields while the model is constructed
+    poros = np.concatenate([np.ones(nx * ny) * p for p in layer_poro], axis=0)
+    perms = porosity_to_permeability(poros)
+    burden = np.ones(nx * ny * overburden) * 1e-5
+    perm = np.concatenate([burden, perms, burden])
+    poro = np.concatenate([burden, poros, burden])
+    permz = 0.1 * perm
+    return poros, perms, poro, perm, permz
+
+
+def layered_fields(layer_poro, nx, ny, overburden):
+    """The fields given per layer and spread over the cells while they are copied into the padded model arrays"""
+    layer_perm = porosity_to_permeability(layer_poro)
+    perm = pad_layers(layer_perm, nx * ny, overburden, overburden, 1e-5, n_layers=len(layer_poro))
+    poro = pad_layers(layer_poro, nx * ny, overburden, overburden, 1e-5, n_layers=len(layer_poro))
+    permz = 0.1 * perm
+    return poro, perm, permz
+
+
+def heterogeneous_fields(poros, overburden, nx, ny, dtype):
+    """Full heterogeneous fields staged in the given type and copied once into the padded model arrays"""
+    poros = poros.astype(dtype)
+    perms = porosity_to_permeability(poros, dtype=dtype)
+    perm = pad_layers(perms, nx * ny, overburden, overburden, 1e-5)
+    poro = pad_layers(poros, nx * ny, overburden, overburden, 1e-5)
+    permz = 0.1 * perm
+    return poros, perms, poro, perm, permz
+
+
+def peak_memory(build):
+    """The peak memory in bytes which is allocated while the fields are built"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run_benchmark(nx=450, ny=320, nz=100, overburden=10):
+    """Report the peak memory of building the porosity, permeability and vertical permeability of a model
+
+    Every variant allocates permz = 0.1 * perm like Model does, StructReservoir takes the vertical permeability as a
+    field of its own, so three fields are the least any variant can reach.
+
+    :param nx: the number of the grid in x direction
+    :param ny: the number of the grid in y direction
+    :param nz: the number of the grid in z direction of the reservoir
+    :param overburden: the number of overburden layers, the model adds as many underburden layers
+    :return:
+        the peak memory in bytes of each variant
+    """
+    rng = np.random.default_rng(1234)
+    layer_poro = rng.uniform(0.05, 0.3, nz)
+    n_cells = nx * ny * (nz + 2 * overburden)
+    variants = {'layered concatenated': lambda: concatenated_fields(layer_poro, nx, ny, overburden),
+                'layered per layer': lambda: layered_fields(layer_poro, nx, ny, overburden)}
+    peaks = {name: peak_memory(variant) for name, variant in variants.items()}
+    # the heterogeneous porosity is read before, its memory is not counted
+    poros = rng.uniform(0.05, 0.3, nx * ny * nz)
+    for dtype in (np.float64, np.float32):
+        peaks[f'heterogeneous {np.dtype(dtype).name} staging'] = peak_memory(
+            lambda: heterogeneous_fields(poros, overburden, nx, ny, dtype))
+    print(f'{n_cells / 1e6:.1f} million cells, one float64 field is {n_cells * 8 / 2 ** 20:.0f} MiB')
+    for name, peak in peaks.items():
+        print(f'{name:>32}: peak {peak / 2 ** 20:8.0f} MiB, {peak / (n_cells * 8):4.1f} float64 fields')
+
+    return peaks
+
+
+if __name__ == '__main__':
+    run_benchmark()
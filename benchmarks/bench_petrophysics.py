@@ -0,0 +1,43 @@
+import timeit
+
+import numpy as np
+
+from src.petrophysics import porosity_to_permeability
+
+
+def list_comprehension_permeability(poro):
+    """The porosity to permeability transform as it was done per element in the pickle readers"""
+    f = [110.744 * (p ** 3) - 171.8268 * (p ** 2) + 92.9227 * p - 2.047 for p in poro.flatten()]
+    org_perm = [np.exp(x) for x in f]
+    return np.reshape(org_perm, poro.shape)
+
+
+def in_place_permeability(poro):
+    """The transform written over a copy of the porosity, the copy stands for a field which is not needed anymore"""
+    poro = poro.copy()
+    return porosity_to_permeability(poro, out=poro)
+
+
+def run_benchmark(n=900, repeat=3):
+    """Time the porosity to permeability transform of one kriged n x n layer
+
+    :param n: the number of the grid in x and y direction of the layer
+    :param repeat: the number of repetitions, the fastest one is reported
+    :return:
+        the time in seconds of each variant
+    """
+    poro = np.random.default_rng(1234).uniform(0.01, 0.4, (n, n))
+    variants = {'list comprehension': lambda: list_comprehension_permeability(poro),
+                'vectorized': lambda: porosity_to_permeability(poro),
+                'vectorized float32': lambda: porosity_to_permeability(poro, dtype=np.float32),
+                'vectorized in place': lambda: in_place_permeability(poro)}
+    times = {name: min(timeit.repeat(variant, number=1, repeat=repeat)) for name, variant in variants.items()}
+    for name, seconds in times.items():
+        print(f'{name:>22}: {seconds * 1e3:9.2f} ms per layer, '
+              f'speedup {times["list comprehension"] / seconds:7.1f}x')
+
+    return times
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from benchmarks.synthetic import porosity_samples, write_las, write_porosity_layers
+from src.math_rel import apply_kriging, arithmetic_average, harmonic_average, simulate_layers
+from src.read_files import from_las_to_poro_gamma, read_las, read_pickle_file, read_pickle_file_upscaling_z
+
+try:
+    from src.model import Model
+except ImportError:
+    # darts is not installed, the model construction is not measured
+    Model = None
+
+# the model grids (nx, ny, nz) from the default resolution up to the finest one of the studies
+MODEL_GRIDS = [(225, 53, 10), (450, 160, 40)]
+# a benchmark is a regression when it is this much slower than the baseline
+DEFAULT_THRESHOLD = 1.2
+
+
+def construct_model(nx, ny, nz):
+    """Construct a homogeneous model of the size of the reservoir, without running it"""
+    return Model(total_time=10000, set_nx=nx, set_ny=ny, set_nz=nz, set_dx=4500 / nx, set_dy=4000 / ny,
+                 set_dz=100 / nz, perms=np.ones(nx * ny * nz) * 3000, poro=np.ones(nx * ny * nz) * 0.2,
+                 report_time_step=100, overburden=0)
+
+
+def benchmark_cases(data_dir, quick=False):
+    """Write the synthetic data and make the benchmarks of the property pipeline and the model setup
+
+    :param data_dir: the directory the synthetic data is written to
+    :param quick: use small sizes, e.g. to check that the suite runs
+    :return:
+        the function to time of each benchmark by name
+    """
+    n_rows = 20000 if quick else 500000
+    n = 150 if quick else 900
+    grids = [(45, 11, 2), (90, 32, 8)] if quick else MODEL_GRIDS
+    las = write_las(os.path.join(data_dir, 'well.las'), n_rows)
+    las_cache = os.path.join(data_dir, 'LasCache')
+    pickles = write_porosity_layers(os.path.join(data_dir, 'Porosity'), 10, n=n)
+    poro = porosity_samples(7)
+    log = np.random.default_rng(1234).uniform(0.01, 0.4, n_rows)
+
+    cases = {f'read_las[{n_rows} rows]': lambda: read_las(las),
+             f'read_las cached window[{n_rows} rows]': lambda: read_las(las, depth_range=(2000, 2100),
+                                                                          cache_dir=las_cache),
+             f'from_las_to_poro_gamma[{n_rows} rows]': lambda: from_las_to_poro_gamma(las, 10),
+             f'arithmetic_average[{n_rows} to 40]': lambda: arithmetic_average(log, 40),
+             f'harmonic_average[{n_rows} to 40]': lambda: harmonic_average(log, 40),
+             f'apply_kriging[{n}x{n}]': lambda: apply_kriging(n, n, 7, poro),
+             f'simulate_layers[{n}x{n}]': lambda: simulate_layers(n, n, [poro], seed=1),
+             f'simulate_layers[10x{n}x{n}]': lambda: simulate_layers(n, n, [poro] * 10, seed=1)}
+    nx, ny, nz = grids[0]
+    cases[f'apply_kriging[{n}x{n} to {nx}x{ny}]'] = lambda: apply_kriging(n, n, 7, poro, target_shape=(ny, nx))
+    cases[f'read_pickle_file[10x{n}x{n} to {nx}x{ny}]'] = lambda: read_pickle_file(ny, nx, pickles)
+    for nx, ny, nz in grids:
+        cases[f'read_pickle_file_upscaling_z[10x{n}x{n} to {nx}x{ny}x{nz}]'] = (
+            lambda nx=nx, ny=ny, nz=nz: read_pickle_file_upscaling_z(ny, nx, nz, pickles))
+        if Model is not None:
+            cases[f'Model construction[{nx}x{ny}x{nz}]'] = lambda nx=nx, ny=ny, nz=nz: construct_model(nx, ny, nz)
+    # the first read converts the log, the benchmark measures the reads from the cache
+    read_las(las, cache_dir=las_cache)
+
+    return cases
+
+
+def run_suite(quick=False, repeat=3, only=None):
+    """Time every benchmark of the suite
+
+    :param quick: use small sizes, e.g. to check that the suite runs
+    :param repeat: the number of repetitions of each benchmark
+    :param only: optional text, only the benchmarks whose name contains it are run
+    :return:
+        the fastest and the median time in seconds of each benchmark by name
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        for name, case in benchmark_cases(data_dir, quick=quick).items():
+            if only is not None and only not in name:
+                continue
+            times = timeit.repeat(case, number=1, repeat=repeat)
+            results[name] = {'min': min(times), 'median': float(np.median(times))}
+            print(f'{name:>60}: {results[name]["min"] * 1e3:10.2f} ms')
+
+    return results
+
+
+def environment():
+    """The commit and the versions the benchmarks ran with"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(), 'cpus': os.cpu_count()}
+
+
+def save_baseline(results, path):
+    """Write the results with the commit and the environment as a JSON baseline
+
+    :param results: the results of run_suite
+    :param path: the path of the JSON file
+    :return:
+        None
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compare the results with a baseline
+
+    :param results: the results of run_suite
+    :param baseline: the results of the baseline, as saved by save_baseline
+    :param threshold: the ratio of the fastest times above which a benchmark is a regression
+    :return:
+        the ratio of the fastest times of every benchmark which regressed, by name
+    """
+    regressions = {}
+    for name, result in results.items():
+        if name not in baseline['results']:
+            print(f'{name:>60}: not in the baseline')
+            continue
+        ratio = result['min'] / baseline['results'][name]['min']
+        print(f'{name:>60}: {ratio:6.2f}x the baseline' + ('  REGRESSION' if ratio > threshold else ''))
+        if ratio > threshold:
+            regressions[name] = ratio
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the property pipeline and the model setup')
+    parser.add_argument('--quick', action='store_true', help='use small sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='the number of repetitions of each benchmark')
+    parser.add_argument('--only', help='only run the benchmarks whose name contains this text')
+    parser.add_argument('--save', help='write the results as JSON baseline to this path')
+    parser.add_argument('--compare', help='compare the results with the JSON baseline at this path')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='the slowdown above which a benchmark is a regression')
+    args = parser.parse_args(argv)
+
+    results = run_suite(quick=args.quick, repeat=args.repeat, only=args.only)
+    if args.save:
+        save_baseline(results, args.save)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, threshold=args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import os
+import pickle
+
+import numpy as np
+
+
+def write_las(path, n_rows, depth_top=1000.0, depth_bottom=3000.0, curves=('GR', 'DT'), seed=1234):
+    """Write a synthetic LAS 2.0 log, the depth range is chosen so that it covers the reservoir at 2000-2100 m
+
+    :param path: the path of the las file
+    :param n_rows: the number of depth samples
+    :param depth_top: the depth of the first sample in m
+    :param depth_bottom: the depth of the last sample in m
+    :param curves: the names of the curves besides the depth
+    :param seed: the seed of the random curve values
+    :return:
+        the path of the las file
+    """
+    rng = np.random.default_rng(seed)
+    depth = np.linspace(depth_top, depth_bottom, n_rows)
+    step = depth[1] - depth[0]
+    values = rng.uniform(20, 150, (n_rows, len(curves)))
+    # a few null values like real logs have
+    values[rng.integers(0, n_rows, n_rows // 1000)] = -999.25
+    lines = ['~Version Information',
+             ' VERS.   2.0 : CWLS LOG ASCII STANDARD - VERSION 2.0',
+             ' WRAP.   NO  : ONE LINE PER DEPTH STEP',
+             '~Well Information',
+             f' STRT.M  {depth[0]:.4f} : START DEPTH',
+             f' STOP.M  {depth[-1]:.4f} : STOP DEPTH',
+             f' STEP.M  {step:.4f} : STEP',
+             ' NULL.   -999.25 : NULL VALUE',
+             '~Curve Information',
+             ' DEPTH.M : DEPTH'] + [f' {name}. : {name}' for name in curves] + ['~ASCII']
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+        np.savetxt(f, np.column_stack([depth, values]), fmt='%.4f')
+
+    return path
+
+
+def write_porosity_layers(directory, n_layers, n=900, seed=1234, layers_file=False):
+    """Write synthetic kriged porosity layers like get_porosity_values does
+
+    :param directory: the directory of the layers
+    :param n_layers: the number of layers
+    :param n: the number of the grid in x and y direction of a layer
+    :param seed: the seed of the random porosity
+    :param layers_file: write all layers into one porosity_layers.npy instead of one pickle file per layer
+    :return:
+        the directory of the layers
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    layers = rng.uniform(0.01, 0.4, (n_layers, n, n))
+    if layers_file:
+        np.save(os.path.join(directory, 'porosity_layers.npy'), layers)
+    else:
+        for i, layer in enumerate(layers):
+            with open(os.path.join(directory, f'layer_{i:03d}.pkl'), 'wb') as f:
+                pickle.dump(layer, f)
+
+    return directory
+
+
+def porosity_samples(n_sample, seed=1234):
+    """Synthetic porosity of the sampled wells
+
+    :param n_sample: the number of samples
+    :param seed: the seed of the random porosity
+    :return:
+        the porosity of each sample
+    """
+    return np.random.default_rng(seed).uniform(0.1, 0.3, n_sample)
@@ -0,0 +1,226 @@
+import glob
+import json
+import os
+
+import numpy as np
+
+# prefix of the time data columns in a checkpoint file
+TIME_DATA_PREFIX = 'time_data/'
+
+
+def save_checkpoint(path, state):
+    """Write the state of a run into a .npz file, the file is written under a temporary name and renamed, so a crash
+    while writing never leaves a broken checkpoint behind
+
+    :param path: the path of the checkpoint file
+    :type path: str
+    :param state: the state of the run, e.g. from Model.checkpoint_state, with the state vector 'X', the time 't',
+        the 'time_data' columns and further settings like the well controls and the grid
+    :type state: dict
+    :return:
+        None
+    """
+    arrays = {'X': np.asarray(state['X'], dtype=float), 't': np.float64(state['t'])}
+    for name, values in state.get('time_data', {}).items():
+        arrays[TIME_DATA_PREFIX + name] = np.asarray(values, dtype=float)
+    settings = {key: value for key, value in state.items() if key not in ('X', 't', 'time_data')}
+    arrays['settings'] = np.array(json.dumps(settings))
+    temporary = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez(temporary, **arrays)
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path):
+    """Read a checkpoint file which was written by save_checkpoint
+
+    :param path: the path of the checkpoint file
+    :type path: str
+    :return:
+        the state of the run, in the form which was given to save_checkpoint
+    :rtype: dict
+    """
+    with np.load(path) as f:
+        state = json.loads(str(f['settings']))
+        state['X'] = f['X']
+        state['t'] = float(f['t'])
+        state['time_data'] = {name[len(TIME_DATA_PREFIX):]: f[name].tolist() for name in f.files
+                              if name.startswith(TIME_DATA_PREFIX)}
+
+    return state
+
+
+class Checkpointer:
+    """Save the state of a run at report times, and restart a run from the latest checkpoint
+
+    The model has to provide checkpoint_state() and restore(state), like Model does.
+    """
+
+    def __init__(self, path, every=1, keep=None):
+        """The constructor of the checkpointer
+
+        :param path: the directory of the checkpoint files
+        :type path: str
+        :param every: only every Nth call of save writes a checkpoint
+        :type every: int
+        :param keep: optional number of checkpoints which are kept, older ones are removed
+        :type keep: int
+        """
+        self.path = path
+        self.every = every
+        self.keep = keep
+        self._calls = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    def checkpoints(self):
+        """The checkpoint files in the directory, the oldest first
+
+        :return:
+            the paths of the checkpoint files
+        :rtype: list
+        """
+        # the time in the file names is zero padded, so the names sort by time
+        return sorted(glob.glob(os.path.join(self.path, 'checkpoint-*.npz')))
+
+    def latest(self):
+        """The latest checkpoint
+
+        :return:
+            the path of the latest checkpoint file, or None if there is no checkpoint
+        :rtype: str
+        """
+        checkpoints = self.checkpoints()
+        return checkpoints[-1] if checkpoints else None
+
+    def save(self, model, force=False):
+        """Save the state of the model, this is called by Model.run after every report step
+
+        :param model: the model
+        :param force: write the checkpoint even if it is not the turn of this call
+        :type force: bool
+        :return:
+            the path of the written checkpoint file, or None if no checkpoint is written
+        :rtype: str
+        """
+        self._calls += 1
+        if not force and self._calls % self.every:
+            return None
+        state = model.checkpoint_state()
+        path = os.path.join(self.path, f'checkpoint-{state["t"]:016.6f}.npz')
+        save_checkpoint(path, state)
+        if self.keep is not None:
+            for old in self.checkpoints()[:-self.keep]:
+                os.remove(old)
+
+        return path
+
+    def resume(self, model):
+        """Restore the model from the latest checkpoint, if there is one
+
+        :param model: the initialized model
+        :return:
+            the time of the restored checkpoint, or None if the run starts from the beginning
+        :rtype: float
+        """
+        latest = self.latest()
+        if latest is None:
+            return None
+        state = load_checkpoint(latest)
+        model.restore(state)
+
+        return state['t']
+
+
+def cell_centers(n, spacing, offset=0):
+    """The coordinates of the cell centers along one axis
+
+    :param n: the number of cells
+    :type n: int
+    :param spacing: the cell size
+    :type spacing: float
+    :param offset: the number of cells before the origin, e.g. the overburden layers along z
+    :type offset: int
+    :return:
+        the coordinates of the cell centers
+    :rtype: np.ndarray
+    """
+    return (np.arange(n) - offset + 0.5) * spacing
+
+
+def _interpolate_axis(field, centers, new_centers, axis):
+    """Linear interpolation of the field along one axis, values outside of the old centers are extended"""
+    if len(centers) == len(new_centers) and np.allclose(centers, new_centers):
+        return field
+    if len(centers) == 1:
+        return np.repeat(field, len(new_centers), axis=axis)
+    new_centers = np.clip(new_centers, centers[0], centers[-1])
+    upper = np.clip(np.searchsorted(centers, new_centers, side='right'), 1, len(centers) - 1)
+    lower = upper - 1
+    weight = (new_centers - centers[lower]) / (centers[upper] - centers[lower])
+    shape = [1] * field.ndim
+    shape[axis] = len(new_centers)
+    weight = weight.reshape(shape)
+
+    return np.take(field, lower, axis=axis) * (1 - weight) + np.take(field, upper, axis=axis) * weight
+
+
+def remap_field(values, shape, spacing, overburden, new_shape, new_spacing, new_overburden):
+    """Map the cell values of one structured grid onto another grid of the same reservoir
+
+    The grids are aligned at the top of the reservoir, below the overburden layers, and the values are interpolated
+    linearly between the cell centers. Cells outside of the old grid, e.g. additional overburden layers, take the
+    value of the nearest old cell.
+
+    :param values: the values of each cell of the old grid, x changes fastest
+    :type values: np.ndarray
+    :param shape: the number of cells (nz, ny, nx) of the old grid, including the overburden and underburden layers
+    :type shape: tuple
+    :param spacing: the cell size (dz, dy, dx) of the old grid
+    :type spacing: tuple
+    :param overburden: the number of overburden layers of the old grid
+    :type overburden: int
+    :param new_shape: the number of cells (nz, ny, nx) of the new grid
+    :type new_shape: tuple
+    :param new_spacing: the cell size (dz, dy, dx) of the new grid
+    :type new_spacing: tuple
+    :param new_overburden: the number of overburden layers of the new grid
+    :type new_overburden: int
+    :return:
+        the values of each cell of the new grid
+    :rtype: np.ndarray
+    """
+    field = np.asarray(values, dtype=float)
+    if field.size != np.prod(shape):
+        raise ValueError('The number of values does not match the shape of the grid...')
+    field = field.reshape(shape)
+    offsets = (overburden, 0, 0)
+    new_offsets = (new_overburden, 0, 0)
+    for axis in range(3):
+        field = _interpolate_axis(field, cell_centers(shape[axis], spacing[axis], offsets[axis]),
+                                  cell_centers(new_shape[axis], new_spacing[axis], new_offsets[axis]), axis)
+
+    return field.ravel()
+
+
+def warm_start_state(state, shape, spacing, overburden):
+    """The initial pressure and enthalpy of a new grid from the state of a finished run
+
+    :param state: the state of the finished run, e.g. a loaded checkpoint or Model.checkpoint_state()
+    :type state: dict
+    :param shape: the number of cells (nz, ny, nx) of the new grid, including the overburden and underburden layers
+    :type shape: tuple
+    :param spacing: the cell size (dz, dy, dx) of the new grid
+    :type spacing: tuple
+    :param overburden: the number of overburden layers of the new grid
+    :type overburden: int
+    :return:
+        the pressure and the enthalpy of each reservoir cell of the new grid, which can be given to Model as
+        initial_state
+    :rtype: dict
+    """
+    n_cells = int(np.prod(state['shape']))
+    X = np.asarray(state['X'])
+    # the state vector holds pressure and enthalpy of every block, the reservoir blocks first
+    fields = {'pressure': X[0:2 * n_cells:2], 'enthalpy': X[1:2 * n_cells:2]}
+
+    return {name: remap_field(values, state['shape'], state['spacing'], state['overburden'], shape, spacing,
+                              overburden) for name, values in fields.items()}
@@ -0,0 +1,119 @@
+import argparse
+import json
+import sys
+
+from src.job_queue import JobQueue, work
+from src.jobs import BACKENDS, run_job, write_result
+from src.scenario import expand_jobs, load_scenarios
+from src.sweep import limit_threads, run_sweep
+
+
+def expand_command(args):
+    """Print the jobs of the scenarios, one JSON object per line"""
+    for job in expand_jobs(load_scenarios(args.scenarios), only=args.only):
+        print(json.dumps(job))
+    return 0
+
+
+def run_command(args):
+    """Run the jobs of the scenarios concurrently and write every result as soon as it is finished"""
+    jobs = expand_jobs(load_scenarios(args.scenarios), only=args.only)
+    print(f'{len(jobs)} jobs, the results are written to {args.output} ({args.backend})')
+
+    def write(case, td):
+        job, = case
+        print(f'finished {job["name"]}: {write_result(job, td, args.backend, args.output)}')
+
+    run_sweep(run_job, [(job,) for job in jobs], max_workers=args.max_workers,
+              threads_per_worker=args.threads_per_worker, on_result=write)
+    return 0
+
+
+def enqueue_command(args):
+    """Add the jobs of the scenarios to a queue, the jobs which are already in the queue are kept as they are"""
+    queue = JobQueue(args.queue)
+    jobs = expand_jobs(load_scenarios(args.scenarios), only=args.only)
+    added = sum(queue.enqueue(job['name'], job) for job in jobs)
+    print(f'{added} of {len(jobs)} jobs added to {args.queue}')
+    return 0
+
+
+def worker_command(args):
+    """Run the jobs of a queue one after the other until no job is pending, start one worker per simulation slot on
+    every host which shares the queue"""
+    limit_threads(args.threads_per_worker)
+    queue = JobQueue(args.queue, lease_time=args.lease_time, max_attempts=args.max_attempts)
+
+    def write(job, td):
+        output_path = write_result(job, td, args.backend, args.output)
+        print(f'finished {job["name"]}: {output_path}')
+        return output_path
+
+    finished = work(queue, run_job, on_result=write, max_jobs=args.max_jobs, wait=args.wait)
+    print(f'{finished} jobs finished by this worker')
+    return 0
+
+
+def status_command(args):
+    """Print the number of jobs in each state and the errors of the failed jobs"""
+    queue = JobQueue(args.queue)
+    print(', '.join(f'{status} {count}' for status, count in queue.counts().items()))
+    for job in queue.jobs('failed'):
+        print(f'failed {job["name"]} after {job["attempts"]} attempts: {job["error"]}')
+    return 0
+
+
+def build_parser():
+    """The parser of the command line interface"""
+    parser = argparse.ArgumentParser(prog='python -m src.cli',
+                                     description='Expand scenario files into jobs and run them')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    expand = commands.add_parser('expand', help='print the jobs of the scenarios')
+    run = commands.add_parser('run', help='run the jobs of the scenarios')
+    for command in (expand, run):
+        command.add_argument('scenarios', help='the TOML file of the scenarios')
+        command.add_argument('--only', nargs='+', help='the names of the scenarios to use, by default all')
+    expand.set_defaults(function=expand_command)
+
+    run.add_argument('--backend', choices=BACKENDS, default='store', help='where the results are written')
+    run.add_argument('--output', default='Results', help='the directory of the results')
+    run.add_argument('--max-workers', type=int, help='the number of worker processes')
+    run.add_argument('--threads-per-worker', type=int, default=1,
+                     help='the maximum number of threads each simulation is allowed to use')
+    run.set_defaults(function=run_command)
+
+    enqueue = commands.add_parser('enqueue', help='add the jobs of the scenarios to a queue')
+    enqueue.add_argument('scenarios', help='the TOML file of the scenarios')
+    enqueue.add_argument('--only', nargs='+', help='the names of the scenarios to use, by default all')
+    enqueue.add_argument('--queue', default='queue.sqlite', help='the SQLite file of the queue')
+    enqueue.set_defaults(function=enqueue_command)
+
+    worker = commands.add_parser('worker', help='run the jobs of a queue')
+    worker.add_argument('--queue', default='queue.sqlite', help='the SQLite file of the queue')
+    worker.add_argument('--backend', choices=BACKENDS, default='store', help='where the results are written')
+    worker.add_argument('--output', default='Results', help='the directory of the results')
+    worker.add_argument('--threads-per-worker', type=int, default=1,
+                        help='the maximum number of threads each simulation is allowed to use')
+    worker.add_argument('--lease-time', type=float, default=600.0,
+                        help='the seconds after which the job of a worker which stopped renewing it is requeued')
+    worker.add_argument('--max-attempts', type=int, default=3, help='the number of attempts of a job')
+    worker.add_argument('--max-jobs', type=int, help='the number of jobs after which the worker stops')
+    worker.add_argument('--wait', type=float, default=0.0,
+                        help='the seconds to wait for requeued jobs once no job is pending')
+    worker.set_defaults(function=worker_command)
+
+    status = commands.add_parser('status', help='print the state of a queue')
+    status.add_argument('--queue', default='queue.sqlite', help='the SQLite file of the queue')
+    status.set_defaults(function=status_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.function(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
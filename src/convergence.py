@@ -0,0 +1,162 @@
+import numpy as np
+
+
+def observed_order(f1, f2, f3, r21, r32, order_bounds=(0.5, 3.0), iterations=50):
+    """The observed order of convergence of three solutions on systematically refined grids
+
+    The fixed-point iteration of Celik et al. (2008) is used, so the refinement ratios do not have to be equal. The
+    order is computed from the norms of the differences, so curves give one order for the whole curve.
+
+    :param f1: the solution on the finest grid
+    :type f1: np.ndarray
+    :param f2: the solution on the medium grid
+    :type f2: np.ndarray
+    :param f3: the solution on the coarsest grid
+    :type f3: np.ndarray
+    :param r21: the refinement ratio h2 / h1 of the medium and the finest grid
+    :type r21: float
+    :param r32: the refinement ratio h3 / h2 of the coarsest and the medium grid
+    :type r32: float
+    :param order_bounds: the observed order is clipped to these bounds
+    :type order_bounds: tuple
+    :param iterations: the number of fixed-point iterations
+    :type iterations: int
+    :return:
+        the observed order, nan if the two finest solutions are equal
+    :rtype: float
+    """
+    e21 = np.linalg.norm(np.atleast_1d(np.asarray(f2, dtype=float) - np.asarray(f1, dtype=float)))
+    e32 = np.linalg.norm(np.atleast_1d(np.asarray(f3, dtype=float) - np.asarray(f2, dtype=float)))
+    if e21 == 0:
+        return np.nan
+    if e32 == 0:
+        return order_bounds[0]
+    # the norms lose the sign, the solutions are assumed to converge monotonically
+    p = np.log(e32 / e21) / np.log(r21)
+    for _ in range(iterations):
+        p = np.clip(p, *order_bounds)
+        q = np.log((r21 ** p - 1) / (r32 ** p - 1))
+        p = abs(np.log(e32 / e21) + q) / np.log(r21)
+
+    return float(np.clip(p, *order_bounds))
+
+
+def richardson_extrapolation(f1, f2, r21, p):
+    """The Richardson extrapolation of the solutions of the two finest grids to zero cell size
+
+    :param f1: the solution on the finest grid
+    :type f1: np.ndarray
+    :param f2: the solution on the medium grid
+    :type f2: np.ndarray
+    :param r21: the refinement ratio h2 / h1
+    :type r21: float
+    :param p: the order of convergence
+    :type p: float
+    :return:
+        the extrapolated solution
+    :rtype: np.ndarray
+    """
+    f1 = np.asarray(f1, dtype=float)
+    f2 = np.asarray(f2, dtype=float)
+    return (r21 ** p * f1 - f2) / (r21 ** p - 1)
+
+
+def grid_convergence_index(f1, f2, r21, p, safety_factor=1.25):
+    """The grid convergence index of the finest grid, a relative error band of its solution
+
+    :param f1: the solution on the finest grid
+    :type f1: np.ndarray
+    :param f2: the solution on the medium grid
+    :type f2: np.ndarray
+    :param r21: the refinement ratio h2 / h1
+    :type r21: float
+    :param p: the order of convergence
+    :type p: float
+    :param safety_factor: the safety factor, 1.25 for studies with three or more grids
+    :type safety_factor: float
+    :return:
+        the relative grid convergence index of each value
+    :rtype: np.ndarray
+    """
+    f1 = np.asarray(f1, dtype=float)
+    f2 = np.asarray(f2, dtype=float)
+    relative_error = np.abs((f1 - f2) / f1)
+    return safety_factor * relative_error / (r21 ** p - 1)
+
+
+class GridConvergenceStudy:
+    """Estimate the grid convergence of a sweep while it runs, from the coarsest to the finest grid
+
+    The results of the grids are added as they finish. Once there are three grids, the observed order, the Richardson
+    extrapolation and the grid convergence index (GCI) of the three finest grids are computed, and the study has
+    converged when the largest GCI of the curve is below the tolerance.
+    """
+
+    def __init__(self, tolerance, safety_factor=1.25, order_bounds=(0.5, 3.0)):
+        """The constructor of the study
+
+        :param tolerance: the largest relative GCI which is accepted, e.g. 1e-3
+        :type tolerance: float
+        :param safety_factor: the safety factor of the GCI
+        :type safety_factor: float
+        :param order_bounds: the observed order is clipped to these bounds
+        :type order_bounds: tuple
+        """
+        self.tolerance = tolerance
+        self.safety_factor = safety_factor
+        self.order_bounds = order_bounds
+        self.grids = []
+
+    def add(self, cell_size, values, time=None):
+        """Add the result of one grid
+
+        :param cell_size: the representative cell size of the grid, e.g. dz or (dx * dy * dz) ** (1 / 3)
+        :type cell_size: float
+        :param values: the result, e.g. the production temperature curve
+        :type values: np.ndarray
+        :param time: optional times of the values, the curves are then interpolated onto the times of the finest grid
+        :type time: np.ndarray
+        :return:
+            the estimate of the three finest grids, see estimate
+        :rtype: dict
+        """
+        values = np.asarray(values, dtype=float)
+        self.grids.append((float(cell_size), None if time is None else np.asarray(time, dtype=float), values))
+        self.grids.sort(key=lambda grid: -grid[0])
+
+        return self.estimate()
+
+    def estimate(self):
+        """The convergence estimate of the three finest grids
+
+        :return:
+            None if there are fewer than three grids, otherwise the cell sizes, the observed 'order', the
+            'extrapolated' solution, the 'gci' of each value, its maximum 'gci_max' and whether it 'converged'
+        :rtype: dict
+        """
+        if len(self.grids) < 3:
+            return None
+        (h3, time3, f3), (h2, time2, f2), (h1, time1, f1) = self.grids[-3:]
+        if time1 is not None:
+            f2 = np.interp(time1, time2, f2)
+            f3 = np.interp(time1, time3, f3)
+        r21 = h2 / h1
+        r32 = h3 / h2
+        p = observed_order(f1, f2, f3, r21, r32, order_bounds=self.order_bounds)
+        if np.isnan(p):
+            # the two finest grids give the same solution
+            extrapolated = f1
+            gci = np.zeros_like(f1)
+        else:
+            extrapolated = richardson_extrapolation(f1, f2, r21, p)
+            gci = grid_convergence_index(f1, f2, r21, p, safety_factor=self.safety_factor)
+        gci_max = float(np.max(gci))
+
+        return {'cell_sizes': [h1, h2, h3], 'order': p, 'extrapolated': extrapolated, 'gci': gci,
+                'gci_max': gci_max, 'converged': gci_max <= self.tolerance}
+
+    @property
+    def converged(self):
+        """Whether the finest grids meet the tolerance"""
+        estimate = self.estimate()
+        return estimate is not None and estimate['converged']
@@ -0,0 +1,342 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.result_store import ResultStore
+from src.sweep import run_sweep
+
+report_time = 100
+total_time = 10000
+x_spacing = 4500
+y_spacing = 4000
+z_spacing = 100
+output = 'PRD : temperature (K)'
+# the well logs are converted once into a columnar binary here
+las_cache_dir = 'LasCache'
+# the operator tables of the physics are computed once and shared by every run here
+operator_cache_dir = 'OperatorCache'
+
+
+class RunningMoments:
+    """Mean and variance of a stream of values or of arrays of values, updated with Welford's algorithm
+
+    Only the count, the mean and the sum of the squared deviations are kept, so the memory does not grow with the
+    number of values and the update is numerically stable.
+    """
+
+    def __init__(self, shape=()):
+        """The constructor of the moments
+
+        :param shape: the shape of every value, e.g. the number of report steps of a time series
+        :type shape: tuple
+        """
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+
+    def add(self, values):
+        """Add one value, or one array of values of the shape of the moments
+
+        :param values: the value
+        :type values: np.ndarray
+        :return:
+            None
+        """
+        values = np.asarray(values, dtype=float)
+        if values.shape != self.mean.shape:
+            raise ValueError('The shape of the values does not match the shape of the moments...')
+        self.count += 1
+        delta = values - self.mean
+        self.mean = self.mean + delta / self.count
+        self._m2 = self._m2 + delta * (values - self.mean)
+
+    @property
+    def variance(self):
+        """The sample variance of the values, NaN for fewer than two values"""
+        if self.count < 2:
+            return np.full(self.mean.shape, np.nan)[()]
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        """The sample standard deviation of the values"""
+        return np.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """Streaming quantiles of values, or of arrays of values, from histograms with fixed bins
+
+    The counts of the bins between low and high are kept for every element, with one bin below and one above the
+    range, so the memory does not grow with the number of values. A quantile is accurate to the width of a bin,
+    (high - low) / n_bins, as long as it lies inside the range.
+    """
+
+    def __init__(self, low, high, n_bins=1000, shape=()):
+        """The constructor of the sketch
+
+        :param low: the lower end of the range of the bins
+        :type low: float
+        :param high: the upper end of the range of the bins
+        :type high: float
+        :param n_bins: the number of bins between low and high
+        :type n_bins: int
+        :param shape: the shape of every value, e.g. the number of report steps of a time series
+        :type shape: tuple
+        """
+        if not high > low:
+            raise ValueError('The upper end of the range has to be larger than the lower end...')
+        self.low = low
+        self.high = high
+        self.n_bins = n_bins
+        self.shape = tuple(shape)
+        self.counts = np.zeros(self.shape + (n_bins + 2,), dtype=np.int64)
+        self.minimum = np.full(self.shape, np.inf)
+        self.maximum = np.full(self.shape, -np.inf)
+
+    def add(self, values):
+        """Add one value, or one array of values of the shape of the sketch
+
+        :param values: the value
+        :type values: np.ndarray
+        :return:
+            None
+        """
+        values = np.asarray(values, dtype=float)
+        if values.shape != self.shape:
+            raise ValueError('The shape of the values does not match the shape of the sketch...')
+        # bin 0 is below the range, bin n_bins + 1 above it
+        bins = np.floor((values - self.low) / (self.high - self.low) * self.n_bins).astype(np.int64) + 1
+        bins = np.clip(bins, 0, self.n_bins + 1)
+        np.add.at(self.counts.reshape(-1, self.n_bins + 2), (np.arange(bins.size), bins.ravel()), 1)
+        self.minimum = np.minimum(self.minimum, values)
+        self.maximum = np.maximum(self.maximum, values)
+
+    def quantile(self, q):
+        """The q-quantile of the values, interpolated linearly inside the bin which contains it
+
+        :param q: the quantile between 0 and 1
+        :type q: float
+        :return:
+            the quantile of every element, NaN if no value was added
+        :rtype: np.ndarray
+        """
+        counts = self.counts.reshape(-1, self.n_bins + 2)
+        totals = counts.sum(axis=1)
+        cumulative = np.cumsum(counts, axis=1)
+        target = q * totals
+        # the first bin whose cumulative count reaches the target
+        bins = np.minimum((cumulative < target[:, None]).sum(axis=1), self.n_bins + 1)
+        rows = np.arange(len(counts))
+        below = cumulative[rows, bins] - counts[rows, bins]
+        fraction = np.divide(target - below, counts[rows, bins], out=np.zeros(len(counts)),
+                             where=counts[rows, bins] > 0)
+        width = (self.high - self.low) / self.n_bins
+        estimate = self.low + (bins - 1 + fraction) * width
+        # the values below and above the range are only known by their extremes
+        estimate = np.clip(estimate, self.minimum.ravel(), self.maximum.ravel())
+        estimate[bins == 0] = self.minimum.ravel()[bins == 0]
+        estimate[bins == self.n_bins + 1] = self.maximum.ravel()[bins == self.n_bins + 1]
+        estimate[totals == 0] = np.nan
+
+        return estimate.reshape(self.shape)[()]
+
+
+def breakthrough_time(time, temperature, drop=1.0):
+    """The time at which the production temperature first dropped by the given amount below its initial value
+
+    :param time: the report times
+    :type time: np.ndarray
+    :param temperature: the production temperature at the report times
+    :type temperature: np.ndarray
+    :param drop: the temperature drop in K which marks the thermal breakthrough
+    :type drop: float
+    :return:
+        the breakthrough time, interpolated linearly between the report times, NaN if the temperature never dropped
+        that much
+    :rtype: float
+    """
+    time = np.asarray(time, dtype=float)
+    temperature = np.asarray(temperature, dtype=float)
+    threshold = temperature[0] - drop
+    below = np.nonzero(temperature <= threshold)[0]
+    if len(below) == 0:
+        return np.nan
+    i = below[0]
+    if i == 0:
+        return time[0]
+    fraction = (temperature[i - 1] - threshold) / (temperature[i - 1] - temperature[i])
+    return time[i - 1] + fraction * (time[i] - time[i - 1])
+
+
+class EnsembleSummary:
+    """Running statistics of the production temperature and the breakthrough time of the members of an ensemble
+
+    Every finished member updates the mean, the variance and the quantile sketch of the temperature at every report
+    time and of its breakthrough time, and is then dropped, so the memory stays flat as the ensemble grows.
+    """
+
+    def __init__(self, temperature_range=(295.0, 355.0), n_bins=600, drop=1.0, quantiles=(0.1, 0.5, 0.9)):
+        """The constructor of the summary, the first member sets the report times which every member has to share
+
+        :param temperature_range: the range of the temperature bins of the quantile sketch in K
+        :type temperature_range: tuple
+        :param n_bins: the number of bins of the quantile sketches
+        :type n_bins: int
+        :param drop: the temperature drop in K which marks the thermal breakthrough, see breakthrough_time
+        :type drop: float
+        :param quantiles: the quantiles which are reported
+        :type quantiles: tuple
+        """
+        self.temperature_range = temperature_range
+        self.n_bins = n_bins
+        self.drop = drop
+        self.quantiles = tuple(quantiles)
+        self.time = None
+        self.temperature = None
+        self.temperature_sketch = None
+        self.breakthrough = RunningMoments()
+        self.breakthrough_sketch = None
+        self.n_members = 0
+        self.n_without_breakthrough = 0
+
+    def add(self, time, temperature):
+        """Add the production temperature of one member
+
+        :param time: the report times of the member
+        :type time: np.ndarray
+        :param temperature: the production temperature of the member
+        :type temperature: np.ndarray
+        :return:
+            the breakthrough time of the member
+        :rtype: float
+        """
+        time = np.asarray(time, dtype=float)
+        if self.time is None:
+            self.time = time
+            self.temperature = RunningMoments(time.shape)
+            self.temperature_sketch = QuantileSketch(*self.temperature_range, n_bins=self.n_bins, shape=time.shape)
+            self.breakthrough_sketch = QuantileSketch(0.0, time[-1], n_bins=self.n_bins)
+        if time.shape != self.time.shape or not np.allclose(time, self.time):
+            raise ValueError('The report times of the member do not match the report times of the ensemble...')
+        self.temperature.add(temperature)
+        self.temperature_sketch.add(temperature)
+        self.n_members += 1
+        member_breakthrough = breakthrough_time(time, temperature, self.drop)
+        if np.isnan(member_breakthrough):
+            self.n_without_breakthrough += 1
+        else:
+            self.breakthrough.add(member_breakthrough)
+            self.breakthrough_sketch.add(member_breakthrough)
+
+        return member_breakthrough
+
+    def temperature_table(self):
+        """The statistics of the production temperature at every report time
+
+        :return:
+            the time, the mean, the standard deviation and the quantiles of the temperature, e.g. column 'p50'
+        :rtype: pd.DataFrame
+        """
+        table = pd.DataFrame({'time': self.time, 'mean': self.temperature.mean, 'std': self.temperature.std})
+        for q in self.quantiles:
+            table[f'p{round(q * 100):g}'] = self.temperature_sketch.quantile(q)
+
+        return table
+
+    def breakthrough_summary(self):
+        """The statistics of the breakthrough time of the members which broke through
+
+        :return:
+            the number of members, the number without breakthrough, the mean, the standard deviation and the quantiles
+            of the breakthrough time
+        :rtype: dict
+        """
+        summary = {'members': self.n_members, 'without_breakthrough': self.n_without_breakthrough,
+                   'mean': float(self.breakthrough.mean) if self.breakthrough.count else np.nan,
+                   'std': float(self.breakthrough.std)}
+        for q in self.quantiles:
+            summary[f'p{round(q * 100):g}'] = np.nan
+            if self.breakthrough_sketch is not None:
+                summary[f'p{round(q * 100):g}'] = float(self.breakthrough_sketch.quantile(q))
+
+        return summary
+
+
+def simulate_member(seed, nx, ny, nz, member_threads=1, method='kriging'):
+    """Run the forward simulation of one member, this is the function which is executed in the worker processes
+
+    :param seed: the seed of the heterogeneous field of the member, see porosity_realization
+    :param nx: the number of cells in x direction
+    :param ny: the number of cells in y direction
+    :param nz: the number of cells in z direction
+    :param member_threads: the number of threads of the kriging of the field
+    :param method: 'kriging' or 'srf', see porosity_realization
+    :return:
+        the time and the production temperature of the member
+    """
+    # darts is only imported where the simulations run
+    from darts.engines import redirect_darts_output
+    from src.model import Model
+    from src.operator_cache import OperatorCache
+    from src.read_files import porosity_realization
+
+    poro, perm = porosity_realization(ny, nx, nz, seed, n_threads=member_threads, cache_dir=las_cache_dir,
+                                      method=method)
+    redirect_darts_output('log.txt')
+    proxy_model = Model(total_time=total_time, set_nx=nx, set_ny=ny, set_nz=nz, set_dx=x_spacing / nx,
+                        set_dy=y_spacing / ny, set_dz=z_spacing / nz, perms=perm, poro=poro,
+                        report_time_step=report_time, overburden=0, operator_cache=OperatorCache(operator_cache_dir))
+    proxy_model.init()
+    proxy_model.run(export_to_vtk=False)
+    td = proxy_model.physics.engine.time_data
+
+    return np.asarray(td['time'], dtype=float), np.asarray(td[output], dtype=float)
+
+
+def run_ensemble(n_members, nx=225, ny=75, nz=10, base_seed=1234, max_workers=None, threads_per_worker=1,
+                 keep_members=False, output_dir='EnsembleHe', method='kriging'):
+    """Simulate an ensemble of seeded realizations of the heterogeneous reservoir in parallel, and update the
+    statistics of the production temperature and the breakthrough time as every member finishes
+
+    :param n_members: the number of members
+    :param nx: the number of cells in x direction
+    :param ny: the number of cells in y direction
+    :param nz: the number of cells in z direction
+    :param base_seed: the seed of the first member, member i has the seed base_seed + i
+    :param max_workers: the number of worker processes, by default as many as fit on the cores
+    :param threads_per_worker: the maximum number of threads each simulation is allowed to use
+    :param keep_members: also write the production temperature of every member into a result store in the output
+        directory, by default only the statistics are kept
+    :param output_dir: the directory of the statistics and of the members
+    :param method: 'kriging' varies the sample locations with the seed, 'srf' draws a conditioned random field
+    :return:
+        the summary of the ensemble
+    """
+    summary = EnsembleSummary()
+    store = ResultStore(os.path.join(output_dir, 'members')) if keep_members else None
+
+    def add_member(case, result):
+        seed = case[0]
+        member_time, temperature = result
+        member_breakthrough = summary.add(member_time, temperature)
+        print(f'member {summary.n_members}/{n_members} (seed {seed}): breakthrough at {member_breakthrough:.0f} days, '
+              f'mean breakthrough {summary.breakthrough.mean:.0f} days')
+        if store is not None:
+            store.append(f'seed_{seed}', temperature, index=pd.Series(member_time, name='time'),
+                         partition=f'seed_{seed}', seed=seed, nx=nx, ny=ny, nz=nz)
+
+    cases = [(base_seed + i, nx, ny, nz, threads_per_worker, method) for i in range(n_members)]
+    run_sweep(simulate_member, cases, max_workers=max_workers, threads_per_worker=threads_per_worker,
+              on_result=add_member, keep_results=False)
+
+    os.makedirs(output_dir, exist_ok=True)
+    summary.temperature_table().to_csv(os.path.join(output_dir, 'temperature_statistics.csv'), index=False)
+    pd.Series(summary.breakthrough_summary()).to_csv(os.path.join(output_dir, 'breakthrough_statistics.csv'),
+                                                     header=False)
+
+    return summary
+
+
+if __name__ == '__main__':
+    run_ensemble(100)
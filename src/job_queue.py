@@ -0,0 +1,313 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# the states of a job, a job is claimed from pending into running, and ends as done or failed
+STATUSES = ('pending', 'running', 'done', 'failed')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL
+)
+'''
+
+
+def worker_name():
+    """The name of the current worker process, unique over the hosts which share a queue
+
+    :return:
+        the host name and the process id
+    :rtype: str
+    """
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class JobQueue:
+    """Job queue in a SQLite file, which can be shared by worker processes on several hosts through a shared
+    filesystem
+
+    A worker claims a pending job with a lease, which it renews while the job runs. A job whose lease expired, e.g.
+    because its worker died, is pending again for the next claim, until it was claimed ``max_attempts`` times. Every
+    change is a short transaction, so a crash at any point leaves the queue consistent.
+    """
+
+    def __init__(self, path, lease_time=600.0, max_attempts=3, timeout=60.0):
+        """The constructor of the queue
+
+        :param path: the path of the SQLite file, which is created if it does not exist
+        :type path: str
+        :param lease_time: the time in seconds a claim or renewal keeps a job for its worker
+        :type lease_time: float
+        :param max_attempts: the number of claims of a job after which an expired or failed job is not retried
+        :type max_attempts: int
+        :param timeout: the time in seconds to wait for the lock of the file held by another process
+        :type timeout: float
+        """
+        self.path = path
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self.transaction() as connection:
+            connection.execute(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """A connection in a transaction which holds the write lock, it is committed at the end or rolled back on an
+        error
+
+        Every call opens its own connection, so the queue can be used from several threads, e.g. a lease renewal
+        next to the running job.
+        """
+        # the default rollback journal, the WAL mode does not work on network filesystems
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+
+    def enqueue(self, name, payload):
+        """Add a job, a job with the same name is only added once, so a sweep can be enqueued again
+
+        :param name: the unique name of the job
+        :type name: str
+        :param payload: the parameters of the job, which are stored as JSON
+        :type payload: dict
+        :return:
+            whether the job was added
+        :rtype: bool
+        """
+        with self.transaction() as connection:
+            cursor = connection.execute('INSERT OR IGNORE INTO jobs (name, payload, updated) VALUES (?, ?, ?)',
+                                        (name, json.dumps(payload), time.time()))
+            return cursor.rowcount == 1
+
+    def requeue_expired(self, now=None):
+        """Make the running jobs whose lease expired pending again, or failed after max_attempts claims
+
+        :param now: the current time, by default the time of this host
+        :type now: float
+        :return:
+            the number of requeued jobs
+        :rtype: int
+        """
+        now = time.time() if now is None else now
+        with self.transaction() as connection:
+            return self._requeue_expired(connection, now)
+
+    def _requeue_expired(self, connection, now):
+        connection.execute("UPDATE jobs SET status = 'failed', worker = NULL, lease_until = NULL, error = ?, "
+                           "updated = ? WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                           ('the lease expired', now, now, self.max_attempts))
+        cursor = connection.execute("UPDATE jobs SET status = 'pending', worker = NULL, lease_until = NULL, "
+                                    "updated = ? WHERE status = 'running' AND lease_until < ?", (now, now))
+        return cursor.rowcount
+
+    def claim(self, worker=None, now=None):
+        """Claim the oldest pending job with a lease, after the expired leases are requeued
+
+        :param worker: the name of the worker, by default see worker_name
+        :type worker: str
+        :param now: the current time, by default the time of this host
+        :type now: float
+        :return:
+            the name and the parameters of the claimed job, or None if no job is pending
+        :rtype: tuple
+        """
+        worker = worker_name() if worker is None else worker
+        now = time.time() if now is None else now
+        with self.transaction() as connection:
+            self._requeue_expired(connection, now)
+            row = connection.execute("SELECT name, payload FROM jobs WHERE status = 'pending' "
+                                     "ORDER BY rowid LIMIT 1").fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, "
+                               "attempts = attempts + 1, updated = ? WHERE name = ?",
+                               (worker, now + self.lease_time, now, row[0]))
+        return row[0], json.loads(row[1])
+
+    def renew(self, name, worker=None, now=None):
+        """Extend the lease of a running job
+
+        :param name: the name of the job
+        :type name: str
+        :param worker: the name of the worker which holds the lease
+        :type worker: str
+        :param now: the current time, by default the time of this host
+        :type now: float
+        :return:
+            whether the worker still holds the lease, it lost it when the lease expired and the job was requeued
+        :rtype: bool
+        """
+        worker = worker_name() if worker is None else worker
+        now = time.time() if now is None else now
+        with self.transaction() as connection:
+            cursor = connection.execute("UPDATE jobs SET lease_until = ?, updated = ? "
+                                        "WHERE name = ? AND status = 'running' AND worker = ?",
+                                        (now + self.lease_time, now, name, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, name, result=None):
+        """Mark a job as done, only the first completion of a job counts
+
+        A worker whose lease expired can still complete its job, since the result does not depend on which worker
+        ran the job.
+
+        :param name: the name of the job
+        :type name: str
+        :param result: optional result of the job which is stored as JSON, e.g. the path of the written result
+        :return:
+            whether this was the first completion of the job
+        :rtype: bool
+        """
+        with self.transaction() as connection:
+            cursor = connection.execute("UPDATE jobs SET status = 'done', worker = NULL, lease_until = NULL, "
+                                        "result = ?, error = NULL, updated = ? WHERE name = ? AND status != 'done'",
+                                        (json.dumps(result), time.time(), name))
+            return cursor.rowcount == 1
+
+    def fail(self, name, error, worker=None):
+        """Give up a claimed job after an error, it is pending again until it was claimed max_attempts times
+
+        :param name: the name of the job
+        :type name: str
+        :param error: the description of the error
+        :type error: str
+        :param worker: the name of the worker which holds the lease
+        :type worker: str
+        :return:
+            the new status of the job, or None if the worker does not hold the lease anymore
+        :rtype: str
+        """
+        worker = worker_name() if worker is None else worker
+        with self.transaction() as connection:
+            row = connection.execute("SELECT attempts FROM jobs WHERE name = ? AND status = 'running' "
+                                     "AND worker = ?", (name, worker)).fetchone()
+            if row is None:
+                return None
+            status = 'failed' if row[0] >= self.max_attempts else 'pending'
+            connection.execute('UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, error = ?, '
+                               'updated = ? WHERE name = ?', (status, error, time.time(), name))
+        return status
+
+    def counts(self):
+        """The number of jobs in each state
+
+        :return:
+            the number of jobs by state
+        :rtype: dict
+        """
+        with self.transaction() as connection:
+            rows = connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    def jobs(self, status=None):
+        """The jobs of the queue in the order they were enqueued
+
+        :param status: optional state, only the jobs in this state are returned
+        :type status: str
+        :return:
+            the name, parameters, state, worker, attempts, result and error of each job
+        :rtype: list
+        """
+        query = 'SELECT name, payload, status, worker, attempts, result, error FROM jobs'
+        arguments = ()
+        if status is not None:
+            query += ' WHERE status = ?'
+            arguments = (status,)
+        with self.transaction() as connection:
+            rows = connection.execute(query + ' ORDER BY rowid', arguments).fetchall()
+        return [{'name': name, 'payload': json.loads(payload), 'status': job_status, 'worker': worker,
+                 'attempts': attempts, 'result': None if result is None else json.loads(result), 'error': error}
+                for name, payload, job_status, worker, attempts, result, error in rows]
+
+
+def work(queue, run, on_result=None, worker=None, max_jobs=None, wait=0.0, poll_interval=10.0):
+    """Claim and run jobs until the queue has no pending jobs, the lease of the running job is renewed in the
+    background
+
+    The results have to be written idempotently by ``on_result``, e.g. overwriting the result of the job, because a
+    job whose worker died after writing its result but before completing it runs again.
+
+    :param queue: the queue of the jobs
+    :type queue: JobQueue
+    :param run: the function which runs one job, it is called with the parameters of the job
+    :type run: callable
+    :param on_result: optional function which is called with (parameters, result) of a finished job, its return
+        value is stored as the result of the job
+    :type on_result: callable
+    :param worker: the name of the worker, by default see worker_name
+    :type worker: str
+    :param max_jobs: optional number of jobs after which the worker stops
+    :type max_jobs: int
+    :param wait: the time in seconds to keep polling an empty queue for jobs which are still running elsewhere and
+        may be requeued
+    :type wait: float
+    :param poll_interval: the time in seconds between the polls of an empty queue
+    :type poll_interval: float
+    :return:
+        the number of jobs which finished in this worker
+    :rtype: int
+    """
+    worker = worker_name() if worker is None else worker
+    finished = 0
+    idle_since = None
+    while max_jobs is None or finished < max_jobs:
+        claimed = queue.claim(worker)
+        if claimed is None:
+            idle_since = time.time() if idle_since is None else idle_since
+            if time.time() - idle_since >= wait:
+                break
+            time.sleep(poll_interval)
+            continue
+        idle_since = None
+        name, payload = claimed
+
+        stop = threading.Event()
+
+        def keep_lease():
+            while not stop.wait(queue.lease_time / 3):
+                try:
+                    queue.renew(name, worker)
+                except sqlite3.Error:
+                    # e.g. the database is locked by other workers for longer than the timeout, the lease is renewed
+                    # again at the next interval, which is well within the lease time
+                    continue
+
+        keeper = threading.Thread(target=keep_lease, daemon=True)
+        keeper.start()
+        try:
+            result = run(payload)
+            stored = on_result(payload, result) if on_result is not None else None
+        except Exception as error:
+            queue.fail(name, f'{type(error).__name__}: {error}', worker)
+            continue
+        finally:
+            stop.set()
+            keeper.join()
+        queue.complete(name, stored)
+        finished += 1
+
+    return finished
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.memo import ResultMemo
+from src.petrophysics import porosity_to_permeability
+from src.property_cache import PropertyCache
+from src.read_files import from_las_to_poro_gamma, read_pickle_file_upscaling_z
+from src.result_store import ResultStore
+
+# the backends the results of the jobs can be written to
+BACKENDS = ('store', 'csv')
+# the caches which are shared by the jobs, like the caches of the serial studies
+property_cache_dir = 'PropertyCache'
+las_cache_dir = 'LasCache'
+operator_cache_dir = 'OperatorCache'
+result_memo_dir = 'ResultMemo'
+result_memo_bytes = 8 * 2 ** 30
+
+
+def job_fields(job):
+    """The porosity and permeability of a job, per layer for the homogeneous and the layered reservoir
+
+    :param job: the parameters of the job, see expand_scenario
+    :type job: dict
+    :return:
+        porosity and permeability
+    """
+    nx, ny, nz = job['nx'], job['ny'], job['nz']
+    if job['reservoir_type'] == 'ho':
+        return np.full(nz, job['poro'], dtype=float), np.full(nz, job['perm'], dtype=float)
+    if job['reservoir_type'] == 'layered':
+        poro = from_las_to_poro_gamma(job['las_file'], nz, cache_dir=las_cache_dir)
+        # calculate permeability, this is from Duncan's thesis
+        return poro, porosity_to_permeability(poro)
+    if job['reservoir_type'] == 'he':
+        return read_pickle_file_upscaling_z(ny, nx, nz, job['porosity_dir'], cache=PropertyCache(property_cache_dir))
+    raise ValueError(f'Unknown reservoir type {job["reservoir_type"]}...')
+
+
+def job_spacing(job):
+    """The cell size of a job, the given dx, dy and dz or the spacing divided by the number of cells
+
+    :param job: the parameters of the job
+    :type job: dict
+    :return:
+        dx, dy and dz
+    """
+    return tuple(job[d] if job[d] is not None else job[f'{axis}_spacing'] / job[f'n{axis}']
+                 for d, axis in (('dx', 'x'), ('dy', 'y'), ('dz', 'z')))
+
+
+def run_job(job):
+    """Run the forward simulation of one job, this is the function which is executed in the worker processes
+
+    :param job: the parameters of the job, see expand_scenario
+    :type job: dict
+    :return:
+        time data of the simulation
+    :rtype: pd.DataFrame
+    """
+    # darts is only imported where the simulations run
+    from darts.engines import redirect_darts_output
+    from src.model import Model
+    from src.operator_cache import OperatorCache
+
+    poro, perm = job_fields(job)
+    dx, dy, dz = job_spacing(job)
+    redirect_darts_output('log.txt')
+    proxy_model = Model(total_time=job['total_time'], set_nx=job['nx'], set_ny=job['ny'], set_nz=job['nz'],
+                        set_dx=dx, set_dy=dy, set_dz=dz, perms=perm, poro=poro,
+                        report_time_step=job['report_time'], overburden=job['overburden'],
+                        operator_cache=OperatorCache(operator_cache_dir))
+    proxy_model.init()
+    # a job whose input did not change since an earlier run is read from the result memo
+    proxy_model.run(export_to_vtk=False, memo=ResultMemo(result_memo_dir, max_bytes=result_memo_bytes))
+
+    return pd.DataFrame.from_dict(proxy_model.physics.engine.time_data)
+
+
+def write_result(job, td, backend, path):
+    """Write the result of a job to a backend, every scenario gets its own directory
+
+    :param job: the parameters of the job
+    :type job: dict
+    :param td: time data of the simulation
+    :type td: pd.DataFrame
+    :param backend: 'store' writes the output column as the partition of the job in a ResultStore, 'csv' writes the
+        whole time data, both replace an earlier result of the job
+    :type backend: str
+    :param path: the directory of the results
+    :type path: str
+    :return:
+        the path of the written result
+    :rtype: str
+    """
+    directory = os.path.join(path, job['scenario'])
+    if backend == 'store':
+        params = {key: value for key, value in job.items() if key not in ('name', 'scenario')}
+        return ResultStore(directory).append(job['name'], td[job['output']], index=td['time'], partition=job['name'],
+                                             **params)
+    if backend == 'csv':
+        os.makedirs(directory, exist_ok=True)
+        output_path = os.path.join(directory, f'{job["name"]}.csv')
+        td.to_csv(output_path, index=False)
+        return output_path
+    raise ValueError(f'Unknown backend {backend}...')
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.linalg import inv
+from scipy.spatial.distance import cdist
+
+
+class KrigingEngine:
+    """Kriging with a gstools covariance model which reuses the inverted kriging matrix
+
+    The kriging weights only depend on the sample locations and the variogram, so the kriging matrix is inverted
+    once and the weights of a block of target points are shared by every layer which is sampled at the same
+    locations. The system is the one pykrige's UniversalKriging solves without drift terms, i.e. ordinary kriging
+    with the unbiasedness constraint, with the anisotropy of the covariance model applied to the coordinates.
+    """
+
+    def __init__(self, data_x, data_y, cov_model, eps=1e-10):
+        """The constructor of the engine
+
+        :param data_x: x coordinates of the samples
+        :type data_x: np.ndarray
+        :param data_y: y coordinates of the samples
+        :type data_y: np.ndarray
+        :param cov_model: 2D gstools covariance model, e.g. Gaussian(dim=2, len_scale=30, anis=6.8, angles=-0.2)
+        :type cov_model: gstools.CovModel
+        :param eps: distances below eps are treated as the sample location itself
+        :type eps: float
+        """
+        if cov_model.dim != 2:
+            raise ValueError('The kriging engine only supports 2D covariance models...')
+        self.cov_model = cov_model
+        self.eps = eps
+        self.data = self._adjust(np.asarray(data_x, dtype=float), np.asarray(data_y, dtype=float))
+        n = len(self.data)
+
+        a = np.zeros((n + 1, n + 1))
+        a[:n, :n] = -self.cov_model.variogram(cdist(self.data, self.data))
+        np.fill_diagonal(a, 0.0)
+        a[:n, n] = 1.0
+        a[n, :n] = 1.0
+        # only the rows of the sample weights are needed, the last row is the Lagrange multiplier
+        self.inverse = inv(a)[:n]
+
+    def _adjust(self, x, y):
+        """Rotate and stretch the coordinates like pykrige does for the anisotropy of the covariance model"""
+        angle = -self.cov_model.angles[0]
+        adjusted_x = np.cos(angle) * x - np.sin(angle) * y
+        adjusted_y = (np.sin(angle) * x + np.cos(angle) * y) / self.cov_model.anis[0]
+        return np.column_stack([adjusted_x, adjusted_y])
+
+    def weights(self, x, y):
+        """The kriging weights of the samples for the given target points
+
+        :param x: x coordinates of the target points
+        :type x: np.ndarray
+        :param y: y coordinates of the target points
+        :type y: np.ndarray
+        :return:
+            the weights with shape (number of samples, number of target points)
+        :rtype: np.ndarray
+        """
+        n = len(self.data)
+        distances = cdist(self.data, self._adjust(np.ravel(x).astype(float), np.ravel(y).astype(float)))
+        b = np.ones((n + 1, distances.shape[1]))
+        b[:n] = -self.cov_model.variogram(distances)
+        # the estimate at a sample location is the sample value itself
+        b[:n][distances <= self.eps] = 0.0
+        return self.inverse @ b
+
+    def execute(self, values, gridx, gridy, chunk_size=65536, n_workers=None):
+        """Krige one or several layers on a grid, the grid is split into chunks which run on a thread pool
+
+        :param values: the sample values with shape (number of samples,) or (number of layers, number of samples)
+        :type values: np.ndarray
+        :param gridx: x coordinates of the grid columns
+        :type gridx: np.ndarray
+        :param gridy: y coordinates of the grid rows
+        :type gridy: np.ndarray
+        :param chunk_size: the number of grid points which are kriged at once
+        :type chunk_size: int
+        :param n_workers: the number of threads, by default as many as there are cores
+        :type n_workers: int
+        :return:
+            the kriged field with shape (ny, nx), or (number of layers, ny, nx) for several layers
+        :rtype: np.ndarray
+        """
+        values = np.asarray(values, dtype=float)
+        layers = np.atleast_2d(values)
+        if layers.shape[1] != len(self.data):
+            raise ValueError('The number of values does not match the number of samples...')
+        x, y = np.meshgrid(np.asarray(gridx, dtype=float), np.asarray(gridy, dtype=float))
+        x = x.ravel()
+        y = y.ravel()
+        z = np.empty((len(layers), len(x)))
+
+        def krige_chunk(start):
+            stop = start + chunk_size
+            z[:, start:stop] = layers @ self.weights(x[start:stop], y[start:stop])
+
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            list(executor.map(krige_chunk, range(0, len(x), chunk_size)))
+
+        z = z.reshape(len(layers), len(gridy), len(gridx))
+        return z if values.ndim > 1 else z[0]
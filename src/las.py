@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# the depth curve of a log is the first of these which is in the log
+DEPTH_COLUMNS = ('DEPTH', 'DEPT')
+# null value of the logs which do not declare one
+DEFAULT_NULL = -999.0
+
+
+def _header_value(line):
+    """Split a header line 'MNEM.UNIT  VALUE : DESCRIPTION' into the mnemonic and the value"""
+    mnemonic, _, rest = line.partition('.')
+    # the unit directly follows the dot and ends at the first space
+    _, _, value = rest.rsplit(':', 1)[0].partition(' ')
+    return mnemonic.strip(), value.strip()
+
+
+def parse_las(path_to_las):
+    """Parse a las file into a DataFrame with one column per curve
+
+    Both LAS 2.0 files with ~Version, ~Well, ~Curve and ~ASCII sections, and plain tables whose first line holds
+    the curve names are supported. The null value of the ~Well section, and -999, are replaced by NaN.
+
+    :param path_to_las: the path to the las file
+    :type path_to_las: str
+    :return:
+        the curves of the log
+    :rtype: pd.DataFrame
+    """
+    with open(path_to_las) as f:
+        first_line = f.readline()
+        while first_line and not first_line.strip():
+            first_line = f.readline()
+        if not first_line.lstrip().startswith('~'):
+            well_log = pd.read_table(path_to_las, delim_whitespace=True)
+            return well_log.replace(DEFAULT_NULL, np.nan)
+
+        section = first_line.lstrip()[1:2].upper()
+        curves = []
+        null_values = [DEFAULT_NULL]
+        values = []
+        for line in f:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#'):
+                continue
+            if stripped.startswith('~'):
+                section = stripped[1:2].upper()
+            elif section == 'C':
+                curves.append(_header_value(stripped)[0])
+            elif section == 'W':
+                mnemonic, value = _header_value(stripped)
+                if mnemonic.upper() == 'NULL' and value:
+                    null_values.append(float(value))
+            elif section == 'A':
+                # the data lines can be wrapped, so the values are read as one stream
+                values.extend(stripped.split())
+
+    if not curves:
+        raise ValueError(f'No curves are defined in {path_to_las}...')
+    data = np.array(values, dtype=float).reshape(-1, len(curves))
+    well_log = pd.DataFrame(data, columns=curves)
+
+    return well_log.replace(null_values, np.nan)
+
+
+def depth_column(columns):
+    """The name of the depth curve among the given curves
+
+    :param columns: the names of the curves
+    :return:
+        the name of the depth curve, or None if the log has no depth curve
+    """
+    for name in DEPTH_COLUMNS:
+        if name in columns:
+            return name
+    return None
+
+
+class LasCache:
+    """Columnar binary cache of las files
+
+    Every las file is parsed once and each curve is stored as a .npy file, which is memory mapped when it is read.
+    The depth curve serves as the index of a depth window, so only the rows and the curves which are asked for are
+    read from disk. A file is converted again when its size or modification time changes.
+    """
+
+    def __init__(self, path):
+        """The constructor of the cache
+
+        :param path: the directory of the cache
+        :type path: str
+        """
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    def _entry(self, path_to_las):
+        """The directory of the cached curves of a las file, the file is converted if it is not in the cache"""
+        stat = os.stat(path_to_las)
+        key = hashlib.sha256(f'{os.path.abspath(path_to_las)}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()
+        entry = os.path.join(self.path, key)
+        if not os.path.isdir(entry):
+            well_log = parse_las(path_to_las)
+            temporary = f'{entry}.{os.getpid()}.tmp'
+            os.makedirs(temporary, exist_ok=True)
+            for i, column in enumerate(well_log.columns):
+                np.save(os.path.join(temporary, f'{i}.npy'), well_log[column].to_numpy(dtype=float))
+            depth = depth_column(well_log.columns)
+            meta = {'source': os.path.abspath(path_to_las), 'columns': [str(c) for c in well_log.columns],
+                    'depth': depth,
+                    'sorted': bool(depth is not None and well_log[depth].is_monotonic_increasing)}
+            with open(os.path.join(temporary, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            try:
+                os.rename(temporary, entry)
+            except OSError:
+                # another process converted the same file in the meantime
+                shutil.rmtree(temporary, ignore_errors=True)
+        return entry
+
+    def columns(self, path_to_las):
+        """The names of the curves of a las file
+
+        :param path_to_las: the path to the las file
+        :return:
+            the names of the curves
+        :rtype: list
+        """
+        with open(os.path.join(self._entry(path_to_las), 'meta.json')) as f:
+            return json.load(f)['columns']
+
+    def read(self, path_to_las, depth_range=None, columns=None):
+        """Read curves of a las file, converting it first if it is not in the cache
+
+        :param path_to_las: the path to the las file
+        :type path_to_las: str
+        :param depth_range: optional (top, bottom) depth window, both ends are included
+        :type depth_range: tuple
+        :param columns: optional names of the curves to read, by default all curves
+        :type columns: list
+        :return:
+            the selected rows and curves of the log
+        :rtype: pd.DataFrame
+        """
+        entry = self._entry(path_to_las)
+        with open(os.path.join(entry, 'meta.json')) as f:
+            meta = json.load(f)
+        all_columns = meta['columns']
+        columns = all_columns if columns is None else list(columns)
+        for column in columns:
+            if column not in all_columns:
+                raise KeyError(f'{column} is not a curve of {path_to_las}...')
+
+        def load(column):
+            return np.load(os.path.join(entry, f'{all_columns.index(column)}.npy'), mmap_mode='r')
+
+        rows = slice(0, len(load(all_columns[0])))
+        if depth_range is not None and meta['depth'] is not None:
+            depth = load(meta['depth'])
+            if meta['sorted']:
+                rows = slice(int(np.searchsorted(depth, depth_range[0], side='left')),
+                             int(np.searchsorted(depth, depth_range[1], side='right')))
+            else:
+                rows = np.flatnonzero((depth_range[0] <= depth) & (depth <= depth_range[1]))
+        # the row numbers of the log are kept as index, like filtering the parsed log would
+        index = pd.RangeIndex(rows.start, rows.stop) if isinstance(rows, slice) else rows
+
+        return pd.DataFrame({column: np.array(load(column)[rows]) for column in columns}, index=index)
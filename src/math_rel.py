@@ -7,6 +7,116 @@ from pykrige.uk import UniversalKriging
 from gstools import Gaussian
 import numpy as np
 
+from src.kriging import KrigingEngine
+from src.random_field import CirculantEmbedding
+
+
+def _average_groups(field, starts, axis=0, method='arithmetic', weights=None, power=1.0):
+    """Average the groups of cells which begin at the given starts along one axis of a field"""
+    n = field.shape[axis]
+    # the weights are broadcast along the other axes
+    weights_shape = [1] * field.ndim
+    weights_shape[axis] = n
+    if weights is None:
+        weights = np.ones(n)
+    weights = np.asarray(weights, dtype=float)
+    if weights.shape != (n,):
+        raise ValueError('The weights do not match the length of the axis...')
+    weights = weights.reshape(weights_shape)
+
+    if method == 'arithmetic':
+        values = field
+    elif method == 'harmonic':
+        values = 1.0 / field
+    elif method == 'geometric':
+        values = np.log(field)
+    elif method == 'power':
+        if power == 0:
+            raise ValueError('The power average with exponent 0 is the geometric average...')
+        values = field ** power
+    else:
+        raise ValueError(f'Unknown averaging method {method}...')
+
+    averages = np.add.reduceat(values * weights, starts, axis=axis)
+    averages /= np.add.reduceat(weights, starts, axis=axis)
+
+    if method == 'harmonic':
+        return 1.0 / averages
+    elif method == 'geometric':
+        return np.exp(averages)
+    elif method == 'power':
+        return averages ** (1.0 / power)
+    return averages
+
+
+def upscale(field, upscaled_amount, axis=0, method='arithmetic', weights=None, power=1.0):
+    """Average consecutive groups of cells along one axis of a field with a segmented reduction
+
+    The n cells are split into exactly upscaled_amount groups whose sizes differ by at most one cell, e.g. 900 cells
+    into 160 groups of 5 or 6 cells.
+
+    :param field: the field to upscale, e.g. a (nz, ny, nx) array
+    :type field: np.ndarray
+    :param upscaled_amount: the number of the groups to upscale to
+    :type upscaled_amount: int
+    :param axis: the axis along which the cells are grouped
+    :type axis: int
+    :param method: 'arithmetic', 'harmonic', 'geometric' or 'power'
+    :type method: str
+    :param weights: optional weights of the cells along the axis, e.g. the layer thicknesses
+    :type weights: np.ndarray
+    :param power: the exponent of the power average, 1 is arithmetic and -1 is harmonic
+    :type power: float
+    :return:
+        the upscaled field which has upscaled_amount groups along the axis
+    :rtype: np.ndarray
+    """
+    field = np.asarray(field, dtype=float)
+    n = field.shape[axis]
+    if upscaled_amount > n or upscaled_amount < 1:
+        raise ValueError('Can not upscale the input, please check upscaled amount...')
+    starts = np.linspace(0, n, upscaled_amount + 1).astype(int)[:-1]
+
+    return _average_groups(field, starts, axis=axis, method=method, weights=weights, power=power)
+
+
+def coarsen(field, shape, method='arithmetic', weights=None, power=1.0):
+    """Block upscale a field to a coarser grid by averaging along every axis which is coarsened
+
+    :param field: the field to upscale, e.g. a (nz, ny, nx) array
+    :type field: np.ndarray
+    :param shape: the number of the groups along each axis, e.g. (nz, ny, nx) of the coarse grid
+    :type shape: tuple
+    :param method: 'arithmetic', 'harmonic', 'geometric' or 'power'
+    :type method: str
+    :param weights: optional weights of the cells along each axis, e.g. (dz, dy, dx), None for equal weights
+    :type weights: tuple
+    :param power: the exponent of the power average
+    :type power: float
+    :return:
+        the upscaled field of the given shape
+    :rtype: np.ndarray
+    """
+    field = np.asarray(field, dtype=float)
+    if len(shape) != field.ndim:
+        raise ValueError('The shape does not match the dimension of the field...')
+    if weights is None:
+        weights = [None] * field.ndim
+    for axis, (n, axis_weights) in enumerate(zip(shape, weights)):
+        if n != field.shape[axis]:
+            field = upscale(field, n, axis=axis, method=method, weights=axis_weights, power=power)
+    assert field.shape == tuple(shape)
+
+    return field
+
+
+def _ceil_group_starts(n, upscaled_amount):
+    """The starts of the groups of ceil(n / upscaled_amount) cells, the last group can be smaller and there can be
+    fewer groups than upscaled_amount"""
+    if upscaled_amount > n:
+        raise ValueError('Can not upscale the input, please check upscaled amount...')
+    return np.arange(0, n, math.ceil(n / upscaled_amount))
+
 
 def harmonic_average(input_array, upscaled_amount):
     """For the given input array, do a harmonic average on the input according to the upscale amount
@@ -16,19 +126,9 @@ def harmonic_average(input_array, upscaled_amount):
     :return:
         the upscaled array
     """
-    if upscaled_amount > len(input_array):
-        raise ValueError('Can not upscale the input, please check upscaled amount...')
-    groups = []
-    group_size = math.ceil(len(input_array) / upscaled_amount)
-    for i in range(0, len(input_array), group_size):
-        group = input_array[i:i + group_size]
-        # Calculate the sum of the reciprocals
-        sum_reciprocals = sum([1.0 / x for x in group])
-        # Calculate the harmonic average
-        harmonic_avg = len(group) / sum_reciprocals
-        groups.append(harmonic_avg)
-
-    return groups
+    input_array = np.asarray(input_array, dtype=float)
+    starts = _ceil_group_starts(len(input_array), upscaled_amount)
+    return _average_groups(input_array, starts, method='harmonic').tolist()
 
 
 def arithmetic_average(input_array, upscaled_amount):
@@ -39,22 +139,141 @@ def arithmetic_average(input_array, upscaled_amount):
     :return:
         the upscaled array
     """
-    if upscaled_amount > len(input_array):
-        raise ValueError('Can not upscale the input, please check upscaled amount...')
-    groups = []
-    group_size = math.ceil(len(input_array) / upscaled_amount)
-    for i in range(0, len(input_array), group_size):
-        group = input_array[i:i + group_size]
-        # Calculate the sum of the input
-        sum_inputs = sum(group)
-        # Calculate the arithmetic average
-        arithmetic_avg = sum_inputs/len(group)
-        groups.append(arithmetic_avg)
+    input_array = np.asarray(input_array, dtype=float)
+    starts = _ceil_group_starts(len(input_array), upscaled_amount)
+    return _average_groups(input_array, starts, method='arithmetic').tolist()
+
+
+def sample_locations(nx, ny, n_sample, seed=1234):
+    """The grid indices at which the samples are placed for kriging
+
+    :param nx: number of the grid in x direction of the kriging grid
+    :param ny: number of the grid in y direction of the kriging grid
+    :param n_sample: the number of the samples
+    :param seed: the seed of the random locations
+    :return:
+        the x and y indices of the samples
+    """
+    np.random.seed(seed)
+    data_idx_x = np.random.randint(nx, size=n_sample)
+    data_idx_y = np.random.randint(ny, size=n_sample)
 
-    return groups
+    return data_idx_x, data_idx_y
 
 
-def apply_kriging(nx, ny, n_sample, poro):
+def porosity_cov_model(dim=2, vertical_anis=0.1):
+    """The covariance model of the porosity which is used for kriging and for the random fields
+
+    :param dim: 2 for the layers, 3 for fields which are also correlated between the layers
+    :param vertical_anis: the ratio of the vertical to the main horizontal length scale of the 3D model
+    :return:
+        the gstools covariance model
+    """
+    if dim == 3:
+        return Gaussian(dim=3, len_scale=30, anis=[6.8, vertical_anis], angles=-0.2, var=0.5, nugget=0.5)
+    return Gaussian(dim=2, len_scale=30, anis=6.8, angles=-0.2, var=0.5, nugget=0.5)
+
+
+def cap_porosity(z):
+    """Cap the kriged porosity in place, values below 0.1 are set to 0.01 and values above 0.4 to 0.4
+
+    :param z: the kriged porosity
+    :return:
+        the capped porosity
+    """
+    z[z < 0.1] = 0.01
+    z[z > 0.4] = 0.4
+
+    return z
+
+
+def krige_layers(nx, ny, layers_poro, target_shape=None, n_workers=None, chunk_size=65536, seed=1234):
+    """Krige several layers whose samples are at the same locations, sharing the kriging weights between the layers
+
+    :param nx: number of the grid in x direction of the kriging grid, e.g. 900
+    :param ny: number of the grid in y direction of the kriging grid, e.g. 900
+    :param layers_poro: the porosity of the samples with shape (number of layers, number of samples)
+    :param target_shape: optional (ny, nx) of the model grid, the kriging is then evaluated directly at the cell
+        centers of the model grid which cover the kriging grid, instead of on the kriging grid itself
+    :param n_workers: the number of threads the grid chunks run on, by default as many as there are cores
+    :param chunk_size: the number of grid points which are kriged at once
+    :param seed: the seed of the sample locations, every seed gives another realization of the field
+    :return:
+        the capped porosity with shape (number of layers, ny, nx) of the kriging grid or of the target shape
+    """
+    layers_poro = np.atleast_2d(np.asarray(layers_poro, dtype=float))
+    data_idx_x, data_idx_y = sample_locations(nx, ny, layers_poro.shape[1], seed=seed)
+    engine = KrigingEngine(data_idx_x, data_idx_y, porosity_cov_model())
+    if target_shape is None:
+        gridx = np.arange(0, nx, 1.0)
+        gridy = np.arange(0, ny, 1.0)
+    else:
+        # the cell centers of the target grid in the index space of the kriging grid, like skimage resize maps them
+        gridx = (np.arange(target_shape[1]) + 0.5) * nx / target_shape[1] - 0.5
+        gridy = (np.arange(target_shape[0]) + 0.5) * ny / target_shape[0] - 0.5
+    z = engine.execute(layers_poro, gridx, gridy, chunk_size=chunk_size, n_workers=n_workers)
+
+    return cap_porosity(z)
+
+
+def simulate_layers(nx, ny, layers_poro, target_shape=None, seed=None, layer_spacing=None, n_workers=None,
+                    location_seed=1234):
+    """Simulate the porosity of several layers as one 3D Gaussian random field which is conditioned on the samples
+
+    The unconditional field is generated with FFTs by circulant embedding of porosity_cov_model(dim=3), and scaled to
+    the standard deviation of the samples. It is conditioned by adding the kriged residual between the samples and the
+    field at the sample locations, so the conditional field honours the samples like krige_layers and varies between
+    them with the covariance of the model instead of being smooth.
+
+    :param nx: number of the grid in x direction of the kriging grid, e.g. 900
+    :param ny: number of the grid in y direction of the kriging grid, e.g. 900
+    :param layers_poro: the porosity of the samples with shape (number of layers, number of samples)
+    :param target_shape: optional (ny, nx) of the model grid, the field is then generated directly at the cell
+        centers of the model grid, see krige_layers
+    :param seed: the seed of the field, every seed gives another realization
+    :param layer_spacing: the distance between the layers in cells of the kriging grid, by default the 100 m
+        thickness of the reservoir divided by the layers, in cells of 5 m
+    :param n_workers: the number of threads of the FFTs and of the kriging
+    :param location_seed: the seed of the sample locations, see sample_locations
+    :return:
+        the capped porosity with shape (number of layers, ny, nx) of the kriging grid or of the target shape
+    """
+    layers_poro = np.atleast_2d(np.asarray(layers_poro, dtype=float))
+    n_layers = len(layers_poro)
+    data_idx_x, data_idx_y = sample_locations(nx, ny, layers_poro.shape[1], seed=location_seed)
+    if target_shape is None:
+        target_shape = (ny, nx)
+    if layer_spacing is None:
+        layer_spacing = 100 / n_layers / 5
+    # the cell centers of the target grid in the index space of the kriging grid
+    gridx = (np.arange(target_shape[1]) + 0.5) * nx / target_shape[1] - 0.5
+    gridy = (np.arange(target_shape[0]) + 0.5) * ny / target_shape[0] - 0.5
+
+    if n_layers > 1:
+        generator = CirculantEmbedding(porosity_cov_model(dim=3), (n_layers,) + tuple(target_shape),
+                                       spacing=(layer_spacing, ny / target_shape[0], nx / target_shape[1]),
+                                       n_workers=n_workers)
+        field = generator.sample(np.random.default_rng(seed))
+    else:
+        generator = CirculantEmbedding(porosity_cov_model(), target_shape,
+                                       spacing=(ny / target_shape[0], nx / target_shape[1]), n_workers=n_workers)
+        field = generator.sample(np.random.default_rng(seed))[None]
+    cov_model = porosity_cov_model()
+    # the field has the variance of the covariance model, it is scaled to the spread of the samples
+    field *= np.std(layers_poro) / np.sqrt(cov_model.var + cov_model.nugget)
+
+    # the field at the cells which contain the samples
+    cell_x = np.clip(np.round((data_idx_x + 0.5) * target_shape[1] / nx - 0.5).astype(int), 0, target_shape[1] - 1)
+    cell_y = np.clip(np.round((data_idx_y + 0.5) * target_shape[0] / ny - 0.5).astype(int), 0, target_shape[0] - 1)
+    residual = layers_poro - field[:, cell_y, cell_x]
+    # the weights of ordinary kriging sum to one, so the mean of the samples is carried by the kriged residual
+    engine = KrigingEngine(data_idx_x, data_idx_y, cov_model)
+    field += engine.execute(residual, gridx, gridy, n_workers=n_workers)
+
+    return cap_porosity(field)
+
+
+def apply_kriging(nx, ny, n_sample, poro, target_shape=None, n_workers=None, seed=1234):
     """Apply kriging to generate a large scope of porosity values for the given dimension,
     the number of samples, and the original values
 
@@ -62,14 +281,18 @@ def apply_kriging(nx, ny, n_sample, poro):
     :param ny: number of the grid in y direction of the final grid for krigining interpolation
     :param n_sample: the number of the samples which can be used
     :param poro: the original porosity values which have the same size as the n_sample
+    :param target_shape: optional (ny, nx) of the model grid to evaluate the kriging on directly, see krige_layers
+    :param n_workers: the number of threads which are used when the target shape is given
+    :param seed: the seed of the sample locations, every seed gives another realization of the field
     :return:
     """
+    if target_shape is not None:
+        return krige_layers(nx, ny, [poro[:n_sample]], target_shape=target_shape, n_workers=n_workers, seed=seed)[0]
+
     Kriging_switch = 1  # 0 --- ordinary kriging; 1 --- universal kriging
 
-    np.random.seed(1234)
     # n_sample = 40  # set 1000 samples to test if the code is correct
-    data_idx_x = np.random.randint(nx, size=n_sample)
-    data_idx_y = np.random.randint(ny, size=n_sample)
+    data_idx_x, data_idx_y = sample_locations(nx, ny, n_sample, seed=seed)
 
     # data_poro = 0.225 * (1 + 0.15 * np.random.randn(n_sample))  # generate Gaussian poro of N~(0.225，0.15)
     # poro_temp = poro.reshape((ny, nx))
@@ -91,7 +314,7 @@ def apply_kriging(nx, ny, n_sample, poro):
     data = np.array(data)
     gridx = gridx.astype(float)
     gridy = gridy.astype(float)
-    cov_model = Gaussian(dim=2, len_scale=30, anis=6.8, angles=-0.2, var=0.5, nugget=0.5)
+    cov_model = porosity_cov_model()
     if Kriging_switch == 0:
         OK = OrdinaryKriging(data[:, 0], data[:, 1], data[:, 2], cov_model)
         z, ss = OK.execute('grid', gridx, gridy)
@@ -99,8 +322,7 @@ def apply_kriging(nx, ny, n_sample, poro):
         UK = UniversalKriging(data[:, 0], data[:, 1], data[:, 2], cov_model)
         z, ss = UK.execute('grid', gridx, gridy)
 
-    z[z < 0.1] = 0.01
-    z[z > 0.4] = 0.4
+    cap_porosity(z)
 
     # smoothen the sample point
     for ii, sample in enumerate(data):
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import time
+import zipfile
+
+import numpy as np
+
+from src.checkpoint import TIME_DATA_PREFIX
+
+# part of every key, increase it when the model changes in a way its inputs do not show, e.g. new constants
+MEMO_VERSION = 1
+# prefix of the recorded fields in an entry
+RECORDED_PREFIX = 'recorded/'
+
+
+def array_digest(values):
+    """The sha256 hash of the type, the shape and the content of an array
+
+    :param values: the array
+    :type values: np.ndarray
+    :return:
+        the hex digest of the array
+    :rtype: str
+    """
+    values = np.ascontiguousarray(values)
+    digest = hashlib.sha256(f'{values.dtype.str}{values.shape}'.encode())
+    digest.update(memoryview(values).cast('B'))
+    return digest.hexdigest()
+
+
+def _canonical(value):
+    """The value in a form which json writes in a stable way, arrays are replaced by their digest"""
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return {'array': array_digest(value)}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, slice):
+        return {'slice': [value.start, value.stop, value.step]}
+    return value
+
+
+def input_hash(description):
+    """The stable hash of the complete input of a run, equal inputs have equal hashes in every process
+
+    :param description: the input of the run, nested dicts, lists, numbers, strings and arrays, e.g. from
+        Model.memo_input
+    :type description: dict
+    :return:
+        the hex digest of the input
+    :rtype: str
+    """
+    document = json.dumps({'version': MEMO_VERSION, 'input': _canonical(description)}, sort_keys=True)
+    return hashlib.sha256(document.encode()).hexdigest()
+
+
+def memo_key(model_input, recorder=None, monitor=None):
+    """The key of a run, the input of the model together with the options of the run which change its result
+
+    :param model_input: the input of the model, e.g. from Model.memo_input
+    :type model_input: dict
+    :param recorder: optional StateRecorder of the run, its cells and fields are part of the key
+    :type recorder: StateRecorder
+    :param monitor: optional ConvergenceMonitor of the run, the descriptions of its quantities and its tolerances
+        are part of the key. A quantity is a function, so it has to describe what it computes in a description
+        attribute, like production_temperature and temperature_spread do
+    :type monitor: ConvergenceMonitor
+    :return:
+        the key of the run, or None if a quantity of the monitor has no description and the run can not be keyed
+    :rtype: str
+    """
+    description = {'model': model_input}
+    if recorder is not None:
+        description['recorder'] = {'cells': recorder.cells, 'fields': recorder.fields}
+    if monitor is not None:
+        quantities = {name: getattr(quantity, 'description', None) for name, quantity in monitor.quantities.items()}
+        if any(quantity is None for quantity in quantities.values()):
+            return None
+        description['monitor'] = {'quantities': quantities, 'tolerance': monitor.tolerance,
+                                  'window': monitor.window, 'min_time': monitor.min_time}
+    return input_hash(description)
+
+
+class ResultMemo:
+    """On-disk cache of the results of finished runs, keyed by the hash of their complete input
+
+    An entry holds the final state and the time data of a run, the fields of its recorder and the stop of its
+    monitor, so that a run with the same input is replaced by reading the entry. Entries which are not used for
+    ``max_age`` seconds, and the least recently used entries beyond ``max_bytes``, are evicted.
+    """
+
+    def __init__(self, path, max_bytes=None, max_age=None):
+        """The constructor of the cache
+
+        :param path: the directory of the cache
+        :type path: str
+        :param max_bytes: the maximum size of the cache in bytes, no limit by default
+        :type max_bytes: int
+        :param max_age: the maximum time in seconds since an entry was used, no limit by default
+        :type max_age: float
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(self.path, exist_ok=True)
+
+    def entry_path(self, key):
+        """The path of the file of an entry"""
+        return os.path.join(self.path, f'{key}.npz')
+
+    def get(self, key):
+        """Read an entry
+
+        :param key: the key of the entry
+        :type key: str
+        :return:
+            the state of the run like Model.checkpoint_state, the recorded 'times' and fields, and the monitor stop
+            under 'stop_time' and 'stop_reason', or None if the entry is not in the cache
+        :rtype: dict
+        """
+        path = self.entry_path(key)
+        # a missing, truncated or otherwise corrupt entry is a miss
+        try:
+            with np.load(path) as f:
+                entry = json.loads(str(f['settings']))
+                entry['X'] = f['X']
+                entry['t'] = float(f['t'])
+                entry['time_data'] = {name[len(TIME_DATA_PREFIX):]: f[name].tolist() for name in f.files
+                                      if name.startswith(TIME_DATA_PREFIX)}
+                entry['recorded'] = {name[len(RECORDED_PREFIX):]: f[name] for name in f.files
+                                     if name.startswith(RECORDED_PREFIX)}
+            # the modification time of the entry marks its last use
+            os.utime(path)
+        except (FileNotFoundError, OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # another process can evict the entry at any time
+            return None
+
+        return entry
+
+    def put(self, key, state, recorded=None, stop_time=None, stop_reason=None):
+        """Write an entry and evict old entries
+
+        :param key: the key of the entry
+        :type key: str
+        :param state: the state of the finished run, e.g. from Model.checkpoint_state
+        :type state: dict
+        :param recorded: optional recorded 'times' and fields of the run
+        :type recorded: dict
+        :param stop_time: optional time at which the monitor stopped the run
+        :type stop_time: float
+        :param stop_reason: optional reason why the monitor stopped the run
+        :type stop_reason: str
+        :return:
+            None
+        """
+        arrays = {'X': np.asarray(state['X'], dtype=float), 't': np.float64(state['t'])}
+        for name, values in state.get('time_data', {}).items():
+            arrays[TIME_DATA_PREFIX + name] = np.asarray(values, dtype=float)
+        for name, values in (recorded or {}).items():
+            arrays[RECORDED_PREFIX + name] = np.asarray(values)
+        settings = {key: value for key, value in state.items() if key not in ('X', 't', 'time_data')}
+        settings.update(stop_time=stop_time, stop_reason=stop_reason)
+        arrays['settings'] = np.array(json.dumps(settings))
+        # write under a temporary name first, so that readers never see a half written entry
+        temporary = f'{self.entry_path(key)}.{os.getpid()}.tmp.npz'
+        np.savez(temporary, **arrays)
+        os.replace(temporary, self.entry_path(key))
+        self.evict(keep=key)
+
+    def load(self, key, model, recorder=None, monitor=None):
+        """Replace a run by its entry, the model, the recorder and the monitor end up as after the run
+
+        :param key: the key of the run, see memo_key
+        :type key: str
+        :param model: the initialized model, it has to provide restore(state) like Model does
+        :param recorder: optional StateRecorder which is given the recorded steps of the entry
+        :type recorder: StateRecorder
+        :param monitor: optional ConvergenceMonitor which is given the stop of the entry
+        :type monitor: ConvergenceMonitor
+        :return:
+            whether the entry was in the cache
+        :rtype: bool
+        """
+        entry = self.get(key)
+        if entry is None:
+            return False
+        if recorder is not None:
+            recorded = entry['recorded']
+            for row, step_time in enumerate(recorded['times']):
+                recorder.record(step_time, {field: recorded[field][row] for field in recorder.fields})
+        if monitor is not None:
+            monitor.stop_time = entry['stop_time']
+            monitor.stop_reason = entry['stop_reason']
+        model.restore(entry)
+
+        return True
+
+    def save(self, key, model, recorder=None, monitor=None):
+        """Write the result of a finished run
+
+        :param key: the key of the run, see memo_key
+        :type key: str
+        :param model: the model after the run, it has to provide checkpoint_state() like Model does
+        :param recorder: optional StateRecorder of the run
+        :type recorder: StateRecorder
+        :param monitor: optional ConvergenceMonitor of the run
+        :type monitor: ConvergenceMonitor
+        :return:
+            None
+        """
+        recorded = None
+        if recorder is not None:
+            recorded = {'times': recorder.times[:recorder.n_recorded]}
+            recorded.update({field: recorder.result(field) for field in recorder.fields})
+        stop_time = monitor.stop_time if monitor is not None else None
+        stop_reason = monitor.stop_reason if monitor is not None else None
+        self.put(key, model.checkpoint_state(), recorded, stop_time, stop_reason)
+
+    def evict(self, keep=None):
+        """Remove the entries which are too old and the least recently used entries above the size limit
+
+        :param keep: the key of an entry which is never evicted
+        :type keep: str
+        :return:
+            None
+        """
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.npz') or name.endswith('.tmp.npz'):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-len('.npz')]))
+        entries.sort(reverse=True)
+
+        now = time.time()
+        total = 0
+        for last_used, size, key in entries:
+            total += size
+            too_old = self.max_age is not None and now - last_used > self.max_age
+            too_large = self.max_bytes is not None and total > self.max_bytes
+            if key != keep and (too_old or too_large):
+                try:
+                    os.remove(self.entry_path(key))
+                except FileNotFoundError:
+                    pass
+                total -= size
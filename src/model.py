@@ -1,14 +1,23 @@
+from contextlib import nullcontext, suppress
+
 from darts.models.physics.geothermal import Geothermal
 from darts.models.reservoirs.struct_reservoir import StructReservoir
 from darts.models.darts_model import DartsModel
 from darts.models.physics.iapws.iapws_property_vec import _Backward1_T_Ph_vec
 import numpy as np
 
+from src.memo import memo_key
+from src.operator_cache import operator_cache_key
+from src.petrophysics import pad_layers
+from src.recorder import StateRecorder
+from src.timeseries_export import TimeSeriesExporter
+
 
 class Model(DartsModel):
 
     def __init__(self, total_time, set_nx, set_ny, set_nz, perms, poro,
-                 set_dx, set_dy, set_dz, report_time_step, overburden):
+                 set_dx, set_dy, set_dz, report_time_step, overburden, initial_state=None,
+                 operator_cache=None):
         """The constructor of the model
 
         :param total_time: the total simulation time
@@ -19,9 +28,10 @@ class Model(DartsModel):
         :type set_ny: int
         :param set_nz: the number of grid blocks in z direction
         :type set_nz: int
-        :param perms: permeability values of each grid
+        :param perms: permeability values of each grid, or of each layer, they are copied once into float64, so they
+            can be staged e.g. as float32
         :type perms: np.ndarray
-        :param poro: porosity values of each grid
+        :param poro: porosity values of each grid, or of each layer, they are copied once into float64
         :type poro: np.ndarray
         :param set_dx: the cartesian resolution in x direction
         :type set_dx: float
@@ -33,6 +43,12 @@ class Model(DartsModel):
         :type report_time_step: int
         :param overburden: the number of overburden layers
         :type overburden: int
+        :param initial_state: optional pressure and enthalpy of each reservoir cell, e.g. from warm_start_state, instead
+            of the uniform initial state
+        :type initial_state: dict
+        :param operator_cache: optional cache of the operator tables of the physics, which are then loaded from and
+            saved to disk instead of being computed again for every model
+        :type operator_cache: OperatorCache
         """
         # call base class constructor
         super().__init__()
@@ -40,17 +56,21 @@ class Model(DartsModel):
         self.timer.node["initialization"].start()
         # parameters for the reservoir
         (nx, ny, nz) = (set_nx, set_ny, set_nz)
-        self.perm = perms
-        self.poro = poro
         # add more layers above the reservoir
         underburden = overburden
         nz += (overburden+underburden)
-        overburden_prop = np.ones(set_nx * set_ny * overburden) * 1e-5
-        underburden_prop = np.ones(set_nx * set_ny * underburden) * 1e-5
-        self.perm = np.concatenate([overburden_prop, self.perm, underburden_prop])
-        self.poro = np.concatenate([overburden_prop, self.poro, underburden_prop])
+        # the fields with the overburden and underburden layers are written into one array each
+        self.perm = pad_layers(perms, set_nx * set_ny, overburden, underburden, 1e-5, n_layers=set_nz)
+        self.poro = pad_layers(poro, set_nx * set_ny, overburden, underburden, 1e-5, n_layers=set_nz)
         self.report_time = report_time_step
+        self.overburden = overburden
+        self.initial_state = initial_state
+        # the cell size (dz, dy, dx) of the grid
+        self.spacing = (set_dz, set_dy, set_dx)
         # add more layers above or below the reservoir
+        # permx and permy share the padded perm, permz holds other values and is the one field which has to be
+        # allocated here, computing it in place would overwrite the horizontal permeability and the perm which the
+        # heat capacity, the conduction and the memo key are built from below
         self.reservoir = StructReservoir(self.timer, nx=nx, ny=ny, nz=nz, dx=set_dx, dy=set_dy, dz=set_dz,
                                          permx=self.perm, permy=self.perm, permz=0.1*self.perm, poro=self.poro,
                                          depth=2300)
@@ -86,6 +106,9 @@ class Model(DartsModel):
         self.uniform_pressure = 200
         self.inj_temperature = 300
         self.prod_temperature = 350
+        # the water rates of the wells
+        self.inj_rate = 7500
+        self.prod_rate = 7500
 
         # rock heat capacity and rock thermal conduction
         hcap = np.array(self.reservoir.mesh.heat_capacity, copy=False)
@@ -96,8 +119,16 @@ class Model(DartsModel):
         rcond[self.perm <= 1e-5] = 2.2 * 86.4  # kJ/m/day/K
         rcond[self.perm > 1e-5] = 3 * 86.4
 
-        self.physics = Geothermal(timer=self.timer, n_points=64, min_p=1, max_p=1000,
-                                  min_e=10, max_e=50000, mass_rate=False, cache=False)
+        # the operator tables only depend on these parameters
+        self.physics_params = dict(n_points=64, min_p=1, max_p=1000, min_e=10, max_e=50000, mass_rate=False)
+        self.operator_cache = operator_cache
+        self.operator_cache_key = operator_cache_key('Geothermal', **self.physics_params)
+        # with cache=True the physics keeps its interpolators, which the operator cache fills and saves
+        self.physics = Geothermal(timer=self.timer, **self.physics_params, cache=operator_cache is not None)
+        if operator_cache is not None:
+            operator_cache.load(self.physics, self.operator_cache_key)
+            # the operator cache saves the tables, darts would pickle them into the working directory
+            self.physics.cache = False
 
         # timestep parameters
         self.params.first_ts = 1e-5
@@ -121,6 +152,11 @@ class Model(DartsModel):
         # self.physics.set_nonuniform_initial_conditions(self.reservoir.mesh, pressure_grad=100, temperature_grad=30)
         self.physics.set_uniform_initial_conditions(self.reservoir.mesh, uniform_pressure=self.uniform_pressure,
                                                    uniform_temperature=self.prod_temperature)
+        if self.initial_state is not None:
+            # the well blocks keep the uniform state, only the reservoir blocks are replaced
+            nb = self.reservoir.mesh.n_res_blocks
+            np.array(self.reservoir.mesh.pressure, copy=False)[:nb] = self.initial_state['pressure']
+            np.array(self.reservoir.mesh.enthalpy, copy=False)[:nb] = self.initial_state['enthalpy']
 
     # T=300K, P=200bars, the enthalpy is 1914.13 [kJ/kg]
     def set_boundary_conditions(self):
@@ -130,16 +166,165 @@ class Model(DartsModel):
             None
         :rtype:
         """
+        self.set_well_controls()
+
+    def set_well_controls(self):
+        """Set the rate controls of the wells from inj_rate, prod_rate and inj_temperature
+
+        :return:
+            None
+        """
         for _, w in enumerate(self.reservoir.wells):
             if 'I' in w.name:
-                w.control = self.physics.new_rate_water_inj(7500, self.inj_temperature)
+                w.control = self.physics.new_rate_water_inj(self.inj_rate, self.inj_temperature)
                 # w.constraint = self.physics.new_bhp_water_inj(200, self.inj_temperature)
             else:
-                w.control = self.physics.new_rate_water_prod(7500)
+                w.control = self.physics.new_rate_water_prod(self.prod_rate)
             #     w.control = self.physics.new_mass_rate_water_inj(417000, 1914.13)
             # else:
             #     w.control = self.physics.new_mass_rate_water_prod(417000)
 
+    def checkpoint_state(self):
+        """The state of the run which is needed to continue it, see Checkpointer
+
+        :return:
+            the state vector, the time, the time data, the well controls and the grid of the run
+        :rtype: dict
+        """
+        return {'X': np.array(self.physics.engine.X, copy=True), 't': self.physics.engine.t,
+                'time_data': {name: list(values) for name, values in self.physics.engine.time_data.items()},
+                'inj_rate': self.inj_rate, 'prod_rate': self.prod_rate, 'inj_temperature': self.inj_temperature,
+                'shape': [self.reservoir.nz, self.reservoir.ny, self.reservoir.nx], 'spacing': list(self.spacing),
+                'overburden': self.overburden}
+
+    def restore(self, state):
+        """Continue the run from a saved state, this is called after init
+
+        :param state: the state of the run, e.g. a loaded checkpoint
+        :type state: dict
+        :return:
+            None
+        """
+        X = np.array(self.physics.engine.X, copy=False)
+        if len(X) != len(state['X']):
+            raise ValueError('The checkpoint does not match the grid of the model...')
+        X[:] = state['X']
+        self.physics.engine.t = state['t']
+        self.physics.engine.time_data = state['time_data']
+        self.inj_rate = state['inj_rate']
+        self.prod_rate = state['prod_rate']
+        self.inj_temperature = state['inj_temperature']
+        self.set_well_controls()
+
+    def memo_input(self):
+        """The complete input of the run which determines its result, see ResultMemo
+
+        :return:
+            the grid, the property fields, the wells and their controls, the time step and solver parameters, the
+            physics settings and the initial state
+        :rtype: dict
+        """
+        initial_state = None
+        if self.initial_state is not None:
+            initial_state = {name: np.asarray(values) for name, values in self.initial_state.items()}
+        return {'shape': [self.reservoir.nz, self.reservoir.ny, self.reservoir.nx], 'spacing': list(self.spacing),
+                'overburden': self.overburden, 'perm': self.perm, 'poro': self.poro,
+                'wells': {'iw': self.iw, 'jw': self.jw, 'well_index': self.well_index},
+                'controls': {'inj_rate': self.inj_rate, 'prod_rate': self.prod_rate,
+                             'inj_temperature': self.inj_temperature, 'prod_temperature': self.prod_temperature,
+                             'uniform_pressure': self.uniform_pressure},
+                'time': {'runtime': self.runtime, 'report_time': self.report_time},
+                'params': {name: getattr(self.params, name) for name in
+                           ('first_ts', 'mult_ts', 'max_ts', 'tolerance_newton', 'tolerance_linear')},
+                'physics': self.physics_params, 'initial_state': initial_state}
+
+    def cell_data(self, fields=('Temperature', 'Pressure', 'Perm'), cells=None):
+        """The values of the reservoir cells for the given fields, only the requested fields are computed
+
+        :param fields: the names of the fields, 'Temperature', 'Pressure' and 'Perm' are available
+        :type fields: tuple
+        :param cells: optional selection of the cells, a slice selects through views of the state without copies
+        :type cells: slice
+        :return:
+            the values of each selected cell for every field
+        :rtype: dict
+        """
+        X = np.array(self.physics.engine.X, copy=False)
+        nb = self.reservoir.mesh.n_res_blocks
+        if cells is None:
+            cells = slice(0, nb)
+        if isinstance(cells, slice):
+            start, stop, _ = cells.indices(nb)
+            press = X[2 * start:2 * stop:2]
+            enthalpy = X[2 * start + 1:2 * stop:2]
+        else:
+            press = X[0:2 * nb:2][cells]
+            enthalpy = X[1:2 * nb:2][cells]
+        data = {}
+        for field in fields:
+            if field == 'Temperature':
+                data[field] = _Backward1_T_Ph_vec(press / 10, enthalpy / 18.015)
+            elif field == 'Pressure':
+                data[field] = press
+            elif field == 'Perm':
+                data[field] = np.asarray(self.reservoir.global_data['permx'])[cells]
+            else:
+                raise ValueError(f'Unknown field {field}...')
+
+        return data
+
+    def report_steps(self, start=0.0):
+        """The time steps between the report times of the run
+
+        :param start: the time from which the run continues, the report steps which already finished are skipped
+        :type start: float
+        :return:
+            the length of each report step
+        :rtype: np.ndarray
+        """
+        time_step = self.report_time
+        even_end = int(self.runtime / time_step) * time_step
+        time_step_arr = np.ones(int(self.runtime / time_step)) * time_step
+        if self.runtime - even_end > 0:
+            time_step_arr = np.append(time_step_arr, self.runtime - even_end)
+        if start > 0:
+            ends = np.cumsum(time_step_arr)
+            remaining = ends > start + 1e-8 * self.runtime
+            time_step_arr = np.diff(np.concatenate([[start], ends[remaining]]))
+
+        return time_step_arr
+
+    def state_recorder(self, cells, fields=('Temperature',), path=None):
+        """Make a recorder for the initial state and every report step of the run, see StateRecorder
+
+        :param cells: the recorded cells, e.g. layer_cells(nx, ny, 1) for the top layer
+        :type cells: slice
+        :param fields: the names of the recorded fields
+        :type fields: tuple
+        :param path: optional directory for memory mapped arrays
+        :type path: str
+        :return:
+            the recorder which can be given to run
+        :rtype: StateRecorder
+        """
+        return StateRecorder(cells, len(self.report_steps()) + 1, fields=fields, path=path)
+
+    def time_series_exporter(self, path, fields=('Temperature', 'Pressure'), every=1, **kwargs):
+        """Make a time series exporter for the grid of this model, see TimeSeriesExporter
+
+        :param path: the path of the output without extension
+        :type path: str
+        :param fields: the names of the fields to write
+        :type fields: tuple
+        :param every: only every Nth report step is written
+        :type every: int
+        :return:
+            the exporter which can be given to run
+        :rtype: TimeSeriesExporter
+        """
+        shape = (self.reservoir.nz, self.reservoir.ny, self.reservoir.nx)
+        return TimeSeriesExporter(path, shape, self.spacing, fields=fields, every=every, **kwargs)
+
     def export_pro_vtk(self, file_name):
         """Export vtk data for each time step or given timestep for the given file name
 
@@ -149,13 +334,7 @@ class Model(DartsModel):
             None
         :rtype:
         """
-        X = np.array(self.physics.engine.X, copy=False)
-        nb = self.reservoir.mesh.n_res_blocks
-        temp = _Backward1_T_Ph_vec(X[0:2 * nb:2] / 10, X[1:2 * nb:2] / 18.015)
-        press = X[0:2 * nb:2]
-
-        local_cell_data = {'Temperature': temp, 'Pressure': press,
-                           'Perm': self.reservoir.global_data['permx']}
+        local_cell_data = self.cell_data()
         self.export_vtk(local_cell_data=local_cell_data, file_name=file_name)
 
     def export_data(self):
@@ -172,13 +351,34 @@ class Model(DartsModel):
         press = X[0:2 * nb:2]
         return press, temp, self.reservoir.global_data['permx']
 
-    def run(self, export_to_vtk=False, file_name='data'):
+    def run(self, export_to_vtk=False, file_name='data', exporter=None, recorder=None, monitor=None,
+            checkpointer=None, telemetry=None, memo=None):
         """Run the simulation with the option to output the vtk and the vtk file name
 
         :param export_to_vtk: boolean value to decide if the vtk data is exported
         :type export_to_vtk: bool
         :param file_name: the name of the vtk file
         :type file_name: str
+        :param exporter: optional time series exporter, e.g. from time_series_exporter, which is given the initial
+            state and the state after every report step and is closed at the end of the run
+        :type exporter: TimeSeriesExporter
+        :param recorder: optional state recorder, e.g. from state_recorder, which records the selected cells of the
+            initial state and of the state after every report step
+        :type recorder: StateRecorder
+        :param monitor: optional convergence monitor, the run stops before the total time once the monitored
+            quantities are steady, and the monitor records why and when the run stopped
+        :type monitor: ConvergenceMonitor
+        :param checkpointer: optional checkpointer which saves the state after every report step, a run which was
+            restored from a checkpoint continues with the report steps after the time of the checkpoint
+        :type checkpointer: Checkpointer
+        :param telemetry: optional telemetry which records the iterations, the wall time and the memory of every
+            report step and the timer tree of the run
+        :type telemetry: RunTelemetry
+        :param memo: optional cache of the results of finished runs, a run whose input is in the cache is replaced by
+            reading the final state, the time data, the recorded fields and the stop of the monitor from it, unless
+            vtk or a time series is exported, and a finished run is written to it. Runs whose monitor has quantities
+            without a description are not memoized, see memo_key
+        :type memo: ResultMemo
         :return:
             None
         :rtype:
@@ -193,26 +393,64 @@ class Model(DartsModel):
             self.export_vtk(file_name, global_cell_data=self.global_data)
 
         # now we start to run for the time report--------------------------------------------------------------
-        time_step = self.report_time
-        even_end = int(self.runtime / time_step) * time_step
-        time_step_arr = np.ones(int(self.runtime / time_step)) * time_step
-        if self.runtime - even_end > 0:
-            time_step_arr = np.append(time_step_arr, self.runtime - even_end)
+        time_step_arr = self.report_steps(self.physics.engine.t)
+        if telemetry is not None:
+            telemetry.start(self)
+        # the exporter and the telemetry are finished also when the run fails or is read from the memo
+        failed = False
+        try:
+            key = None
+            if memo is not None:
+                # None if a quantity of the monitor can not be keyed, the run is then not memoized
+                key = memo_key(self.memo_input(), recorder=recorder, monitor=monitor)
+                # the exported files need the states of every report step, which are not kept in the cache
+                if (key is not None and not export_to_vtk and exporter is None
+                        and memo.load(key, self, recorder=recorder, monitor=monitor)):
+                    if checkpointer is not None:
+                        # the final state, like the last report step of a run would have saved it
+                        checkpointer.save(self, force=True)
+                    return
+
+            self.export_pro_vtk(file_name)
+            if exporter is not None:
+                # the fields are only computed for the steps the exporter writes
+                def export_fields():
+                    return self.cell_data(exporter.fields or ('Temperature', 'Pressure'))
 
-        self.export_pro_vtk(file_name)
-        for ts in time_step_arr:
-            for _, w in enumerate(self.reservoir.wells):
-                if 'I' in w.name:
-                    w.control = self.physics.new_rate_water_inj(7500, self.inj_temperature)
-                    # w.constraint = self.physics.new_bhp_water_inj(200, self.inj_temperature)
-                else:
-                    w.control = self.physics.new_rate_water_prod(7500)
-                #     w.control = self.physics.new_mass_rate_water_inj(417000, 1914.13)
-                    
-                # else:
-                #     w.control = self.physics.new_mass_rate_water_prod(417000)
-                 
-            self.physics.engine.run(ts)
-            self.physics.engine.report()
-            if export_to_vtk:
-                self.export_pro_vtk(file_name)
\ No newline at end of file
+                exporter.write(self.physics.engine.t, export_fields)
+            if recorder is not None:
+                recorder.record(self.physics.engine.t, self.cell_data(recorder.fields, recorder.cells))
+            for ts in time_step_arr:
+                self.set_well_controls()
+                self.physics.engine.run(ts)
+                self.physics.engine.report()
+                if telemetry is not None:
+                    telemetry.step(self.physics.engine.t, self)
+                if export_to_vtk:
+                    self.export_pro_vtk(file_name)
+                if exporter is not None:
+                    exporter.write(self.physics.engine.t, export_fields)
+                if recorder is not None:
+                    recorder.record(self.physics.engine.t, self.cell_data(recorder.fields, recorder.cells))
+                if checkpointer is not None:
+                    checkpointer.save(self)
+                if monitor is not None and monitor.update(self.physics.engine.t, self):
+                    break
+            if monitor is not None:
+                monitor.finish(self.physics.engine.t)
+            if self.operator_cache is not None:
+                self.operator_cache.save(self.physics, self.operator_cache_key)
+            if key is not None:
+                memo.save(key, self, recorder=recorder, monitor=monitor)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            # an error of finishing them, e.g. the stored error of the writer thread of the exporter, would replace the
+            # error of a failed run, so it is only raised when the run itself succeeded
+            with suppress(Exception) if failed else nullcontext():
+                if telemetry is not None:
+                    telemetry.finish(self)
+            with suppress(Exception) if failed else nullcontext():
+                if exporter is not None:
+                    exporter.close()
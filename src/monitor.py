@@ -0,0 +1,122 @@
+from collections import deque
+
+import numpy as np
+
+
+def production_temperature(model):
+    """The latest temperature of the production well
+
+    :param model: the geothermal model
+    :return:
+        the temperature of the PRD well in K
+    """
+    return model.physics.engine.time_data['PRD : temperature (K)'][-1]
+
+
+# what the quantity computes, which identifies it in the key of a memoized run, see memo_key
+production_temperature.description = {'quantity': 'production_temperature'}
+
+
+def temperature_spread(cells):
+    """A quantity which is the temperature spread of the given cells, e.g. of the top reservoir layer
+
+    :param cells: the cells, e.g. layer_cells(nx, ny, 1)
+    :return:
+        the function which gives the difference between the highest and the lowest temperature of the cells
+    """
+    def spread(model):
+        temperature = model.cell_data(('Temperature',), cells)['Temperature']
+        return np.max(temperature) - np.min(temperature)
+
+    spread.description = {'quantity': 'temperature_spread', 'cells': cells}
+    return spread
+
+
+class ConvergenceMonitor:
+    """Stop a run once the monitored quantities do not change anymore
+
+    The quantities are evaluated after every report step. The run has converged when every quantity changed less than
+    its tolerance over the last ``window`` report steps, i.e. the range of its last window + 1 values is below the
+    tolerance, for arrays in every element.
+    """
+
+    def __init__(self, quantities, tolerance, window=3, min_time=0.0):
+        """The constructor of the monitor
+
+        :param quantities: the monitored quantities, the name and a function of the model which gives the value, a
+            function with a description attribute can be memoized, see memo_key
+        :type quantities: dict
+        :param tolerance: the tolerance of all quantities, or the tolerance of each quantity by name
+        :type tolerance: float
+        :param window: the number of report steps over which the quantities have to be steady
+        :type window: int
+        :param min_time: the run is not stopped before this time
+        :type min_time: float
+        """
+        self.quantities = dict(quantities)
+        if isinstance(tolerance, dict):
+            self.tolerance = dict(tolerance)
+        else:
+            self.tolerance = {name: tolerance for name in self.quantities}
+        self.window = window
+        self.min_time = min_time
+        self.history = {name: deque(maxlen=window + 1) for name in self.quantities}
+        self.times = []
+        self.stop_reason = None
+        self.stop_time = None
+
+    def update(self, time, model):
+        """Evaluate the quantities of the model after a report step
+
+        :param time: the time of the report step
+        :type time: float
+        :param model: the geothermal model
+        :return:
+            True if the run has converged and can be stopped
+        :rtype: bool
+        """
+        return self.update_values(time, {name: quantity(model) for name, quantity in self.quantities.items()})
+
+    def update_values(self, time, values):
+        """Add the values of the quantities at a report step
+
+        :param time: the time of the report step
+        :type time: float
+        :param values: the value of each quantity
+        :type values: dict
+        :return:
+            True if the run has converged and can be stopped
+        :rtype: bool
+        """
+        self.times.append(time)
+        for name, value in values.items():
+            self.history[name].append(np.array(value, dtype=float))
+        if time < self.min_time:
+            return False
+
+        changes = {}
+        for name, history in self.history.items():
+            if len(history) <= self.window:
+                return False
+            stacked = np.stack(history)
+            changes[name] = float(np.max(stacked.max(axis=0) - stacked.min(axis=0)))
+            if changes[name] >= self.tolerance[name]:
+                return False
+
+        if self.stop_reason is None:
+            self.stop_time = time
+            self.stop_reason = 'steady state: ' + ', '.join(f'{name} changed {change:.3g} over the last {self.window} '
+                                                            f'report steps' for name, change in changes.items())
+        return True
+
+    def finish(self, time):
+        """Record that the run reached its total time without converging
+
+        :param time: the end time of the run
+        :type time: float
+        :return:
+            None
+        """
+        if self.stop_reason is None:
+            self.stop_time = time
+            self.stop_reason = 'total time reached'
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from importlib import metadata
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # fcntl is not available on Windows, the merges of concurrent workers are then not serialized
+    fcntl = None
+
+
+def darts_version():
+    """The version of the installed DARTS engine, the tables of another build are not reused
+
+    :return:
+        the version of open-darts, or None if it is not installed
+    :rtype: str
+    """
+    try:
+        return metadata.version('open-darts')
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def operator_cache_key(physics_type, **parameters):
+    """Make the key of the operator tables of a physics and of the installed DARTS version
+
+    :param physics_type: the name of the physics, e.g. 'Geothermal'
+    :type physics_type: str
+    :param parameters: the parameters the tables depend on, e.g. n_points, min_p, max_p, min_e, max_e and mass_rate
+    :return:
+        the key of the tables
+    :rtype: str
+    """
+    description = {'physics': physics_type, 'parameters': parameters, 'darts': darts_version()}
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+class OperatorCache:
+    """On-disk cache of the operator tables of the interpolators of a DARTS physics
+
+    The adaptive interpolators of a physics compute their tables point by point while a model runs. The points of
+    every interpolator are stored as one .npy file, the index of each point followed by its operator values, under a
+    key made from the physics parameters. Later runs and other worker processes read the files memory mapped and
+    read-only, so their interpolators start with every point which was computed before. Saving holds an exclusive lock
+    on the table, merges the points which were added in the meantime and replaces the file in one rename, so
+    concurrent workers never read a partly written table and never drop the points of each other.
+
+    The cache saves computing the points again, not memory: the interpolators keep their points in their own
+    point_data, so load copies every table into each process and N workers hold N copies of the tables.
+
+    The physics has to be constructed with cache=True, so that it keeps the list of its interpolators.
+    """
+
+    def __init__(self, path):
+        """The constructor of the cache
+
+        :param path: the directory of the cache
+        :type path: str
+        """
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    def _table_path(self, key, name):
+        """The file of the table of one interpolator"""
+        return os.path.join(self.path, key, f'{os.path.splitext(os.path.basename(name))[0]}.npy')
+
+    @contextmanager
+    def _lock(self, path):
+        """Hold an exclusive lock on the table at the path, which serializes the merges of concurrent workers"""
+        if fcntl is None:
+            yield
+            return
+        with open(f'{path}.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self, key, name):
+        """Read the table of one interpolator
+
+        :param key: the key of the physics, see operator_cache_key
+        :type key: str
+        :param name: the name of the interpolator
+        :type name: str
+        :return:
+            the read-only memory mapped table with the point index in the first column, or None if it is not cached
+        :rtype: np.ndarray
+        """
+        path = self._table_path(key, name)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r')
+
+    def write(self, key, name, point_data):
+        """Merge the points of one interpolator into its table
+
+        :param key: the key of the physics, see operator_cache_key
+        :type key: str
+        :param name: the name of the interpolator
+        :type name: str
+        :param point_data: the operator values of each point index
+        :type point_data: dict
+        :return:
+            the number of points of the table
+        :rtype: int
+        """
+        path = self._table_path(key, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock(path):
+            points = dict(point_data)
+            cached = self.read(key, name)
+            if cached is not None:
+                for row in np.asarray(cached):
+                    points.setdefault(int(row[0]), row[1:])
+            if cached is not None and len(points) == len(cached):
+                return len(points)
+            indices = sorted(points)
+            table = np.column_stack([np.array(indices, dtype=float),
+                                     np.array([np.asarray(points[i], dtype=float) for i in indices])])
+            temporary = f'{path}.{os.getpid()}.tmp.npy'
+            np.save(temporary, table)
+            os.replace(temporary, path)
+
+        return len(points)
+
+    def load(self, physics, key):
+        """Fill the interpolators of a physics with the cached points, which are copied into their point_data
+
+        :param physics: the physics, constructed with cache=True
+        :param key: the key of the physics, see operator_cache_key
+        :type key: str
+        :return:
+            the number of loaded points
+        :rtype: int
+        """
+        n_points = 0
+        for itor, name in physics.created_itors:
+            table = self.read(key, name)
+            if table is None:
+                continue
+            itor.point_data = {int(index): values for index, values in zip(table[:, 0], table[:, 1:])}
+            n_points += len(table)
+
+        return n_points
+
+    def save(self, physics, key):
+        """Merge the points of the interpolators of a physics into the cache
+
+        :param physics: the physics, constructed with cache=True
+        :param key: the key of the physics, see operator_cache_key
+        :type key: str
+        :return:
+            the number of cached points
+        :rtype: int
+        """
+        return sum(self.write(key, name, itor.point_data) for itor, name in physics.created_itors)
@@ -0,0 +1,91 @@
+import numpy as np
+
+# coefficients of the cubic in the exponent of the porosity-permeability law, from Duncan's thesis, highest order first
+PERMEABILITY_COEFFICIENTS = (110.744, -171.8268, 92.9227, -2.047)
+
+
+def porosity_to_permeability(poro, out=None, dtype=None, chunk_size=None):
+    """Permeability from porosity, exp(110.744 * poro^3 - 171.8268 * poro^2 + 92.9227 * poro - 2.047)
+
+    The cubic is evaluated with Horner's scheme in place, so apart from the output no temporary arrays of the size of
+    the field are created. Large fields can be transformed in chunks to bound the working memory further.
+
+    :param poro: porosity values of any shape
+    :type poro: np.ndarray
+    :param out: optional array of the same shape to write the permeability into, it may be ``poro`` itself
+    :type out: np.ndarray
+    :param dtype: the float type of the permeability, e.g. np.float32, by default the type of ``out`` or float64
+    :type dtype: np.dtype
+    :param chunk_size: the number of values which are transformed at once, by default all values
+    :type chunk_size: int
+    :return:
+        permeability values in mD with the same shape as the porosity
+    :rtype: np.ndarray
+    """
+    poro = np.asarray(poro)
+    if out is None:
+        out = np.empty(poro.shape, dtype=dtype or np.float64)
+    elif out.shape != poro.shape:
+        raise ValueError('The output does not have the same shape as the porosity...')
+    if not out.flags.c_contiguous:
+        raise ValueError('The output has to be C contiguous...')
+
+    poro_flat = poro.reshape(-1)
+    out_flat = out.reshape(-1)
+    chunk_size = chunk_size or max(poro_flat.size, 1)
+    # when the output overlaps the input, the input has to be read before it is overwritten
+    buffer = np.empty(min(chunk_size, poro_flat.size), dtype=out.dtype) if np.shares_memory(poro, out) else None
+    a, b, c, d = PERMEABILITY_COEFFICIENTS
+    for start in range(0, poro_flat.size, chunk_size):
+        p = poro_flat[start:start + chunk_size]
+        o = out_flat[start:start + chunk_size] if buffer is None else buffer[:len(p)]
+        np.multiply(p, a, out=o, casting='unsafe')
+        o += b
+        o *= p
+        o += c
+        o *= p
+        o += d
+        np.exp(o, out=o)
+        if buffer is not None:
+            out_flat[start:start + chunk_size] = o
+
+    return out
+
+
+def pad_layers(field, n_layer_cells, top, bottom, value, n_layers=None, dtype=np.float64):
+    """The field with layers of a constant value above and below, written into one preallocated array
+
+    The field can be given per cell or per layer, the value of a layer is then spread over the cells of the layer
+    while it is copied, so the full field of the reservoir is never made separately.
+
+    :param field: the value of each cell of the reservoir, x changes fastest and z slowest, or of each layer
+    :type field: np.ndarray
+    :param n_layer_cells: the number of cells of a layer, nx * ny
+    :type n_layer_cells: int
+    :param top: the number of layers above the reservoir
+    :type top: int
+    :param bottom: the number of layers below the reservoir
+    :type bottom: int
+    :param value: the value of the cells of the added layers
+    :type value: float
+    :param n_layers: the number of layers of the reservoir, by default the number of values of the field divided by
+        the number of cells of a layer
+    :type n_layers: int
+    :param dtype: the float type of the padded field, the field can be staged in another type, e.g. np.float32
+    :type dtype: np.dtype
+    :return:
+        the value of each cell of the padded field
+    :rtype: np.ndarray
+    """
+    field = np.asarray(field).reshape(-1)
+    if n_layers is None:
+        n_layers = field.size // n_layer_cells
+    if field.size not in (n_layers, n_layers * n_layer_cells):
+        raise ValueError('The field does not have one value per cell or one value per layer...')
+    padded = np.empty((top + n_layers + bottom, n_layer_cells), dtype=dtype)
+    padded[:top] = value
+    # a field per layer is broadcast over the cells of each layer
+    padded[top:top + n_layers] = field.reshape(n_layers, -1)
+    padded[top + n_layers:] = value
+
+    return padded.reshape(-1)
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+_file_hashes = {}
+
+
+def file_hash(path):
+    """The sha256 hash of the content of a file, which is remembered as long as the file is not modified
+
+    :param path: the path to the file
+    :type path: str
+    :return:
+        the hex digest of the file content
+    :rtype: str
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _file_hashes[memo_key] = digest.hexdigest()
+
+    return _file_hashes[memo_key]
+
+
+class PropertyCache:
+    """Content-addressed on-disk cache of the porosity and permeability fields prepared for a model grid
+
+    An entry is keyed by the hashes of the source files, the target grid shape and the interpolation settings, and
+    holds the flattened fields as .npy files which are memory mapped when they are read. Entries which are not used
+    for ``max_age`` seconds, and the least recently used entries beyond ``max_bytes``, are evicted.
+    """
+
+    def __init__(self, path, max_bytes=None, max_age=None):
+        """The constructor of the cache
+
+        :param path: the directory of the cache
+        :type path: str
+        :param max_bytes: the maximum size of the cache in bytes, no limit by default
+        :type max_bytes: int
+        :param max_age: the maximum time in seconds since an entry was used, no limit by default
+        :type max_age: float
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def make_key(source_files, shape, **settings):
+        """Make the key of an entry
+
+        :param source_files: the files the fields are computed from, in the order they are used
+        :type source_files: list
+        :param shape: the shape of the target grid
+        :type shape: tuple
+        :param settings: the settings of the computation, e.g. the interpolation orders
+        :return:
+            the key of the entry
+        :rtype: str
+        """
+        description = {'sources': [file_hash(f) for f in source_files],
+                       'shape': [int(n) for n in shape],
+                       'settings': settings}
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key):
+        """Read an entry
+
+        :param key: the key of the entry
+        :type key: str
+        :return:
+            the read-only memory mapped porosity and permeability, or None if the entry is not in the cache
+        :rtype: np.ndarray, np.ndarray
+        """
+        entry = os.path.join(self.path, key)
+        if not os.path.isdir(entry):
+            return None
+        # the modification time of the entry marks its last use
+        os.utime(entry)
+        poro = np.load(os.path.join(entry, 'poro.npy'), mmap_mode='r')
+        perm = np.load(os.path.join(entry, 'perm.npy'), mmap_mode='r')
+
+        return poro, perm
+
+    def put(self, key, poro, perm):
+        """Write an entry and evict old entries
+
+        :param key: the key of the entry
+        :type key: str
+        :param poro: the porosity
+        :type poro: np.ndarray
+        :param perm: the permeability
+        :type perm: np.ndarray
+        :return:
+            the read-only memory mapped porosity and permeability of the entry
+        :rtype: np.ndarray, np.ndarray
+        """
+        entry = os.path.join(self.path, key)
+        if not os.path.isdir(entry):
+            # write into a temporary directory first, so that readers never see a half written entry
+            temporary = f'{entry}.{os.getpid()}.tmp'
+            os.makedirs(temporary, exist_ok=True)
+            np.save(os.path.join(temporary, 'poro.npy'), np.ascontiguousarray(poro).ravel())
+            np.save(os.path.join(temporary, 'perm.npy'), np.ascontiguousarray(perm).ravel())
+            try:
+                os.rename(temporary, entry)
+            except OSError:
+                # another process wrote the same entry in the meantime
+                shutil.rmtree(temporary, ignore_errors=True)
+        self.evict(keep=key)
+
+        return self.get(key)
+
+    def evict(self, keep=None):
+        """Remove the entries which are too old and the least recently used entries above the size limit
+
+        :param keep: the key of an entry which is never evicted
+        :type keep: str
+        :return:
+            None
+        """
+        entries = []
+        for key in os.listdir(self.path):
+            entry = os.path.join(self.path, key)
+            if key.endswith('.tmp') or not os.path.isdir(entry):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+                entries.append((os.path.getmtime(entry), size, key))
+            except FileNotFoundError:
+                # another process evicted the entry in the meantime
+                continue
+        entries.sort(reverse=True)
+
+        now = time.time()
+        total = 0
+        for last_used, size, key in entries:
+            total += size
+            too_old = self.max_age is not None and now - last_used > self.max_age
+            too_large = self.max_bytes is not None and total > self.max_bytes
+            if key != keep and (too_old or too_large):
+                shutil.rmtree(os.path.join(self.path, key), ignore_errors=True)
+                total -= size
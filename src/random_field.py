@@ -0,0 +1,91 @@
+import numpy as np
+from scipy import fft
+
+
+def correlation_range(cov_model, tolerance=1e-3):
+    """The largest distance along any axis at which the correlation of the covariance model is above the tolerance
+
+    :param cov_model: gstools covariance model
+    :type cov_model: gstools.CovModel
+    :param tolerance: the correlation below which two points are treated as uncorrelated
+    :type tolerance: float
+    :return:
+        the correlation range along the longest axis of the anisotropy
+    :rtype: float
+    """
+    # the correlation is a function of the distance in units of the main length scale
+    distances = cov_model.len_scale * np.arange(1, 1001) / 10
+    above = np.nonzero(cov_model.correlation(distances) > tolerance)[0]
+    main_range = distances[above[-1] + 1] if len(above) else distances[0]
+    return main_range * max(cov_model.len_scale_vec) / cov_model.len_scale
+
+
+class CirculantEmbedding:
+    """Gaussian random fields on a regular grid by circulant embedding of the covariance, with FFTs in O(N log N)
+
+    The grid is padded by the correlation range of the covariance model, so that the covariance of the padded, periodic
+    grid is a circulant matrix which the FFT diagonalizes. The square roots of its eigenvalues are computed once and
+    shared by every sampled field, a field is then one forward and one inverse real FFT of white noise. Small negative
+    eigenvalues of the truncated covariance are set to zero. The nugget of the covariance model is added as white
+    noise.
+    """
+
+    def __init__(self, cov_model, shape, spacing=1.0, n_workers=None):
+        """The constructor of the generator
+
+        :param cov_model: gstools covariance model whose dimension is the number of axes of the grid, the axes of the
+            model are x, y and z, e.g. Gaussian(dim=2, len_scale=30, anis=6.8, angles=-0.2, var=0.5, nugget=0.5)
+        :type cov_model: gstools.CovModel
+        :param shape: the shape of the grid, (ny, nx) or (nz, ny, nx)
+        :type shape: tuple
+        :param spacing: the cell size of the grid along every axis in the order of the shape, or one for all axes,
+            in the length unit of the covariance model
+        :type spacing: tuple
+        :param n_workers: the number of threads of the FFTs, by default one
+        :type n_workers: int
+        """
+        self.shape = tuple(int(n) for n in shape)
+        if cov_model.dim != len(self.shape):
+            raise ValueError('The dimension of the covariance model does not match the grid...')
+        self.cov_model = cov_model
+        self.spacing = np.broadcast_to(np.asarray(spacing, dtype=float), (len(self.shape),))
+        self.n_workers = n_workers
+
+        # a lag up to the range has to be represented on each side, short axes are embedded in 2n - 1 cells
+        extent = correlation_range(cov_model)
+        self.embedded_shape = tuple(fft.next_fast_len(n + min(n - 1, int(np.ceil(extent / d))), real=True)
+                                    for n, d in zip(self.shape, self.spacing))
+
+        # the lags of the periodic grid, positive up to half of the embedded size and negative beyond it
+        lags = [np.where(np.arange(m) <= m // 2, np.arange(m), np.arange(m) - m) * d
+                for m, d in zip(self.embedded_shape, self.spacing)]
+        covariance = np.empty(self.embedded_shape)
+        # the covariance is evaluated one slice of the first axis at a time to bound the memory of the positions
+        for i, first_lag in enumerate(lags[0]):
+            grids = np.meshgrid(first_lag, *lags[1:], indexing='ij')
+            # the array axes are (z,) y, x and the axes of the covariance model x, y (, z)
+            positions = np.stack([grid.ravel() for grid in reversed(grids)])
+            covariance[i] = cov_model.cov_spatial(positions).reshape(covariance.shape[1:])
+        eigenvalues = fft.rfftn(covariance, workers=self.n_workers).real
+        del covariance
+        np.maximum(eigenvalues, 0.0, out=eigenvalues)
+        self.sqrt_eigenvalues = np.sqrt(eigenvalues, out=eigenvalues)
+        self.nugget = cov_model.nugget
+
+    def sample(self, rng):
+        """Sample one field with zero mean and the covariance of the model, including the nugget
+
+        :param rng: the random number generator, e.g. np.random.default_rng(seed)
+        :type rng: np.random.Generator
+        :return:
+            the field with the shape of the grid
+        :rtype: np.ndarray
+        """
+        spectrum = fft.rfftn(rng.standard_normal(self.embedded_shape), workers=self.n_workers)
+        spectrum *= self.sqrt_eigenvalues
+        field = fft.irfftn(spectrum, s=self.embedded_shape, workers=self.n_workers)
+        field = field[tuple(slice(0, n) for n in self.shape)].copy()
+        if self.nugget > 0:
+            field += np.sqrt(self.nugget) * rng.standard_normal(self.shape)
+
+        return field
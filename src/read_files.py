@@ -1,4 +1,3 @@
-import math
 import os
 import pickle
 
@@ -6,18 +5,43 @@ import numpy as np
 import pandas as pd
 from skimage.transform import resize
 
-from src.math_rel import apply_kriging
+from src.las import LasCache, depth_column, parse_las
+from src.math_rel import arithmetic_average, krige_layers, simulate_layers
+from src.petrophysics import porosity_to_permeability
+from src.property_cache import PropertyCache
+from src.sweep import run_sweep, default_workers
 
+WELL_LAS_FILES = ['LogData/Well_HONSELERSDIJK_GT_01_depth_gr.las',
+                  'LogData/Well_PIJNACKER_GT_01_depth_gamma_4.las',
+                  'LogData/Well_PIJNACKER_GT_03_SIDETRACK2_depth_gamma_2.las',
+                  'LogData/Well_DE_LIER_GT_01_depth_gr_3.las',
+                  'LogData/Well_POELDIJK_GT_01_depth_gr_temp_2.las',
+                  'LogData/Well_KWINNTSHEUL_GT_01_depth_gr_temp.las',
+                  'LogData/Well_NAALDWIJK_GT_01_depth_cali_sonic_gr_pef_rhob_rt_rxo_nphi.las']
+# all kriged porosity layers of a directory in one file, with shape (number of layers, 900, 900)
+POROSITY_LAYERS_FILE = 'porosity_layers.npy'
 
-def read_las(path_to_las):
+
+def read_las(path_to_las, depth_range=None, columns=None, cache_dir=None):
     """Retrieve the log values from the las file
 
     :param path_to_las: the path to the las file which contains the log data
+    :param depth_range: optional (top, bottom) depth window, both ends are included
+    :param columns: optional names of the curves to read, by default all curves
+    :param cache_dir: optional directory of a LasCache, the las file is then parsed once into a columnar binary and
+        only the selected rows and curves are read from it
     :return:
         the log values which are from the las. it is a DataFrame
     """
-    well_log = pd.read_table(path_to_las, delim_whitespace=True)
-    well_log = well_log.replace(-999.0000, np.NaN)
+    if cache_dir is not None:
+        return LasCache(cache_dir).read(path_to_las, depth_range=depth_range, columns=columns)
+
+    well_log = parse_las(path_to_las)
+    depth = depth_column(well_log.columns)
+    if depth_range is not None and depth is not None:
+        well_log = well_log[(depth_range[0] <= well_log[depth]) & (well_log[depth] <= depth_range[1])]
+    if columns is not None:
+        well_log = well_log[list(columns)]
 
     return well_log
 
@@ -41,31 +65,27 @@ def from_las_to_poro(path_to_las, number_layers):
     porosity = (density_log * conversion - 1. / v_sandstone) / (1. / v_water - 1. / v_sandstone)
     # get porosity which is not nan
     porosity = porosity[~np.isnan(porosity)]
-    group_size = math.ceil(len(porosity) / int(number_layers))
-    groups = []
-    # choose the second interval as the reservoir interval
-    for i in range(0, len(porosity), group_size):
-        group = porosity[i:i + group_size]
-        ave_poro = np.average(group)
-        groups.append(ave_poro)
 
-    return np.array(groups)
+    return np.array(arithmetic_average(porosity.values, int(number_layers)))
 
 
-def from_las_to_poro_gamma(path_to_las, number_of_layers):
+def from_las_to_poro_gamma(path_to_las, number_of_layers, cache_dir=None):
     """For the given las path and number of layers, using the gamma ray to output the porosity
 
     :param path_to_las: the path to the second las file which contains gamma ray log
     :param number_of_layers: number of layers
+    :param cache_dir: optional directory of a LasCache the log is read from
     :return:
         porosity for different layers
     """
 
-    well_gr = read_las(path_to_las)
-    if 'DEPTH' in well_gr.columns:
-        well_gr = well_gr[(well_gr['DEPTH'] <= 2100) & (2000 <= well_gr['DEPTH'])]
-    elif 'DEPT' in well_gr.columns:
-        well_gr = well_gr[(2000 <= well_gr['DEPT']) & (well_gr['DEPT'] <= 2100)]
+    # only the gamma ray curve is read from the cache, its depth curve selects the rows
+    columns = None
+    if cache_dir is not None:
+        gamma_ray_columns = [name for name in ('GR', 'GR_A') if name in LasCache(cache_dir).columns(path_to_las)]
+        columns = gamma_ray_columns[:1] or None
+    # the reservoir interval is between 2000m and 2100m
+    well_gr = read_las(path_to_las, depth_range=(2000, 2100), columns=columns, cache_dir=cache_dir)
     if 'GR' in well_gr.columns:
         well_gamma_ray = well_gr['GR']
     elif 'GR_A' in well_gr.columns:
@@ -80,109 +100,172 @@ def from_las_to_poro_gamma(path_to_las, number_of_layers):
     eff_porosity_well = abs(total_porosity_well - shale_content_well * 0.1)
     # get porosity which is not nan
     eff_porosity_well = eff_porosity_well[~np.isnan(eff_porosity_well)]
-    group_size = math.ceil(len(eff_porosity_well) / int(number_of_layers))
-    groups = []
-    # choose the second interval as the reservoir interval
-    for i in range(0, len(eff_porosity_well), group_size):
-        group = eff_porosity_well[i:i + group_size]
-        ave_poro = np.average(group)
-        groups.append(ave_poro)
 
-    return np.array(groups)
+    return np.array(arithmetic_average(eff_porosity_well.values, int(number_of_layers)))
+
 
+def _krige_layer_block(layers_poro, n_threads, seed=1234):
+    """Krige a block of layers on the 900 x 900 grid, this is the function which runs in the worker processes
+
+    :param layers_poro: the porosity of the wells with shape (number of layers, number of wells)
+    :param n_threads: the number of threads of the worker
+    :param seed: the seed of the sample locations, see krige_layers
+    :return:
+        the kriged porosity with shape (number of layers, 900, 900)
+    """
+    return krige_layers(900, 900, layers_poro, n_workers=n_threads, seed=seed)
 
-def get_porosity_values(nz):
-    """Read las files from seven wells and output the porosity using kriging for different nz
+
+def get_porosity_values(nz, output_dir='Porosity20', max_workers=None, method='kriging', seed=1234):
+    """Read las files from seven wells and output the porosity using kriging, or a random field, for different nz
+
+    Every well is parsed once. With kriging the layers are split into blocks which are kriged in parallel worker
+    processes, with 'srf' all layers are one 3D Gaussian random field which is generated with FFTs and conditioned
+    on the wells, see simulate_layers. All layers are written into one .npy file in the output directory.
 
     :param nz: number of the grid in z direction
+    :param output_dir: the directory the porosity layers are written to
+    :param max_workers: the number of worker processes, by default as many as there are cores, with 'srf' the number
+        of threads of the FFTs
+    :param method: 'kriging' for the smooth kriged porosity, 'srf' for a conditioned random field
+    :param seed: the seed of the sample locations of the kriging, or of the random field with 'srf'
+    :return:
+        the porosity layers with shape (nz, 900, 900)
+    """
+    if method not in ('kriging', 'srf'):
+        raise ValueError(f'Unknown porosity method {method}...')
+    # the conditioning data of every layer, with shape (nz, number of wells)
+    data_points = np.column_stack([from_las_to_poro_gamma(path, nz) for path in WELL_LAS_FILES])
+    if max_workers is None:
+        max_workers = default_workers()
+    if method == 'srf':
+        layers_poro = simulate_layers(900, 900, data_points, seed=seed, n_workers=max_workers)
+    else:
+        blocks = [block for block in np.array_split(data_points, min(max_workers, len(data_points))) if len(block)]
+        layers_poro = np.concatenate(run_sweep(_krige_layer_block, [(block, 1, seed) for block in blocks],
+                                               max_workers=max_workers))
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, POROSITY_LAYERS_FILE), layers_poro)
+
+    return layers_poro
+
+
+def porosity_realization(ny, nx, nz, seed, n_threads=None, cache_dir=None, method='kriging'):
+    """One realization of the heterogeneous porosity and permeability on the model grid
+
+    With kriging the porosity of the seven wells is kriged from sample locations which are drawn with the seed, with
+    'srf' it is a random field with the seed which is conditioned on the wells, both directly at the cell centers of
+    the model grid, so every seed gives another realization of the field of get_porosity_values.
+
+    :param ny: number of the grid in y direction
+    :param nx: number of the grid in x direction
+    :param nz: number of the grid in z direction
+    :param seed: the seed of the realization
+    :param n_threads: the number of threads of the kriging, by default as many as there are cores
+    :param cache_dir: optional directory of the converted well logs, see read_las
+    :param method: 'kriging' or 'srf'
+    :return:
+        porosity, permeability in 1D, x changes fastest and z slowest
+    """
+    data_points = np.column_stack([from_las_to_poro_gamma(path, nz, cache_dir=cache_dir) for path in WELL_LAS_FILES])
+    if method == 'kriging':
+        porosity = krige_layers(900, 900, data_points, target_shape=(ny, nx), n_workers=n_threads, seed=seed)
+    elif method == 'srf':
+        # the field varies with the seed, the wells stay at their locations
+        porosity = simulate_layers(900, 900, data_points, target_shape=(ny, nx), seed=seed, n_workers=n_threads)
+    else:
+        raise ValueError(f'Unknown porosity method {method}...')
+
+    return porosity.ravel(), porosity_to_permeability(porosity).ravel()
+
+
+def _layer_files(dir_to_pickle):
+    """The files which contain the porosity layers in the given directory
+
+    :param dir_to_pickle: the directory which contains the porosity layers file or the pickle files
     :return:
-        1D array of porosity
+        the path to the porosity layers file if it exists, otherwise the sorted paths to the pickle files
     """
-    well_1_poro = from_las_to_poro_gamma('LogData/Well_HONSELERSDIJK_GT_01_depth_gr.las', nz)
-    well_2_poro = from_las_to_poro_gamma('LogData/Well_PIJNACKER_GT_01_depth_gamma_4.las', nz)
-    well_3_poro = from_las_to_poro_gamma('LogData/Well_PIJNACKER_GT_03_SIDETRACK2_depth_gamma_2.las', nz)
-    well_4_poro = from_las_to_poro_gamma('LogData/Well_DE_LIER_GT_01_depth_gr_3.las', nz)
-    well_5_poro = from_las_to_poro_gamma('LogData/Well_POELDIJK_GT_01_depth_gr_temp_2.las', nz)
-    well_6_poro = from_las_to_poro_gamma('LogData/Well_KWINNTSHEUL_GT_01_depth_gr_temp.las', nz)
-    well_7_poro = from_las_to_poro_gamma('LogData/Well_NAALDWIJK_GT_01_depth_cali_sonic_gr_pef_rhob_rt_rxo_nphi.las',
-                                         nz)
-
-    # poros = []
-    for i in range(nz):
-        data_points = np.array([well_1_poro[i], well_2_poro[i], well_3_poro[i], well_4_poro[i], well_5_poro[i],
-                                well_6_poro[i], well_7_poro[i]])
-        layers_poro = apply_kriging(900, 900, len(data_points), data_points)
-        # poros.append(layers_poro)
-    #
-    # return np.array(poros)
-
-        if not os.path.exists('Porosity20'):
-            os.mkdir('Porosity20')
-
-        # Open a file and use dump()
-        with open(f'./Porosity20/layer_poro_{i}.pkl', 'wb') as file:
-
-            # A new file will be created
-            pickle.dump(layers_poro, file)
-
-
-def read_pickle_file(ny, nx, dir_to_pickle):
+    if os.path.exists(os.path.join(dir_to_pickle, POROSITY_LAYERS_FILE)):
+        return [os.path.join(dir_to_pickle, POROSITY_LAYERS_FILE)]
+    return [os.path.join(dir_to_pickle, file) for file in sorted(os.listdir(dir_to_pickle)) if file.endswith(".pkl")]
+
+
+def _read_layers(dir_to_pickle):
+    """Read the porosity layers one by one, from the porosity layers file or from one pickle file per layer
+
+    :param dir_to_pickle: the directory which contains the porosity layers file or the pickle files
+    :return:
+        generator of the 2D porosity layers
+    """
+    for file in _layer_files(dir_to_pickle):
+        if file.endswith('.npy'):
+            yield from np.load(file, mmap_mode='r')
+        else:
+            # Open the file in binary mode
+            with open(file, 'rb') as f:
+                # Call load method to deserialze
+                yield pickle.load(f)
+
+
+def read_pickle_file(ny, nx, dir_to_pickle, cache=None):
     """This method is used in heterogeneous reservoir resolution and layers study when nz is 10
     
     :param ny: number of the grid in y direction
     :param nx: number of the grid in x direction
     :param dir_to_pickle: the directory which contains the pickles files for just 10 layers' porosity
+    :param cache: optional PropertyCache, if given the result is read from or stored in the cache
     :return:
         1D array of porosity and permeability
     """
+    if cache is not None:
+        key = PropertyCache.make_key(_layer_files(dir_to_pickle), (ny, nx), reader='read_pickle_file',
+                                     poro_order=1, perm_order=0, mode='reflect', anti_aliasing=True)
+        cached = cache.get(key)
+        if cached is None:
+            cached = cache.put(key, *read_pickle_file(ny, nx, dir_to_pickle))
+        return cached
+
     poros = {}
     perms = {}
-    for file in sorted(os.listdir(dir_to_pickle)):
-        if file.endswith(".pkl"):
-            # Open the file in binary mode
-            with open(os.path.join(dir_to_pickle, file), 'rb') as f:
-                # Call load method to deserialze
-                poro = pickle.load(f)
-                f = [110.744 * (p ** 3) - 171.8268 * (p ** 2) + 92.9227 * p - 2.047 for p in poro.flatten()]
-                org_perm = [np.exp(x) for x in f]
-                perm = np.reshape(org_perm, poro.shape)
-                poro = resize(poro, (ny, nx), order=1, mode='reflect', anti_aliasing=True)
-                perm = resize(perm, (ny, nx), order=0, mode='reflect', anti_aliasing=True)
-                poros[file] = np.rot90(poro).flatten(order='F')
-                perms[file] = np.rot90(perm).flatten(order='F')
-    porosity = []
-    for i in list(poros.values()):
-        porosity.extend(i)
-    permeability = []
-    for i in list(perms.values()):
-        permeability.extend(i)
-    return np.array(porosity), np.array(permeability)
-
-def read_pickle_file_upscaling_z(ny, nx, nz, dir_to_pickle):
+    for i, poro in enumerate(_read_layers(dir_to_pickle)):
+        perm = porosity_to_permeability(poro)
+        poro = resize(poro, (ny, nx), order=1, mode='reflect', anti_aliasing=True)
+        perm = resize(perm, (ny, nx), order=0, mode='reflect', anti_aliasing=True)
+        poros[i] = np.rot90(poro).flatten(order='F')
+        perms[i] = np.rot90(perm).flatten(order='F')
+    # the layers are joined in one allocation, instead of through lists of python floats
+    return np.concatenate(list(poros.values())), np.concatenate(list(perms.values()))
+
+
+def read_pickle_file_upscaling_z(ny, nx, nz, dir_to_pickle, cache=None):
     """The way to get the upscaled reservoir permeability, porosity when different nx, ny and nz are given
 
     :param ny: number of the grid in y direction
     :param nx: number of the grid in x direction
     :param nz: number of the grid in z direction
     :param dir_to_pickle: the directory which contains the pickle files which have porosity in
+    :param cache: optional PropertyCache, if given the result is read from or stored in the cache
     :return:
         porosity, permeability in 1D
     """
+    if cache is not None:
+        key = PropertyCache.make_key(_layer_files(dir_to_pickle), (nz, ny, nx), reader='read_pickle_file_upscaling_z',
+                                     poro_order=1, perm_order=0, mode='reflect', anti_aliasing=True)
+        cached = cache.get(key)
+        if cached is None:
+            cached = cache.put(key, *read_pickle_file_upscaling_z(ny, nx, nz, dir_to_pickle))
+        return cached
+
     poros = []
     perms = []
-    for file in os.listdir(dir_to_pickle):
-        if file.endswith(".pkl"):
-            # Open the file in binary mode
-            with open(os.path.join(dir_to_pickle, file), 'rb') as f:
-                # Call load method to deserialze
-                poro = pickle.load(f)
-                f = [110.744 * (p ** 3) - 171.8268 * (p ** 2) + 92.9227 * p - 2.047 for p in poro.flatten()]
-                org_perm = [np.exp(x) for x in f]
-                perm = np.reshape(org_perm, poro.shape)
-                poro = resize(poro, (ny, nx), order=1, mode='reflect', anti_aliasing=True)
-                perm = resize(perm, (ny, nx), order=0, mode='reflect', anti_aliasing=True)
-                poros.append(poro)
-                perms.append(perm)
+    for poro in _read_layers(dir_to_pickle):
+        perm = porosity_to_permeability(poro)
+        poro = resize(poro, (ny, nx), order=1, mode='reflect', anti_aliasing=True)
+        perm = resize(perm, (ny, nx), order=0, mode='reflect', anti_aliasing=True)
+        poros.append(poro)
+        perms.append(perm)
     porosity = np.array(poros)
     permeability = np.array(perms)
 
@@ -1,11 +1,12 @@
-import os
-
 import numpy as np
 import pandas as pd
 from darts.engines import redirect_darts_output
 
 from .model import Model
+from src.petrophysics import porosity_to_permeability
 from src.read_files import read_pickle_file, from_las_to_poro_gamma
+from src.result_store import write_time_data
+from src.telemetry import RunTelemetry
 
 report_time = 100
 total_time = 10000
@@ -22,77 +23,83 @@ set_ny = int(y_spacing / set_dy)
 set_dz = 10
 set_nz = int(z_spacing / set_dz)
 overburden = 0
+# the time data is written as compressed parquet, set this to also write the former Excel files
+excel_output = False
+
+
+def write_base_time_data(proxy_model, case):
+    """Write the time data of a base case, with the grid and the elapsed time of the run as metadata
+
+    :param proxy_model: the model after the run
+    :param case: the name of the case, e.g. 'ho'
+    :return:
+        the path of the time data file
+    """
+    proxy_model_elapsed_time = proxy_model.timer.node['initialization'].get_timer() + proxy_model.timer.node[
+        'simulation'].get_timer()
+    td = pd.DataFrame.from_dict(proxy_model.physics.engine.time_data)
+    metadata = {'case': case, 'nx': set_nx, 'ny': set_ny, 'nz': set_nz, 'dx': set_dx, 'dy': set_dy, 'dz': set_dz,
+                'overburden': overburden, 'report_time': report_time, 'total_time': total_time,
+                'elapsed_time': proxy_model_elapsed_time}
+    output_path = write_time_data(td, f'./RealBase/base_resolution_{case}', metadata=metadata, excel=excel_output)
+    with open(f'./RealBase/simulation_time_resolution_{case}.txt', 'w') as f:
+        f.write(f'{proxy_model_elapsed_time}')
+
+    return output_path
 
 
 def generate_base_ho():
     """This is a function without any inputs to generate vtk and time data file for homogeneous case
 
     :return:
-        vtk and time data excel file
+        vtk and time data parquet file
     """
     redirect_darts_output('log.txt')
-    perms = np.ones(set_nx * set_ny * set_nz) * perm
-    poros = np.ones(set_nx * set_ny * set_nz) * poro
+    # one value per layer, the model spreads them over the cells of each layer
+    perms = np.full(set_nz, perm, dtype=float)
+    poros = np.full(set_nz, poro, dtype=float)
     proxy_model = Model(total_time=total_time, set_nx=set_nx, set_ny=set_ny, set_nz=set_nz, set_dx=set_dx,
                         set_dy=set_dy, set_dz=set_dz, perms=perms, poro=poros, report_time_step=report_time,
                         overburden=overburden)
     proxy_model.init()
-    proxy_model.run(export_to_vtk=True)
+    # the iterations, wall time and memory of every report step and the timer tree of the run
+    telemetry = RunTelemetry('./RealBase/telemetry.jsonl', labels={'case': 'ho'},
+                             prometheus_path='./RealBase/telemetry_ho.prom')
+    proxy_model.run(export_to_vtk=True, telemetry=telemetry)
 
-    proxy_model_elapsed_time = proxy_model.timer.node['initialization'].get_timer() + proxy_model.timer.node[
-        'simulation'].get_timer()
-
-    td = pd.DataFrame.from_dict(proxy_model.physics.engine.time_data)
-
-    if not os.path.exists('RealBase'):
-        os.mkdir('RealBase')
-    output_path = os.path.relpath(f'./RealBase/base_resolution_ho.xlsx')
-    writer = pd.ExcelWriter(output_path)
-    td.to_excel(writer, 'Sheet1')
-    writer.save()
-    with open('./RealBase/simulation_time_resolution_ho.txt', 'w') as f:
-        f.write(f'{proxy_model_elapsed_time}')
+    write_base_time_data(proxy_model, 'ho')
 
 
 def generate_base_stratified():
     """This is a function without any inputs to generate vtk and time data file for stratified case
 
     :return:
-        vtk and time data excel file
+        vtk and time data parquet file
     """
     # read porosity from the file
     org_poro = from_las_to_poro_gamma('LogData/Well_PIJNACKER_GT_01_depth_gamma_4.las', set_nz)
-    poro = np.concatenate([np.ones(set_nx * set_ny) * p for p in org_poro], axis=0)
+    # one value per layer, the model spreads them over the cells of each layer
+    poro = org_poro
     # calculate permeability, this is from Duncan's thesis
-    org_perm = np.exp(110.744 * poro ** 3 - 171.8268 * poro ** 2 + 92.9227 * poro - 2.047)
-    perms = org_perm
+    perms = porosity_to_permeability(org_poro)
     redirect_darts_output('log.txt')
     proxy_model = Model(total_time=total_time, set_nx=set_nx, set_ny=set_ny, set_nz=set_nz, set_dx=set_dx,
                         set_dy=set_dy, set_dz=set_dz, perms=perms, poro=poro, report_time_step=report_time,
                         overburden=overburden)
     proxy_model.init()
-    proxy_model.run(export_to_vtk=True)
-
-    proxy_model_elapsed_time = proxy_model.timer.node['initialization'].get_timer() + proxy_model.timer.node[
-        'simulation'].get_timer()
-
-    td = pd.DataFrame.from_dict(proxy_model.physics.engine.time_data)
+    # the iterations, wall time and memory of every report step and the timer tree of the run
+    telemetry = RunTelemetry('./RealBase/telemetry.jsonl', labels={'case': 'layered'},
+                             prometheus_path='./RealBase/telemetry_layered.prom')
+    proxy_model.run(export_to_vtk=True, telemetry=telemetry)
 
-    if not os.path.exists('RealBase'):
-        os.mkdir('RealBase')
-    output_path = os.path.relpath(f'./RealBase/base_resolution_layered.xlsx')
-    writer = pd.ExcelWriter(output_path)
-    td.to_excel(writer, 'Sheet1')
-    writer.save()
-    with open('./RealBase/simulation_time_resolution_layered.txt', 'w') as f:
-        f.write(f'{proxy_model_elapsed_time}')
+    write_base_time_data(proxy_model, 'layered')
 
 
 def generate_base_he():
     """This is a function without any inputs to generate vtk and time data file for heterogeneous case
 
     :return:
-        vtk and time data excel file
+        vtk and time data parquet file
     """
     poros, perms = read_pickle_file(set_ny, set_nx, "Porosity")
     redirect_darts_output('log.txt')
@@ -100,21 +107,12 @@ def generate_base_he():
                         set_dy=set_dy, set_dz=set_dz, perms=perms, poro=poros, report_time_step=report_time,
                         overburden=overburden)
     proxy_model.init()
-    proxy_model.run(export_to_vtk=True)
-
-    proxy_model_elapsed_time = proxy_model.timer.node['initialization'].get_timer() + proxy_model.timer.node[
-        'simulation'].get_timer()
+    # the iterations, wall time and memory of every report step and the timer tree of the run
+    telemetry = RunTelemetry('./RealBase/telemetry.jsonl', labels={'case': 'he'},
+                             prometheus_path='./RealBase/telemetry_he.prom')
+    proxy_model.run(export_to_vtk=True, telemetry=telemetry)
 
-    td = pd.DataFrame.from_dict(proxy_model.physics.engine.time_data)
-
-    if not os.path.exists('RealBase'):
-        os.mkdir('RealBase')
-    output_path = os.path.relpath(f'./RealBase/base_resolution_he.xlsx')
-    writer = pd.ExcelWriter(output_path)
-    td.to_excel(writer, 'Sheet1')
-    writer.save()
-    with open('./RealBase/simulation_time_resolution_he.txt', 'w') as f:
-        f.write(f'{proxy_model_elapsed_time}')
+    write_base_time_data(proxy_model, 'he')
 
 
 if __name__ == '__main__':
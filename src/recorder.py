@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+
+
+def layer_cells(nx, ny, k):
+    """The cells of one layer of a structured grid, as a slice so that the state is read through views
+
+    :param nx: the number of grid blocks in x direction
+    :param ny: the number of grid blocks in y direction
+    :param k: the index of the layer, counted from the top and including the overburden layers
+    :return:
+        the slice of the cells of the layer
+    """
+    return slice(k * nx * ny, (k + 1) * nx * ny)
+
+
+def cross_section_cells(nx, ny, nz, j):
+    """The cells of the xz cross-section at the given y index of a structured grid
+
+    :param nx: the number of grid blocks in x direction
+    :param ny: the number of grid blocks in y direction
+    :param nz: the number of grid blocks in z direction
+    :param j: the index of the cross-section in y direction
+    :return:
+        the indices of the cells of the cross-section, x changes fastest
+    """
+    return (np.arange(nz)[:, None] * nx * ny + j * nx + np.arange(nx)[None, :]).ravel()
+
+
+class StateRecorder:
+    """Record fields of selected cells at every report step into preallocated (time, cells) arrays
+
+    The arrays are kept in memory, or are memory mapped .npy files when a directory is given, so that long runs of
+    large selections do not have to fit in memory.
+    """
+
+    def __init__(self, cells, n_steps, fields=('Temperature',), path=None, dtype=np.float64):
+        """The constructor of the recorder
+
+        :param cells: the recorded cells, a slice like layer_cells or an array of cell indices
+        :type cells: slice
+        :param n_steps: the maximum number of recorded steps, e.g. the number of report steps plus the initial state
+        :type n_steps: int
+        :param fields: the names of the recorded fields
+        :type fields: tuple
+        :param path: optional directory, the arrays are then memory mapped files <field>.npy in it
+        :type path: str
+        :param dtype: the type of the recorded values
+        :type dtype: np.dtype
+        """
+        self.cells = cells if isinstance(cells, slice) else np.asarray(cells)
+        if isinstance(self.cells, slice):
+            n_cells = len(range(*self.cells.indices(self.cells.stop)))
+        else:
+            n_cells = len(self.cells)
+        self.fields = tuple(fields)
+        self.times = np.full(n_steps, np.nan)
+        self.n_recorded = 0
+        self._buffers = {}
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        for field in self.fields:
+            if path is None:
+                self._buffers[field] = np.empty((n_steps, n_cells), dtype=dtype)
+            else:
+                self._buffers[field] = np.lib.format.open_memmap(os.path.join(path, f'{field}.npy'), mode='w+',
+                                                                 dtype=dtype, shape=(n_steps, n_cells))
+
+    def record(self, time, cell_data):
+        """Write the values of the recorded cells of one step into the next row of the arrays
+
+        :param time: the time of the step
+        :type time: float
+        :param cell_data: the values of the recorded cells for every field
+        :type cell_data: dict
+        :return:
+            None
+        """
+        if self.n_recorded == len(self.times):
+            raise ValueError('The recorder is full, please check the number of steps...')
+        for field in self.fields:
+            self._buffers[field][self.n_recorded] = cell_data[field]
+        self.times[self.n_recorded] = time
+        self.n_recorded += 1
+
+    def result(self, field):
+        """The recorded values of a field
+
+        :param field: the name of the field
+        :type field: str
+        :return:
+            the values with shape (number of recorded steps, number of cells)
+        :rtype: np.ndarray
+        """
+        return self._buffers[field][:self.n_recorded]
+
+    def flush(self):
+        """Write the memory mapped arrays to disk
+
+        :return:
+            None
+        """
+        for buffer in self._buffers.values():
+            if isinstance(buffer, np.memmap):
+                buffer.flush()
@@ -0,0 +1,219 @@
+import json
+import os
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:
+    # fcntl is not available on Windows, the appends of concurrent workers are then not serialized
+    fcntl = None
+
+MANIFEST = 'manifest.jsonl'
+# the columnar formats of the time data files, by their extension
+TIME_DATA_FORMATS = ('parquet', 'feather')
+# the key of the run metadata in the schema metadata of a time data file
+TIME_DATA_METADATA = b'run_metadata'
+
+
+def write_time_data(td, path, metadata=None, format='parquet', compression='zstd', excel=False):
+    """Write the time data of a run into a compressed columnar file, together with the metadata of the run
+
+    :param td: the time data of the run, e.g. from engine.time_data
+    :type td: pd.DataFrame
+    :param path: the path of the output without extension
+    :type path: str
+    :param metadata: optional metadata of the run, e.g. the grid and the elapsed time, which is stored as JSON in the
+        schema of the file
+    :type metadata: dict
+    :param format: 'parquet' or 'feather'
+    :type format: str
+    :param compression: the compression of the columns, e.g. 'zstd', 'lz4' or None
+    :type compression: str
+    :param excel: also write an Excel file <path>.xlsx for tools which need it, this is slow for long runs
+    :type excel: bool
+    :return:
+        the path of the written file
+    :rtype: str
+    """
+    if format not in TIME_DATA_FORMATS:
+        raise ValueError(f'Unknown time data format {format}...')
+    table = pa.Table.from_pandas(pd.DataFrame(td), preserve_index=False)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[TIME_DATA_METADATA] = json.dumps(metadata or {}).encode()
+    table = table.replace_schema_metadata(schema_metadata)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    output_path = f'{path}.{format}'
+    if format == 'parquet':
+        pq.write_table(table, output_path, compression=compression or 'none')
+    else:
+        feather.write_feather(table, output_path, compression=compression or 'uncompressed')
+    if excel:
+        time_data_to_excel(output_path)
+
+    return output_path
+
+
+def read_time_data(path):
+    """Read a time data file which was written by write_time_data
+
+    :param path: the path of the file, with the extension of its format
+    :type path: str
+    :return:
+        the time data and the metadata of the run
+    :rtype: pd.DataFrame, dict
+    """
+    if path.endswith('.parquet'):
+        table = pq.read_table(path)
+    elif path.endswith('.feather'):
+        table = feather.read_table(path)
+    else:
+        raise ValueError(f'Unknown time data format of {path}...')
+    metadata = json.loads((table.schema.metadata or {}).get(TIME_DATA_METADATA, b'{}'))
+
+    return table.to_pandas(), metadata
+
+
+def time_data_to_excel(path, excel_path=None):
+    """Convert a time data file into an Excel file with the layout of the former outputs, one sheet 'Sheet1'
+
+    :param path: the path of the time data file
+    :type path: str
+    :param excel_path: the path of the Excel file, by default the path with the extension .xlsx
+    :type excel_path: str
+    :return:
+        the path of the Excel file
+    :rtype: str
+    """
+    td, _ = read_time_data(path)
+    if excel_path is None:
+        excel_path = os.path.splitext(path)[0] + '.xlsx'
+    td.to_excel(excel_path, sheet_name='Sheet1')
+
+    return excel_path
+
+
+class ResultStore:
+    """Append-only store for sweep results
+
+    Every finished run is written as its own Parquet partition, so earlier runs are never read or rewritten. The
+    partitions are listed in an append-only manifest together with the run parameters, and ``read`` puts them back
+    together as the wide table with one column per run. An append holds an exclusive lock on the manifest, so the
+    workers of a sweep can append to one store concurrently, also on a shared file system where appending to a file
+    is not atomic.
+    """
+
+    def __init__(self, path):
+        """The constructor of the store
+
+        :param path: the directory which contains the partitions of the store
+        :type path: str
+        """
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    @contextmanager
+    def _lock(self):
+        """Hold an exclusive lock on the manifest, which serializes the appends of concurrent workers"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.path, f'{MANIFEST}.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, column, values, index=None, partition=None, **params):
+        """Write the result of one run as a new partition
+
+        :param column: the name of the column of this run in the wide table
+        :type column: str
+        :param values: the values of the run
+        :type values: np.ndarray
+        :param index: optional index of the values, e.g. the report times, which becomes the first column of the table
+        :type index: pd.Series
+        :param partition: optional name of the partition, a run which is written again under the same name replaces
+            its partition instead of adding one, so that a repeated job writes its result idempotently
+        :type partition: str
+        :param params: the parameters of the run which are recorded in the manifest
+        :return:
+            the path to the written partition
+        :rtype: str
+        """
+        column = str(column)
+        frame = pd.DataFrame({column: pd.Series(values).values})
+        if index is not None:
+            index = pd.Series(index)
+            frame.insert(0, index.name or 'index', index.values)
+        # the number of the next partition and the manifest line depend on the entries which are already written
+        with self._lock():
+            entries = self.entries()
+            if partition is None:
+                file_name = f'part-{len(entries):05d}.parquet'
+                frame.to_parquet(os.path.join(self.path, file_name), index=False)
+            else:
+                file_name = f'part-{partition}.parquet'
+                # write under a temporary name first, so that readers never see a half written partition
+                temporary = os.path.join(self.path, f'{file_name}.{os.getpid()}.tmp')
+                frame.to_parquet(temporary, index=False)
+                os.replace(temporary, os.path.join(self.path, file_name))
+                if any(entry['file'] == file_name for entry in entries):
+                    return os.path.join(self.path, file_name)
+
+            entry = {'column': column, 'file': file_name, 'index': None if index is None else frame.columns[0],
+                     'params': params}
+            with open(os.path.join(self.path, MANIFEST), 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+        return os.path.join(self.path, file_name)
+
+    def entries(self):
+        """The manifest entries of all the partitions in the order they were written
+
+        :return:
+            the column, file, index column and run parameters of each partition
+        :rtype: list
+        """
+        manifest = os.path.join(self.path, MANIFEST)
+        if not os.path.exists(manifest):
+            return []
+        with open(manifest) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def read(self):
+        """Read all partitions as one wide table, with the same layout as the csv files the notebooks read
+
+        The runs are joined on their index, so runs of different lengths, e.g. runs which a monitor stopped early,
+        fill the missing rows with NaN.
+
+        :return:
+            the index column, if any, followed by one column per run. Later runs with the same column name replace
+            earlier ones
+        :rtype: pd.DataFrame
+        """
+        columns = {}
+        index_name = None
+        for entry in self.entries():
+            frame = pd.read_parquet(os.path.join(self.path, entry['file']))
+            if entry['index'] is not None:
+                index_name = entry['index'] if index_name is None else index_name
+                frame = frame.set_index(entry['index'])
+            columns[entry['column']] = frame[entry['column']]
+        if not columns:
+            return pd.DataFrame()
+        # the outer join of the indices of the runs, in increasing order
+        table = pd.concat(columns, axis=1, join='outer', sort=True)
+        if index_name is None:
+            return table.reset_index(drop=True)
+        table.index.name = index_name
+
+        return table.reset_index()
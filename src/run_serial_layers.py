@@ -4,10 +4,18 @@ import numpy as np
 from darts.engines import redirect_darts_output
 
 from .model import Model
-import pandas as pd
 
+from src.checkpoint import Checkpointer, warm_start_state
 from src.math_rel import arithmetic_average, harmonic_average
+from src.memo import ResultMemo
+from src.monitor import ConvergenceMonitor, temperature_spread
+from src.operator_cache import OperatorCache
+from src.petrophysics import porosity_to_permeability
+from src.property_cache import PropertyCache
 from src.read_files import from_las_to_poro_gamma, read_pickle_file
+from src.recorder import layer_cells
+from src.result_store import ResultStore
+from src.search import bracket_and_bisect
 
 report_time = 100
 total_time = 10000
@@ -23,132 +31,199 @@ set_dy = 75
 set_ny = int(y_spacing / set_dy)
 set_dz = 10
 set_nz = int(z_spacing / set_dz)
-
-
-def proxy_model_simulation_stratified(overburden):
+# the resized heterogeneous fields are cached here, so that every overburden count reuses them
+property_cache_dir = 'PropertyCache'
+# the well logs are converted once into a columnar binary here
+las_cache_dir = 'LasCache'
+# the operator tables of the physics are computed once and shared by every run here
+operator_cache_dir = 'OperatorCache'
+# the results of finished runs by the hash of their input, a run with the same input is read from here
+result_memo_dir = 'ResultMemo'
+result_memo_bytes = 8 * 2 ** 30
+
+
+def proxy_model_simulation_stratified(overburden, monitor=None, initial_state=None, checkpointer=None):
     """Main method to run forward simulations for given different overburden layers for stratified reservoir case
     The resolution of the reservoir is fixed
     
     :param overburden: the number of the overburden layers
+    :param monitor: optional ConvergenceMonitor which stops the run once it is steady
+    :param initial_state: optional initial pressure and enthalpy of the reservoir cells, see warm_start_state
+    :param checkpointer: optional Checkpointer, the run continues from its latest checkpoint and saves new ones
     :return: 
         reservoir pressure, reservoir temperature and the geothermal model for the given overburden layers
     """
     redirect_darts_output(' ')
     # read porosity from the file
-    org_poro = from_las_to_poro_gamma('LogData/Well_PIJNACKER_GT_01_depth_gamma_4.las', set_nz)
+    org_poro = from_las_to_poro_gamma('LogData/Well_PIJNACKER_GT_01_depth_gamma_4.las', set_nz,
+                                     cache_dir=las_cache_dir)
     # calculate permeability, this is from Duncan's thesis
-    org_perm = np.exp(110.744 * (org_poro ** 3) - 171.8268 * (org_poro ** 2) + 92.9227 * org_poro - 2.047)
+    org_perm = porosity_to_permeability(org_poro)
     org_poro = arithmetic_average(org_poro, set_nz)
     org_perm = harmonic_average(org_perm, set_nz)
-    poros = np.concatenate([np.ones(set_nx * set_ny) * p for p in org_poro], axis=0)
-    perms = np.concatenate([np.ones(set_nx * set_ny) * p for p in org_perm], axis=0)
+    # the model spreads the value of each layer over the cells of the layer
     proxy_model = Model(total_time=total_time, set_nx=set_nx, set_ny=set_ny, set_nz=set_nz, set_dx=set_dx,
-                        set_dy=set_dy, set_dz=set_dz, perms=perms, poro=poros, report_time_step=report_time,
-                        overburden=overburden)
+                        set_dy=set_dy, set_dz=set_dz, perms=org_perm, poro=org_poro, report_time_step=report_time,
+                        overburden=overburden, initial_state=initial_state,
+                        operator_cache=OperatorCache(operator_cache_dir))
     proxy_model.init()
-    proxy_model.run(export_to_vtk=False)
+    if checkpointer is not None:
+        checkpointer.resume(proxy_model)
+    proxy_model.run(export_to_vtk=False, monitor=monitor, checkpointer=checkpointer,
+                    memo=ResultMemo(result_memo_dir, max_bytes=result_memo_bytes))
 
     pressure, temperature, _ = proxy_model.export_data()
 
     return pressure, temperature, proxy_model
 
 
-def proxy_model_simulation_he(overburden):
+def proxy_model_simulation_he(overburden, monitor=None, initial_state=None, checkpointer=None):
     """Main method to run forward simulations for given different overburden layers for heterogeneous reservoir case
     The resolution of the reservoir is fixed
 
     :param overburden: the number of the overburden layers
+    :param monitor: optional ConvergenceMonitor which stops the run once it is steady
+    :param initial_state: optional initial pressure and enthalpy of the reservoir cells, see warm_start_state
+    :param checkpointer: optional Checkpointer, the run continues from its latest checkpoint and saves new ones
     :return: 
         reservoir pressure, reservoir temperature and the geothermal model for the given overburden layers
     """
     redirect_darts_output(' ')
-    poros, perms = read_pickle_file(set_ny, set_nx, "Porosity")
+    poros, perms = read_pickle_file(set_ny, set_nx, "Porosity", cache=PropertyCache(property_cache_dir))
     proxy_model = Model(total_time=total_time, set_nx=set_nx, set_ny=set_ny, set_nz=set_nz, set_dx=set_dx,
                         set_dy=set_dy, set_dz=set_dz, perms=perms, poro=poros, report_time_step=report_time,
-                        overburden=overburden)
+                        overburden=overburden, initial_state=initial_state,
+                        operator_cache=OperatorCache(operator_cache_dir))
     proxy_model.init()
-    proxy_model.run(export_to_vtk=False)
+    if checkpointer is not None:
+        checkpointer.resume(proxy_model)
+    proxy_model.run(export_to_vtk=False, monitor=monitor, checkpointer=checkpointer,
+                    memo=ResultMemo(result_memo_dir, max_bytes=result_memo_bytes))
 
     pressure, temperature, _ = proxy_model.export_data()
 
     return pressure, temperature, proxy_model
 
 
-def proxy_model_simulation(overburden):
+def proxy_model_simulation(overburden, monitor=None, initial_state=None, checkpointer=None):
     """Main method to run forward simulations for given different overburden layers for homogeneous reservoir case
     The resolution of the reservoir is fixed
 
     :param overburden: the number of the overburden layers
+    :param monitor: optional ConvergenceMonitor which stops the run once it is steady
+    :param initial_state: optional initial pressure and enthalpy of the reservoir cells, see warm_start_state
+    :param checkpointer: optional Checkpointer, the run continues from its latest checkpoint and saves new ones
     :return: 
         reservoir pressure, reservoir temperature and the geothermal model for the given overburden layers
     """
     redirect_darts_output(' ')
-    perms = np.ones(set_nx * set_ny * set_nz) * perm
-    poros = np.ones(set_nx * set_ny * set_nz) * poro
+    # one value per layer, the model spreads them over the cells of each layer
+    perms = np.full(set_nz, perm, dtype=float)
+    poros = np.full(set_nz, poro, dtype=float)
     proxy_model = Model(total_time=total_time, set_nx=set_nx, set_ny=set_ny, set_nz=set_nz, set_dx=set_dx,
                         set_dy=set_dy, set_dz=set_dz, perms=perms, poro=poros, report_time_step=report_time,
-                        overburden=overburden)
+                        overburden=overburden, initial_state=initial_state,
+                        operator_cache=OperatorCache(operator_cache_dir))
     proxy_model.init()
-    proxy_model.run(export_to_vtk=False)
+    if checkpointer is not None:
+        checkpointer.resume(proxy_model)
+    proxy_model.run(export_to_vtk=False, monitor=monitor, checkpointer=checkpointer,
+                    memo=ResultMemo(result_memo_dir, max_bytes=result_memo_bytes))
 
     pressure, temperature, _ = proxy_model.export_data()
 
     return pressure, temperature, proxy_model
 
 
-def run_simulation():
-    overburden_layers = 0
-    temperature_dict = {}
-    pressure_dict = {}
-    print('\n')
-    print(f'overburden layers: {overburden_layers}')
-    print('\n')
-    pressure, temperature, geothermal_model = proxy_model_simulation(overburden=overburden_layers)
-
-    if not os.path.exists('SerialLayersHo'):
-        os.mkdir('SerialLayersHo')
-    # the temperature distribution of the first layer
-    top_layer_temp = temperature.reshape(geothermal_model.reservoir.nx, geothermal_model.reservoir.ny,
-                                         geothermal_model.reservoir.nz, order='F')[:, :, 1].flatten(order='F')
-    top_layer_pressure = pressure.reshape(geothermal_model.reservoir.nx, geothermal_model.reservoir.ny,
-                                         geothermal_model.reservoir.nz, order='F')[:, :, 1].flatten(order='F')
-    temperature_dict[overburden_layers] = top_layer_temp
-    pressure_dict[overburden_layers] = top_layer_pressure
-
-    if not os.path.exists('SerialLayersHo'):
-        os.mkdir('SerialLayersHo')
-    output_path = os.path.relpath(f'SerialLayersHo/temperature_layers.csv')
-    output_path_pressure = os.path.relpath(f'SerialLayersHo/pressure_layers.csv')
-    df = pd.DataFrame.from_dict(temperature_dict)
-    df.to_csv(output_path, index=False)
-    df_press = pd.DataFrame.from_dict(pressure_dict)
-    df_press.to_csv(output_path_pressure, index=False)
-
-    while np.abs(min(top_layer_temp) - max(top_layer_temp)) > 0.05:
-        overburden_layers += 2
+def record_top_layer(geothermal_model, pressure, temperature, overburden_layers, temperature_store, pressure_store,
+                     **params):
+    """Append the temperature and pressure of the top reservoir layer of one run to the result stores
+
+    :param geothermal_model: the geothermal model of the run
+    :param pressure: reservoir pressure of the run
+    :param temperature: reservoir temperature of the run
+    :param overburden_layers: the number of the overburden layers of the run
+    :param temperature_store: the store of the top layer temperature
+    :param pressure_store: the store of the top layer pressure
+    :param params: further parameters of the run which are recorded in the stores
+    :return:
+        the temperature of the top reservoir layer
+    """
+    # the layer index 1 of the grid, read as a view
+    top_layer = layer_cells(geothermal_model.reservoir.nx, geothermal_model.reservoir.ny, 1)
+    top_layer_temp = temperature[top_layer]
+    top_layer_pressure = pressure[top_layer]
+    temperature_store.append(overburden_layers, top_layer_temp, overburden=overburden_layers, **params)
+    pressure_store.append(overburden_layers, top_layer_pressure, overburden=overburden_layers, **params)
+
+    return top_layer_temp
+
+
+def run_simulation(search='bisect', steady_tolerance=None, warm_start=False, checkpoint_dir=None):
+    """Find the minimum number of confining layers for which the temperature of the top reservoir layer does not change
+
+    :param search: 'bisect' brackets the number of layers with geometric steps and bisects it, 'linear' adds two
+        layers after every run
+    :param steady_tolerance: optional tolerance in K, every run then stops once the temperature spread of the top
+        layer changed less than this over three report steps, which is meant for screening
+    :param warm_start: start every run from the final state of the finished run with the closest number of layers,
+        mapped onto its grid, instead of the uniform initial state
+    :param checkpoint_dir: optional directory, every run then saves checkpoints in its own subdirectory and an
+        interrupted run continues from its latest checkpoint
+    :return:
+        the minimum number of confining layers
+    """
+    # each run appends its own partition, read the wide tables back with ResultStore(...).read()
+    temperature_store = ResultStore(os.path.join('SerialLayersHo', 'temperature_layers'))
+    pressure_store = ResultStore(os.path.join('SerialLayersHo', 'pressure_layers'))
+    # the final states of the finished runs by the number of layers, for the warm start
+    final_states = {}
+
+    def top_layer_spread(overburden_layers):
         print('\n')
         print(f'overburden layers: {overburden_layers}')
         print('\n')
-        pressure, temperature, geothermal_model = proxy_model_simulation(overburden=overburden_layers)
-    
-        top_layer_temp = temperature.reshape(geothermal_model.reservoir.nx, geothermal_model.reservoir.ny,
-                                             geothermal_model.reservoir.nz, order='F')[:, :, 1].flatten(order='F')
-        top_layer_pressure = pressure.reshape(geothermal_model.reservoir.nx, geothermal_model.reservoir.ny,
-                                              geothermal_model.reservoir.nz, order='F')[:, :, 1].flatten(order='F')
-        temperature_dict[overburden_layers] = top_layer_temp
-        pressure_dict[overburden_layers] = top_layer_pressure
-        if os.path.exists(output_path):
-            df = pd.read_csv(output_path, delimiter=',')
-            df[overburden_layers] = top_layer_temp
-            df.to_csv(output_path, index=False)
-
-            df_press = pd.read_csv(output_path_pressure, delimiter=',')
-            df_press[overburden_layers] = top_layer_pressure
-            df_press.to_csv(output_path_pressure, index=False)
+        monitor = None
+        initial_state = None
+        checkpointer = None
+        params = {}
+        if steady_tolerance is not None:
+            monitor = ConvergenceMonitor({'spread': temperature_spread(layer_cells(set_nx, set_ny, 1))},
+                                         steady_tolerance)
+        if warm_start and final_states:
+            closest = min(final_states, key=lambda n: abs(n - overburden_layers))
+            initial_state = warm_start_state(final_states[closest], (set_nz + 2 * overburden_layers, set_ny, set_nx),
+                                             (set_dz, set_dy, set_dx), overburden_layers)
+            params['warm_start'] = closest
+        if checkpoint_dir is not None:
+            checkpointer = Checkpointer(os.path.join(checkpoint_dir, f'overburden_{overburden_layers}'), keep=2)
+        pressure, temperature, geothermal_model = proxy_model_simulation(overburden=overburden_layers, monitor=monitor,
+                                                                         initial_state=initial_state,
+                                                                         checkpointer=checkpointer)
+        if warm_start:
+            final_states[overburden_layers] = geothermal_model.checkpoint_state()
+        if monitor is not None:
+            print(f'stopped at {monitor.stop_time} days, {monitor.stop_reason}')
+            params.update(stop_time=monitor.stop_time, stop_reason=monitor.stop_reason)
+        # the temperature distribution of the first layer
+        top_layer_temp = record_top_layer(geothermal_model, pressure, temperature, overburden_layers,
+                                          temperature_store, pressure_store, **params)
+        return np.abs(min(top_layer_temp) - max(top_layer_temp))
+
+    if search == 'bisect':
+        overburden_layers, _ = bracket_and_bisect(top_layer_spread, threshold=0.05, start=0, step=2)
+    elif search == 'linear':
+        overburden_layers = 0
+        while top_layer_spread(overburden_layers) > 0.05:
+            overburden_layers += 2
+    else:
+        raise ValueError(f'Unknown search {search}...')
 
     print('\n')
     print(f'The minimum number of confining layers is: {overburden_layers}')
 
+    return overburden_layers
+
 
 if __name__ == '__main__':
     run_simulation()
@@ -5,7 +5,16 @@ from darts.engines import redirect_darts_output
 from .model import Model
 import pandas as pd
 
+from src.checkpoint import Checkpointer
+from src.convergence import GridConvergenceStudy
+from src.memo import ResultMemo
+from src.operator_cache import OperatorCache
+from src.petrophysics import porosity_to_permeability
+from src.property_cache import PropertyCache
 from src.read_files import read_pickle_file_upscaling_z, from_las_to_poro_gamma
+from src.result_store import ResultStore
+from src.search import refine_resolution
+from src.sweep import run_sweep
 
 report_time = 100
 total_time = 10000
@@ -13,8 +22,21 @@ perm = 3000
 poro = 0.2
 set_nz = 10
 
+x_spacing = 4500
+y_spacing = 4000
+z_spacing = 100
+# the resized heterogeneous fields are cached here, so that repeated resolutions reuse them
+property_cache_dir = 'PropertyCache'
+# the well logs are converted once into a columnar binary here
+las_cache_dir = 'LasCache'
+# the operator tables of the physics are computed once and shared by every run here
+operator_cache_dir = 'OperatorCache'
+# the results of finished runs by the hash of their input, a run with the same input is read from here
+result_memo_dir = 'ResultMemo'
+result_memo_bytes = 8 * 2 ** 30
 
-def proxy_model_simulation_layered(nx, ny, nz):
+
+def proxy_model_simulation_layered(nx, ny, nz, checkpointer=None):
     set_nx = nx
     set_dx = x_spacing / set_nx
     set_nz = nz
@@ -22,25 +44,29 @@ def proxy_model_simulation_layered(nx, ny, nz):
     set_ny = ny
     set_dy = y_spacing / set_ny
     # read porosity from the file
-    org_poro = from_las_to_poro_gamma('LogData/Well_PIJNACKER_GT_01_depth_gamma_4.las', nz)
-    poro = np.concatenate([np.ones(nx * ny) * p for p in org_poro], axis=0)
+    org_poro = from_las_to_poro_gamma('LogData/Well_PIJNACKER_GT_01_depth_gamma_4.las', nz,
+                                     cache_dir=las_cache_dir)
+    # one value per layer, the model spreads them over the cells of each layer
+    poro = org_poro
     # calculate permeability, this is from Duncan's thesis
-    org_perm = np.exp(110.744 * poro ** 3 - 171.8268 * poro ** 2 + 92.9227 * poro - 2.047)
-    perms = org_perm
+    perms = porosity_to_permeability(org_poro)
     redirect_darts_output('log.txt')
     proxy_model = Model(total_time=total_time, set_nx=set_nx, set_ny=set_ny, set_nz=set_nz, set_dx=set_dx,
                         set_dy=set_dy, set_dz=set_dz, perms=perms, poro=poro, report_time_step=report_time,
-                        overburden=0)
+                        overburden=0, operator_cache=OperatorCache(operator_cache_dir))
     proxy_model.init()
-    proxy_model.run(export_to_vtk=False)
+    if checkpointer is not None:
+        checkpointer.resume(proxy_model)
+    proxy_model.run(export_to_vtk=False, checkpointer=checkpointer,
+                    memo=ResultMemo(result_memo_dir, max_bytes=result_memo_bytes))
 
     td = pd.DataFrame.from_dict(proxy_model.physics.engine.time_data)
 
     return td, proxy_model
 
 
-def proxy_model_simulation_he(nx, ny, nz=10):
-    poro, perm = read_pickle_file_upscaling_z(ny, nx, nz, "Porosity20")
+def proxy_model_simulation_he(nx, ny, nz=10, checkpointer=None):
+    poro, perm = read_pickle_file_upscaling_z(ny, nx, nz, "Porosity20", cache=PropertyCache(property_cache_dir))
     set_nx = nx
     set_dx = x_spacing / set_nx
     set_nz = nz
@@ -50,22 +76,26 @@ def proxy_model_simulation_he(nx, ny, nz=10):
     redirect_darts_output('log.txt')
     proxy_model = Model(total_time=total_time, set_nx=set_nx, set_ny=set_ny, set_nz=set_nz, set_dx=set_dx,
                         set_dy=set_dy, set_dz=set_dz, perms=perm, poro=poro, report_time_step=report_time,
-                        overburden=0)
+                        overburden=0, operator_cache=OperatorCache(operator_cache_dir))
     proxy_model.init()
-    proxy_model.run(export_to_vtk=False)
+    if checkpointer is not None:
+        checkpointer.resume(proxy_model)
+    proxy_model.run(export_to_vtk=False, checkpointer=checkpointer,
+                    memo=ResultMemo(result_memo_dir, max_bytes=result_memo_bytes))
 
     td = pd.DataFrame.from_dict(proxy_model.physics.engine.time_data)
 
     return td, proxy_model
 
 
-def proxy_model_simulation(nx, ny, nz=set_nz):
+def proxy_model_simulation(nx, ny, nz=set_nz, checkpointer=None):
     """For the given nx, ny and nz constructs a homogeneous reservoir model and
     run the forward simulation
 
     :param nx: the number of cells in x direction
     :param ny: the number of cells in y direction
     :param nz: the number of cells in z directions
+    :param checkpointer: optional Checkpointer, the run continues from its latest checkpoint and saves new ones
     :return: time data and the geothermal model which is inherited from the DartsModel
     """
     set_dx = x_spacing / nx
@@ -75,22 +105,72 @@ def proxy_model_simulation(nx, ny, nz=set_nz):
     set_dz = z_spacing / nz
     set_nz = nz
     redirect_darts_output('log.txt')
-    perms = np.ones(nx * ny * nz) * perm
-    poros = np.ones(nx * ny * nz) * poro
+    # one value per layer, the model spreads them over the cells of each layer
+    perms = np.full(nz, perm, dtype=float)
+    poros = np.full(nz, poro, dtype=float)
     proxy_model = Model(total_time=total_time, set_nx=set_nx, set_ny=set_ny, set_nz=set_nz, set_dx=set_dx,
                         set_dy=set_dy, set_dz=set_dz, perms=perms, poro=poros, report_time_step=report_time,
-                        overburden=0)
+                        overburden=0, operator_cache=OperatorCache(operator_cache_dir))
     proxy_model.init()
-    proxy_model.run(export_to_vtk=False)
+    if checkpointer is not None:
+        checkpointer.resume(proxy_model)
+    proxy_model.run(export_to_vtk=False, checkpointer=checkpointer,
+                    memo=ResultMemo(result_memo_dir, max_bytes=result_memo_bytes))
 
     td = pd.DataFrame.from_dict(proxy_model.physics.engine.time_data)
 
     return td, proxy_model
 
 
-def run_simulation():
-    """Give the input of different nx, ny and nz to proxy_model_simulation
+def cell_size(nx, ny, nz):
+    """The representative cell size of a grid of the domain, the cube root of the cell volume
+
+    :param nx: the number of cells in x direction
+    :param ny: the number of cells in y direction
+    :param nz: the number of cells in z directions
+    :return: the representative cell size in m
+    """
+    return (x_spacing / nx * y_spacing / ny * z_spacing / nz) ** (1 / 3)
+
+
+def simulate_case(nx, ny, nz, reservoir_type='ho', checkpoint_dir=None):
+    """Run one case of a resolution sweep, this is the function which is executed in the worker processes
+
+    :param nx: the number of cells in x direction
+    :param ny: the number of cells in y direction
+    :param nz: the number of cells in z directions
+    :param reservoir_type: 'ho' for homogeneous, 'layered' for stratified and 'he' for heterogeneous reservoir
+    :param checkpoint_dir: optional directory, the case then saves checkpoints in its own subdirectory and continues
+        from its latest checkpoint when it is run again
+    :return: time data of the simulation
+    """
+    if reservoir_type not in reservoir_simulations:
+        raise ValueError(f'Unknown reservoir type {reservoir_type}...')
+    checkpointer = None
+    if checkpoint_dir is not None:
+        checkpointer = Checkpointer(os.path.join(checkpoint_dir, f'{reservoir_type}_{nx}_{ny}_{nz}'), keep=2)
+    td, _ = reservoir_simulations[reservoir_type](nx, ny, nz, checkpointer=checkpointer)
+
+    return td
+
+
+reservoir_simulations = {'ho': proxy_model_simulation,
+                         'layered': proxy_model_simulation_layered,
+                         'he': proxy_model_simulation_he}
 
+
+def run_simulation(max_workers=None, threads_per_worker=1, checkpoint_dir=None, gci_tolerance=None, batch_size=3):
+    """Give the input of different nx, ny and nz to proxy_model_simulation, every case runs in its own process
+
+    :param max_workers: the number of worker processes, by default as many as fit on the cores
+    :param threads_per_worker: the maximum number of threads each simulation is allowed to use
+    :param checkpoint_dir: optional directory of the checkpoints, a sweep which is run again continues every
+        unfinished case from its latest checkpoint
+    :param gci_tolerance: optional relative grid convergence index of the production temperature, e.g. 1e-3, the
+        cases then run from the coarsest to the finest grid in batches, and the sweep stops once the three finest
+        grids so far meet the tolerance
+    :param batch_size: the number of grids which run in parallel between two convergence checks, three is the least
+        a GCI estimate needs, larger batches use more workers but skip fewer grids
     :return:
     """
     nx = 225
@@ -100,31 +180,93 @@ def run_simulation():
     # list_nz = [16, 18, 20]
     list_nz = [1, 3, 5, 7, 9, 11, 13, 15]
     # list_nz = [10]
+    cases = [(nx, ny, i, 'ho', checkpoint_dir) for i in list_nz]
     for i in list_nz:
-        print('\n')
-        print(f'nz = {i}')
-        print('\n')
-        print(f'dx {x_spacing / nx:.2f}, dy {y_spacing / ny:.2f},'
-              f'dz {z_spacing / i:.2f}')
-        print('\n')
-        temperature, geothermal_model = proxy_model_simulation(nx, ny, i)
-
-        if not os.path.exists('SerialResolutionHo'):
-            os.mkdir('SerialResolutionHo')
-
-        output_path = os.path.relpath(f'SerialResolutionHo/temperature_resolution_dz.csv')
-        if os.path.exists(output_path):
-            df = pd.read_csv(output_path, delimiter=',')
-            df[f'{z_spacing / geothermal_model.reservoir.nz:.2f}'] = temperature['PRD : temperature (K)']
-            df.to_csv(output_path, index=False)
-        else:
-            temperature.rename(columns={'PRD : temperature (K)': f'{z_spacing / geothermal_model.reservoir.nz:.2f}'},
-                               inplace=True)
-            temperature[['time', f'{z_spacing / geothermal_model.reservoir.nz:.2f}']].to_csv(output_path, index=False)
+        print(f'nz = {i}: dx {x_spacing / nx:.2f}, dy {y_spacing / ny:.2f}, dz {z_spacing / i:.2f}')
+    # each finished run is appended as its own partition, read it back with ResultStore(...).read()
+    store = ResultStore(os.path.join('SerialResolutionHo', 'temperature_resolution_dz'))
+
+    def append_result(case, td):
+        set_nx, set_ny, set_nz, reservoir_type, _ = case
+        store.append(f'{z_spacing / set_nz:.2f}', td['PRD : temperature (K)'], index=td['time'],
+                     nx=set_nx, ny=set_ny, nz=set_nz, reservoir_type=reservoir_type)
+
+    if gci_tolerance is None:
+        run_sweep(simulate_case, cases, max_workers=max_workers, threads_per_worker=threads_per_worker,
+                  on_result=append_result)
+        return store.read()
+
+    study = GridConvergenceStudy(gci_tolerance)
+    # the coarsest grids first, the sweep stops before the most expensive grids once the answer has converged
+    cases.sort(key=lambda case: cell_size(*case[:3]), reverse=True)
+    for start in range(0, len(cases), batch_size):
+        batch = cases[start:start + batch_size]
+        results = run_sweep(simulate_case, batch, max_workers=max_workers, threads_per_worker=threads_per_worker,
+                            on_result=append_result)
+        for case, td in zip(batch, results):
+            estimate = study.add(cell_size(*case[:3]), td['PRD : temperature (K)'], time=td['time'])
+        if estimate is not None:
+            print(f'observed order {estimate["order"]:.2f}, GCI {estimate["gci_max"]:.2e} of the grids with cell '
+                  f'sizes {", ".join(f"{h:.2f}" for h in estimate["cell_sizes"])}')
+        if study.converged:
+            print(f'The production temperature has converged, {len(cases) - start - len(batch)} finer grids are '
+                  f'skipped')
+            break
+
+    return store.read()
+
+
+def search_resolution(start=(45, 16, 2), tolerance=0.1, max_shape=(900, 320, 40), reservoir_type='ho',
+                      max_workers=None, threads_per_worker=1):
+    """Search the coarsest dx, dy and dz together, refining the direction which changes the production temperature
+    most until refining any direction changes it by at most the tolerance, see refine_resolution
+
+    The refined grids of every iteration run in parallel, and every run is appended to a result store, so a search
+    which is run again reuses the runs of the earlier searches.
+
+    :param start: the coarsest grid (nx, ny, nz) the search starts from
+    :param tolerance: the largest accepted change of the production temperature in K
+    :param max_shape: the finest grid (nx, ny, nz) the search can refine to
+    :param reservoir_type: 'ho' for homogeneous, 'layered' for stratified and 'he' for heterogeneous reservoir
+    :param max_workers: the number of worker processes, by default as many as fit on the cores
+    :param threads_per_worker: the maximum number of threads each simulation is allowed to use
+    :return:
+        the accepted (dx, dy, dz), the number of runs of the search and whether it converged within max_shape
+    """
+    store = ResultStore(os.path.join('SerialResolutionHo', 'temperature_resolution_search'))
+    table = store.read()
+    evaluated = {}
+    for entry in store.entries():
+        params = entry['params']
+        if params['reservoir_type'] == reservoir_type:
+            evaluated[(params['nx'], params['ny'], params['nz'])] = table[entry['column']].dropna().to_numpy()
+    reused = len(evaluated)
+
+    def append_result(case, td):
+        set_nx, set_ny, set_nz, case_type = case
+        store.append(f'{case_type}_{set_nx}x{set_ny}x{set_nz}', td['PRD : temperature (K)'], index=td['time'],
+                     nx=set_nx, ny=set_ny, nz=set_nz, reservoir_type=case_type)
+
+    def evaluate(shapes):
+        for nx, ny, nz in shapes:
+            print(f'run nx = {nx}, ny = {ny}, nz = {nz}')
+        results = run_sweep(simulate_case, [(nx, ny, nz, reservoir_type) for nx, ny, nz in shapes],
+                            max_workers=max_workers, threads_per_worker=threads_per_worker, on_result=append_result)
+        return [td['PRD : temperature (K)'].to_numpy() for td in results]
+
+    (nx, ny, nz), evaluated, history, converged = refine_resolution(evaluate, start, tolerance, max_shape=max_shape,
+                                                                    evaluated=evaluated)
+    for shape, changes in history:
+        print(f'{shape}: change of refining x {changes.get(0)}, y {changes.get(1)}, z {changes.get(2)}')
+    resolution = f'dx {x_spacing / nx:.2f}, dy {y_spacing / ny:.2f}, dz {z_spacing / nz:.2f}'
+    if converged:
+        print(f'The coarsest converged resolution is {resolution} after {len(evaluated) - reused} runs')
+    else:
+        print(f'The search stopped at the finest grid {max_shape} without converging to the tolerance {tolerance}, '
+              f'the finest searched resolution is {resolution} after {len(evaluated) - reused} runs')
+
+    return (x_spacing / nx, y_spacing / ny, z_spacing / nz), len(evaluated) - reused, converged
 
 
 if __name__ == '__main__':
-    x_spacing = 4500
-    y_spacing = 4000
-    z_spacing = 100
     run_simulation()
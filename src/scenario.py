@@ -0,0 +1,129 @@
+import itertools
+
+try:
+    import tomllib
+except ModuleNotFoundError:
+    # python < 3.11
+    import tomli as tomllib
+
+# the parameters of a job and their defaults, these are the values of the serial studies
+DEFAULTS = {'reservoir_type': 'ho',
+            'nx': None,
+            'ny': None,
+            'nz': None,
+            'overburden': 0,
+            'report_time': 100,
+            'total_time': 10000,
+            'perm': 3000,
+            'poro': 0.2,
+            'x_spacing': 4500,
+            'y_spacing': 4000,
+            'z_spacing': 100,
+            # optional cell sizes, by default the spacing divided by the number of cells
+            'dx': None,
+            'dy': None,
+            'dz': None,
+            'las_file': 'LogData/Well_PIJNACKER_GT_01_depth_gamma_4.las',
+            'porosity_dir': 'Porosity20',
+            'output': 'PRD : temperature (K)'}
+RESERVOIR_TYPES = ('ho', 'layered', 'he')
+# the parameters which can be given as a list of values, every combination of the values is one job
+SWEEP_PARAMETERS = ('reservoir_type', 'nx', 'ny', 'nz', 'overburden', 'report_time', 'total_time', 'perm', 'poro')
+
+
+def load_scenarios(path):
+    """Read the scenarios of a TOML file
+
+    The [defaults] table applies to every scenario, and every [[scenario]] table is one scenario with a name. A
+    parameter which is a list, e.g. nz = [1, 3, 5], makes one job per value, several lists make one job per
+    combination of their values.
+
+    :param path: the path of the TOML file
+    :type path: str
+    :return:
+        the parameters of each scenario, with the defaults filled in
+    :rtype: list
+    """
+    with open(path, 'rb') as f:
+        document = tomllib.load(f)
+    unknown = set(document) - {'defaults', 'scenario'}
+    if unknown:
+        raise ValueError(f'Unknown table {", ".join(sorted(unknown))} in {path}...')
+    defaults = document.get('defaults', {})
+    scenarios = []
+    for i, table in enumerate(document.get('scenario', [])):
+        scenario = {**defaults, **table}
+        scenario.setdefault('name', f'scenario_{i}')
+        scenarios.append(validate_scenario(scenario))
+
+    return scenarios
+
+
+def validate_scenario(scenario):
+    """Check the parameters of a scenario and fill in the defaults
+
+    :param scenario: the parameters of the scenario, including its name
+    :type scenario: dict
+    :return:
+        the parameters of the scenario with the defaults filled in
+    :rtype: dict
+    """
+    name = scenario.get('name', 'scenario')
+    unknown = set(scenario) - set(DEFAULTS) - {'name'}
+    if unknown:
+        raise ValueError(f'Unknown parameter {", ".join(sorted(unknown))} in scenario {name}...')
+    scenario = {**DEFAULTS, **scenario}
+    for key in ('nx', 'ny', 'nz'):
+        if scenario[key] is None:
+            raise ValueError(f'The grid parameter {key} is missing in scenario {name}...')
+    for key, value in scenario.items():
+        if isinstance(value, list) and key not in SWEEP_PARAMETERS:
+            raise ValueError(f'The parameter {key} of scenario {name} cannot be a list...')
+    reservoir_types = scenario['reservoir_type']
+    for reservoir_type in reservoir_types if isinstance(reservoir_types, list) else [reservoir_types]:
+        if reservoir_type not in RESERVOIR_TYPES:
+            raise ValueError(f'Unknown reservoir type {reservoir_type} in scenario {name}...')
+
+    return scenario
+
+
+def expand_scenario(scenario):
+    """Expand a scenario into its jobs, one job per combination of the values of the list parameters
+
+    :param scenario: the parameters of the scenario
+    :type scenario: dict
+    :return:
+        the parameters of each job, with a name made from the scenario name and the swept values
+    :rtype: list
+    """
+    swept = [key for key in SWEEP_PARAMETERS if isinstance(scenario[key], list)]
+    jobs = []
+    for values in itertools.product(*(scenario[key] for key in swept)):
+        job = {**scenario, **dict(zip(swept, values))}
+        job['scenario'] = scenario['name']
+        job['name'] = '_'.join([scenario['name']] + [f'{key}-{value}' for key, value in zip(swept, values)])
+        jobs.append(job)
+
+    return jobs
+
+
+def expand_jobs(scenarios, only=None):
+    """Expand scenarios into the list of their jobs
+
+    :param scenarios: the scenarios, see load_scenarios
+    :type scenarios: list
+    :param only: optional names of the scenarios to expand, by default all
+    :type only: list
+    :return:
+        the parameters of each job
+    :rtype: list
+    """
+    jobs = []
+    for scenario in scenarios:
+        if only is None or scenario['name'] in only:
+            jobs.extend(expand_scenario(scenario))
+    names = [job['name'] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError('The names of the jobs are not unique, please check the scenario names...')
+
+    return jobs
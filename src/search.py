@@ -0,0 +1,127 @@
+import numpy as np
+
+
+def bracket_and_bisect(evaluate, threshold, start=0, step=2):
+    """Find the smallest value on the grid start, start + step, start + 2 * step, ... for which the evaluated quantity
+    is not larger than the threshold
+
+    The quantity has to decrease with the value, like the temperature spread of the top reservoir layer decreases with
+    the number of overburden layers. The threshold is first bracketed with geometrically growing steps and the
+    bracket is then bisected, which takes about 2 * log2 of the answer evaluations instead of answer / step.
+
+    :param evaluate: the function which returns the quantity for the given value
+    :type evaluate: callable
+    :param threshold: the largest accepted quantity
+    :type threshold: float
+    :param start: the first value on the grid
+    :type start: int
+    :param step: the spacing of the grid
+    :type step: int
+    :return:
+        the smallest accepted value and the quantity of every evaluated value
+    :rtype: int, dict
+    """
+    evaluated = {}
+
+    def accepted(value):
+        if value not in evaluated:
+            evaluated[value] = evaluate(value)
+        return evaluated[value] <= threshold
+
+    if accepted(start):
+        return start, evaluated
+
+    # bracket the threshold, lower is rejected and upper is accepted
+    lower = 0
+    upper = 1
+    while not accepted(start + upper * step):
+        lower = upper
+        upper *= 2
+
+    # bisect the bracket
+    while upper - lower > 1:
+        middle = (lower + upper) // 2
+        if accepted(start + middle * step):
+            upper = middle
+        else:
+            lower = middle
+
+    return start + upper * step, evaluated
+
+
+def max_abs_difference(refined, current):
+    """The largest absolute difference of the results of a refined and the current grid
+
+    :param refined: the result of the refined grid, e.g. the production temperature curve
+    :type refined: np.ndarray
+    :param current: the result of the current grid
+    :type current: np.ndarray
+    :return:
+        the largest absolute difference
+    :rtype: float
+    """
+    return float(np.max(np.abs(np.asarray(refined, dtype=float) - np.asarray(current, dtype=float))))
+
+
+def refine_resolution(evaluate, start, tolerance, refinement=2, max_shape=None, error=max_abs_difference,
+                      evaluated=None):
+    """Find a coarse grid whose result does not change by more than the tolerance when any direction is refined
+
+    The search starts on the coarse grid and refines one direction at a time. In every iteration each direction is
+    refined by the refinement factor on its own, and the direction whose refinement changes the result most is
+    refined. The search stops when no direction changes the result by more than the tolerance. Every grid is only
+    evaluated once, so a refined grid which was tried before is reused, and the evaluations of an earlier search can
+    be given. A search which cannot refine a direction within max_shape anymore is only converged if the last
+    refinement of that direction already changed the result by at most the tolerance.
+
+    :param evaluate: the function which returns the results of a list of grid shapes, e.g. by running them in
+        parallel
+    :type evaluate: callable
+    :param start: the shape of the coarsest grid, e.g. (nx, ny, nz)
+    :type start: tuple
+    :param tolerance: the largest accepted change of the result
+    :type tolerance: float
+    :param refinement: the factor the number of cells of a direction is multiplied with
+    :type refinement: float
+    :param max_shape: optional largest number of cells of each direction
+    :type max_shape: tuple
+    :param error: the function which gives the change between the results of the refined and the current grid
+    :type error: callable
+    :param evaluated: optional results of grid shapes which were evaluated before
+    :type evaluated: dict
+    :return:
+        the shape of the accepted grid, the result of every evaluated shape, the shape and the change of each
+        direction in every iteration, and whether the result converged or the search stopped at max_shape
+    :rtype: tuple, dict, list, bool
+    """
+    evaluated = {} if evaluated is None else evaluated
+    history = []
+    # the latest change of each direction, also of the directions which reached max_shape
+    latest_changes = {}
+
+    def results(shapes):
+        missing = [shape for shape in dict.fromkeys(shapes) if shape not in evaluated]
+        if missing:
+            for shape, result in zip(missing, evaluate(missing)):
+                evaluated[shape] = result
+        return [evaluated[shape] for shape in shapes]
+
+    shape = tuple(int(n) for n in start)
+    while True:
+        candidates = {}
+        for axis, n in enumerate(shape):
+            refined = list(shape)
+            refined[axis] = int(np.ceil(n * refinement))
+            if max_shape is None or refined[axis] <= max_shape[axis]:
+                candidates[axis] = tuple(refined)
+        if not candidates:
+            return shape, evaluated, history, False
+
+        current, *refined_results = results([shape] + list(candidates.values()))
+        changes = {axis: error(result, current) for axis, result in zip(candidates, refined_results)}
+        history.append((shape, changes))
+        latest_changes.update(changes)
+        worst = max(changes, key=changes.get)
+        if changes[worst] <= tolerance:
+            return shape, evaluated, history, max(latest_changes.values()) <= tolerance
+        shape = candidates[worst]
@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    # threadpoolctl is optional, without it only the environment variables limit the threads
+    threadpool_limits = None
+
+# environment variables read by the OpenMP/BLAS runtimes when a worker starts its first parallel region
+THREAD_LIMIT_VARIABLES = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+
+def limit_threads(threads_per_worker):
+    """Cap the number of threads the numerical libraries use in the current process
+
+    The environment variables are only read when a runtime initializes. A worker which is forked from a parent whose
+    OpenMP or BLAS runtime already started inherits the thread pools of the parent, and the variables have no effect
+    on them. If threadpoolctl is installed, the thread pools which are already loaded are limited as well.
+
+    :param threads_per_worker: the maximum number of threads for each worker process
+    :type threads_per_worker: int
+    :return:
+        None
+    """
+    for variable in THREAD_LIMIT_VARIABLES:
+        os.environ[variable] = str(threads_per_worker)
+    if threadpool_limits is not None:
+        threadpool_limits(limits=threads_per_worker)
+
+
+def default_workers(threads_per_worker=1):
+    """The number of worker processes which fit on this machine for the given threads per worker
+
+    :param threads_per_worker: the number of threads each worker is allowed to use
+    :type threads_per_worker: int
+    :return:
+        the number of worker processes
+    :rtype: int
+    """
+    return max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+
+def run_sweep(simulate, cases, max_workers=None, threads_per_worker=1, on_result=None, keep_results=True):
+    """Run every case of a sweep in its own worker process
+
+    Each case is a tuple of positional arguments for ``simulate``, e.g. (nx, ny, nz, reservoir type). ``simulate``
+    must be a module level function so that it can be sent to the worker processes, and its return value must be
+    picklable.
+
+    :param simulate: the function which runs one simulation
+    :type simulate: callable
+    :param cases: the arguments of each simulation
+    :type cases: list
+    :param max_workers: the number of worker processes, by default as many as fit on the cores
+    :type max_workers: int
+    :param threads_per_worker: the maximum number of threads each worker is allowed to use
+    :type threads_per_worker: int
+    :param on_result: optional callback which is called with (case, result) as soon as a case finishes
+    :type on_result: callable
+    :param keep_results: keep the results to return them, with False every result is dropped after on_result, so that
+        the memory of a long sweep stays flat
+    :type keep_results: bool
+    :return:
+        the results of the simulations in the same order as the cases, None for every case without keep_results
+    :rtype: list
+    """
+    cases = [tuple(case) for case in cases]
+    if max_workers is None:
+        max_workers = default_workers(threads_per_worker)
+    max_workers = min(max_workers, len(cases)) or 1
+
+    results = [None] * len(cases)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=limit_threads,
+                             initargs=(threads_per_worker,)) as executor:
+        futures = {executor.submit(simulate, *case): i for i, case in enumerate(cases)}
+        for future in as_completed(futures):
+            i = futures.pop(future)
+            result = future.result()
+            if on_result is not None:
+                on_result(cases[i], result)
+            if keep_results:
+                results[i] = result
+
+    return results
+
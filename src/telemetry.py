@@ -0,0 +1,236 @@
+import json
+import os
+import sys
+import time
+import uuid
+
+try:
+    import resource
+except ImportError:
+    # resource is not available on Windows, the peak memory is then not recorded
+    resource = None
+
+# the counters of the simulation statistics of the darts engine, by the name they are recorded with
+ENGINE_COUNTERS = {'newton': 'n_newton_total',
+                   'linear': 'n_linear_total',
+                   'newton_wasted': 'n_newton_wasted',
+                   'linear_wasted': 'n_linear_wasted',
+                   'timesteps': 'n_timesteps_total',
+                   'timestep_cuts': 'n_timesteps_wasted'}
+
+
+def peak_rss():
+    """The peak resident memory of this process
+
+    :return:
+        the peak resident memory in bytes, or None if it is not available
+    :rtype: int
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def engine_counters(model):
+    """The cumulative iteration and time step counters of the engine of a model
+
+    :param model: the geothermal model
+    :return:
+        the value of each counter of ENGINE_COUNTERS, counters which the engine does not have are left out
+    :rtype: dict
+    """
+    stat = model.physics.engine.stat
+    return {name: getattr(stat, attribute) for name, attribute in ENGINE_COUNTERS.items() if hasattr(stat, attribute)}
+
+
+def timer_tree(node):
+    """The times of a darts timer and all of its sub-timers
+
+    :param node: the timer, e.g. model.timer
+    :return:
+        the time in seconds and the sub-timers by name, as nested dicts
+    :rtype: dict
+    """
+    return {'seconds': node.get_timer(), 'children': {name: timer_tree(child) for name, child in node.node.items()}}
+
+
+def flatten_timer_tree(tree, prefix=''):
+    """The times of a timer tree by path
+
+    :param tree: the timer tree, see timer_tree
+    :param prefix: the path of the tree
+    :return:
+        the time in seconds of every timer by its path, e.g. 'simulation/jacobian assembly'
+    :rtype: dict
+    """
+    times = {}
+    for name, child in tree['children'].items():
+        path = f'{prefix}/{name}' if prefix else name
+        times[path] = child['seconds']
+        times.update(flatten_timer_tree(child, path))
+
+    return times
+
+
+def _prometheus_labels(labels):
+    """Format the labels of a Prometheus sample"""
+    escaped = {name: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for name, value in labels.items()}
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped.items()) + '}'
+
+
+class RunTelemetry:
+    """Record where the time of a run goes, as a JSON lines log with one event per line
+
+    Every report step is one 'report_step' event with the wall time of the step, the Newton and linear iterations,
+    the wasted iterations and the time step cuts of the step, and the peak resident memory of the process. The end
+    of the run is one 'run' event with the totals and the whole darts timer tree. Optionally the totals and the timer
+    tree are also written as a Prometheus textfile, e.g. for the node exporter textfile collector.
+    """
+
+    def __init__(self, path, run_id=None, labels=None, prometheus_path=None):
+        """The constructor of the telemetry
+
+        :param path: the path of the JSON lines log, the events are appended
+        :type path: str
+        :param run_id: the id of the run, a random one by default
+        :type run_id: str
+        :param labels: further labels of the run which are written with every event, e.g. the grid size
+        :type labels: dict
+        :param prometheus_path: optional path of the Prometheus textfile
+        :type prometheus_path: str
+        """
+        self.path = path
+        self.run_id = run_id if run_id is not None else uuid.uuid4().hex
+        self.labels = dict(labels or {})
+        self.prometheus_path = prometheus_path
+        self.steps = 0
+        self._start = None
+        self._last_wall = None
+        self._first_counters = {}
+        self._last_counters = {}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _write(self, event):
+        event = {'event': event.pop('event'), 'run': self.run_id, **self.labels, **event}
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(event) + '\n')
+
+    def start(self, model):
+        """Start the clock of the run, this is called by Model.run before the first report step
+
+        :param model: the geothermal model
+        :return:
+            None
+        """
+        self.start_counters(engine_counters(model))
+
+    def start_counters(self, counters):
+        """Start the clock of the run with the given engine counters
+
+        :param counters: the cumulative engine counters at the start, see engine_counters
+        :type counters: dict
+        :return:
+            None
+        """
+        self._start = self._last_wall = time.perf_counter()
+        self._first_counters = dict(counters)
+        self._last_counters = dict(counters)
+
+    def step(self, simulation_time, model):
+        """Record a report step, this is called by Model.run after every report step
+
+        :param simulation_time: the simulation time at the end of the report step
+        :type simulation_time: float
+        :param model: the geothermal model
+        :return:
+            the recorded event
+        :rtype: dict
+        """
+        return self.step_counters(simulation_time, engine_counters(model))
+
+    def step_counters(self, simulation_time, counters):
+        """Record a report step with the given engine counters
+
+        :param simulation_time: the simulation time at the end of the report step
+        :type simulation_time: float
+        :param counters: the cumulative engine counters after the report step, see engine_counters
+        :type counters: dict
+        :return:
+            the recorded event
+        :rtype: dict
+        """
+        now = time.perf_counter()
+        event = {'step': self.steps, 'time': simulation_time, 'wall_time': now - self._last_wall}
+        event.update({name: value - self._last_counters.get(name, 0) for name, value in counters.items()})
+        event['peak_rss'] = peak_rss()
+        self._write({'event': 'report_step', **event})
+        self.steps += 1
+        self._last_wall = now
+        self._last_counters = dict(counters)
+
+        return event
+
+    def finish(self, model):
+        """Record the end of the run with the whole timer tree, this is called by Model.run after the last step
+
+        :param model: the geothermal model
+        :return:
+            the recorded event
+        :rtype: dict
+        """
+        return self.finish_counters(model.physics.engine.t, engine_counters(model), timer_tree(model.timer))
+
+    def finish_counters(self, simulation_time, counters, timers=None):
+        """Record the end of the run with the given engine counters and timer tree
+
+        :param simulation_time: the simulation time at the end of the run
+        :type simulation_time: float
+        :param counters: the cumulative engine counters at the end of the run, see engine_counters
+        :type counters: dict
+        :param timers: optional timer tree, see timer_tree
+        :type timers: dict
+        :return:
+            the recorded event
+        :rtype: dict
+        """
+        event = {'steps': self.steps, 'time': simulation_time, 'wall_time': time.perf_counter() - self._start}
+        event.update({name: value - self._first_counters.get(name, 0) for name, value in counters.items()})
+        event['peak_rss'] = peak_rss()
+        event['timers'] = timers
+        self._write({'event': 'run', **event})
+        if self.prometheus_path is not None:
+            self.write_prometheus(event)
+
+        return event
+
+    def write_prometheus(self, event):
+        """Write the totals of a run as a Prometheus textfile, replacing the file in one rename
+
+        :param event: the 'run' event, see finish
+        :type event: dict
+        :return:
+            None
+        """
+        labels = {'run': self.run_id, **self.labels}
+        lines = []
+        for name in ['wall_time', 'time', 'steps', 'peak_rss'] + list(ENGINE_COUNTERS):
+            if event.get(name) is None:
+                continue
+            metric = f'dugs_run_{name}'
+            lines += [f'# TYPE {metric} gauge', f'{metric}{_prometheus_labels(labels)} {event[name]}']
+        if event.get('timers') is not None:
+            lines.append('# TYPE dugs_timer_seconds gauge')
+            for path, seconds in flatten_timer_tree(event['timers']).items():
+                lines.append(f'dugs_timer_seconds{_prometheus_labels({**labels, "timer": path})} {seconds}')
+        directory = os.path.dirname(self.prometheus_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f'{self.prometheus_path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temporary, self.prometheus_path)
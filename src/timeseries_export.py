@@ -0,0 +1,171 @@
+import os
+import queue
+import threading
+
+import h5py
+import numpy as np
+
+
+class TimeSeriesExporter:
+    """Write cell data of a structured grid at many report steps into one compressed HDF5 file with an XDMF index
+
+    Every field is one appendable, chunked and compressed dataset of shape (number of steps, nz, ny, nx), and the
+    XDMF file describes the grid and a temporal collection of the steps, so ParaView reads the whole run as one time
+    series. The data is copied when ``write`` is called and written to disk on a background thread, so the simulation
+    can continue while the previous step is written.
+    """
+
+    def __init__(self, path, shape, spacing, fields=None, every=1, compression='gzip', compression_opts=4,
+                 max_pending=4):
+        """The constructor of the exporter
+
+        :param path: the path of the output without extension, path.h5 and path.xdmf are written
+        :type path: str
+        :param shape: the number of cells (nz, ny, nx) of the grid, x is the fastest changing index of the cell data
+        :type shape: tuple
+        :param spacing: the cell size (dz, dy, dx) of the grid
+        :type spacing: tuple
+        :param fields: the names of the fields to write, by default all fields which are given to ``write``
+        :type fields: list
+        :param every: only every Nth call of ``write`` is written, the first call is always written
+        :type every: int
+        :param compression: the HDF5 compression filter, None for no compression
+        :type compression: str
+        :param compression_opts: the options of the compression filter, e.g. the gzip level
+        :type compression_opts: int
+        :param max_pending: the number of steps which can wait to be written before ``write`` blocks
+        :type max_pending: int
+        """
+        self.path = path
+        self.shape = tuple(int(n) for n in shape)
+        self.spacing = tuple(float(d) for d in spacing)
+        self.fields = None if fields is None else list(fields)
+        self.every = every
+        self.compression = compression
+        self.compression_opts = compression_opts if compression is not None else None
+        self.n_cells = int(np.prod(self.shape))
+        self.times = []
+        self._calls = 0
+        self._error = None
+        self._queue = queue.Queue(maxsize=max_pending)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = h5py.File(f'{self.path}.h5', 'w')
+        self._thread = threading.Thread(target=self._write_steps, daemon=True)
+        self._thread.start()
+
+    def write(self, time, cell_data):
+        """Queue the cell data of one report step
+
+        :param time: the time of the report step
+        :type time: float
+        :param cell_data: the values of each cell for every field, or a function which returns them and which is
+            only called when the step is written
+        :type cell_data: dict
+        :return:
+            True if the step is written, False if it is skipped
+        :rtype: bool
+        """
+        self._raise_error()
+        self._calls += 1
+        if (self._calls - 1) % self.every:
+            return False
+        if callable(cell_data):
+            cell_data = cell_data()
+        names = cell_data.keys() if self.fields is None else self.fields
+        data = {}
+        for name in names:
+            values = np.asarray(cell_data[name])
+            if values.size != self.n_cells:
+                raise ValueError(f'The field {name} does not have one value per cell...')
+            # copy the values, the simulation changes them while this step waits to be written
+            data[name] = np.array(values, dtype=float).reshape(self.shape)
+        self._queue.put((float(time), data))
+
+        return True
+
+    def close(self):
+        """Write the remaining steps and the XDMF file and close the HDF5 file
+
+        :return:
+            None
+        """
+        if self._file is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        self._file = None
+        self._write_xdmf()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _write_steps(self):
+        """Write the queued steps until close is called, this runs on the background thread"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                time, data = item
+                step = len(self.times)
+                for name, values in data.items():
+                    if name not in self._file:
+                        self._file.create_dataset(name, shape=(0,) + self.shape, maxshape=(None,) + self.shape,
+                                                  chunks=(1, 1) + self.shape[1:], dtype='f8', compression=self.compression,
+                                                  compression_opts=self.compression_opts)
+                    dataset = self._file[name]
+                    dataset.resize(step + 1, axis=0)
+                    dataset[step] = values
+                self._file.flush()
+                self.times.append(time)
+            except Exception as e:
+                self._error = e
+
+    def _write_xdmf(self):
+        """Write the XDMF file which describes the grid and the steps in the HDF5 file"""
+        nz, ny, nx = self.shape
+        dz, dy, dx = self.spacing
+        h5_name = os.path.basename(f'{self.path}.h5')
+        with h5py.File(f'{self.path}.h5', 'r') as f:
+            names = list(f.keys())
+        lines = ['<?xml version="1.0" ?>',
+                 '<Xdmf Version="3.0">',
+                 '  <Domain>',
+                 '    <Grid Name="TimeSeries" GridType="Collection" CollectionType="Temporal">']
+        for step, time in enumerate(self.times):
+            lines += [f'      <Grid Name="step_{step}" GridType="Uniform">',
+                      f'        <Time Value="{time}"/>',
+                      f'        <Topology TopologyType="3DCoRectMesh" Dimensions="{nz + 1} {ny + 1} {nx + 1}"/>',
+                      '        <Geometry GeometryType="ORIGIN_DXDYDZ">',
+                      '          <DataItem Dimensions="3" Format="XML">0 0 0</DataItem>',
+                      f'          <DataItem Dimensions="3" Format="XML">{dz} {dy} {dx}</DataItem>',
+                      '        </Geometry>']
+            for name in names:
+                lines += [f'        <Attribute Name="{name}" AttributeType="Scalar" Center="Cell">',
+                          f'          <DataItem ItemType="HyperSlab" Dimensions="{nz} {ny} {nx}">',
+                          '            <DataItem Dimensions="3 4" Format="XML">',
+                          f'              {step} 0 0 0 1 1 1 1 1 {nz} {ny} {nx}',
+                          '            </DataItem>',
+                          f'            <DataItem Dimensions="{len(self.times)} {nz} {ny} {nx}" Format="HDF">'
+                          f'{h5_name}:/{name}</DataItem>',
+                          '          </DataItem>',
+                          '        </Attribute>']
+            lines.append('      </Grid>')
+        lines += ['    </Grid>', '  </Domain>', '</Xdmf>', '']
+        with open(f'{self.path}.xdmf', 'w') as f:
+            f.write('\n'.join(lines))
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from src.checkpoint import Checkpointer, load_checkpoint, remap_field, save_checkpoint, warm_start_state
+
+
+class FakeModel:
+    """Stands in for Model, the state is advanced by hand"""
+
+    def __init__(self):
+        self.X = np.zeros(8)
+        self.t = 0.0
+        self.inj_rate = 7500
+
+    def checkpoint_state(self):
+        return {'X': self.X.copy(), 't': self.t, 'time_data': {'time': [self.t]}, 'inj_rate': self.inj_rate}
+
+    def restore(self, state):
+        self.X[:] = state['X']
+        self.t = state['t']
+        self.inj_rate = state['inj_rate']
+
+
+class TestCheckpoint:
+    def test_save_and_load_checkpoint(self, tmp_path):
+        # Arrange
+        path = str(tmp_path / 'checkpoint.npz')
+        state = {'X': np.arange(6.0), 't': 250.0, 'time_data': {'time': [100.0, 200.0, 250.0]}, 'inj_rate': 7500,
+                 'shape': [3, 1, 1]}
+        # Action
+        save_checkpoint(path, state)
+        actual_state = load_checkpoint(path)
+        # Assert
+        np.testing.assert_almost_equal(actual_state['X'], state['X'], 8)
+        assert actual_state['t'] == 250.0
+        assert actual_state['time_data'] == {'time': [100.0, 200.0, 250.0]}
+        assert actual_state['inj_rate'] == 7500
+        assert actual_state['shape'] == [3, 1, 1]
+
+    def test_resume_from_the_latest_checkpoint(self, tmp_path):
+        # Arrange
+        checkpointer = Checkpointer(str(tmp_path), every=2, keep=2)
+        model = FakeModel()
+        for step in range(1, 7):
+            model.t = step * 100.0
+            model.X[:] = step
+            model.inj_rate = 7000 + step
+            checkpointer.save(model)
+        restarted_model = FakeModel()
+        # Action
+        restart_time = checkpointer.resume(restarted_model)
+        # Assert
+        assert len(checkpointer.checkpoints()) == 2
+        assert restart_time == 600.0
+        np.testing.assert_almost_equal(restarted_model.X, np.ones(8) * 6, 8)
+        assert restarted_model.inj_rate == 7006
+
+    def test_resume_without_checkpoint(self, tmp_path):
+        # Arrange
+        checkpointer = Checkpointer(str(tmp_path))
+        # Action
+        restart_time = checkpointer.resume(FakeModel())
+        # Assert
+        assert restart_time is None
+
+    def test_remap_field_to_more_overburden_layers(self):
+        # Arrange
+        test_field = np.repeat([300.0, 310.0, 320.0, 330.0], 2)
+        # one overburden layer more on each side, the grids are aligned at the top of the reservoir
+        expected_field = np.repeat([300.0, 300.0, 310.0, 320.0, 330.0, 330.0], 2)
+        # Action
+        actual_field = remap_field(test_field, (4, 1, 2), (10, 1, 1), 1, (6, 1, 2), (10, 1, 1), 2)
+        # Assert
+        np.testing.assert_almost_equal(actual_field, expected_field, 8)
+
+    def test_remap_field_to_a_finer_grid(self):
+        # Arrange
+        test_field = np.array([0.0, 10.0, 20.0])
+        expected_field = np.array([0.0, 2.5, 7.5, 12.5, 17.5, 20.0])
+        # Action
+        actual_field = remap_field(test_field, (1, 1, 3), (1, 1, 2), 0, (1, 1, 6), (1, 1, 1), 0)
+        # Assert
+        np.testing.assert_almost_equal(actual_field, expected_field, 8)
+
+    def test_warm_start_state_splits_the_state_vector(self):
+        # Arrange
+        state = {'X': np.array([200.0, 20000.0, 210.0, 21000.0, 1.0, 1.0]), 'shape': [2, 1, 1],
+                 'spacing': [10, 1, 1], 'overburden': 0}
+        # Action
+        initial_state = warm_start_state(state, (2, 1, 1), (10, 1, 1), 0)
+        # Assert
+        np.testing.assert_almost_equal(initial_state['pressure'], [200.0, 210.0], 8)
+        np.testing.assert_almost_equal(initial_state['enthalpy'], [20000.0, 21000.0], 8)
+
+    def test_remap_field_throw_exception(self):
+        # Assert
+        with pytest.raises(ValueError) as context:
+            remap_field(np.ones(5), (2, 1, 2), (1, 1, 1), 0, (2, 1, 2), (1, 1, 1), 0)
+        assert 'The number of values does not match the shape of the grid...' in str(context.value)
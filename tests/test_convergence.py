@@ -0,0 +1,62 @@
+import numpy as np
+
+from src.convergence import GridConvergenceStudy, grid_convergence_index, observed_order, richardson_extrapolation
+
+
+def solution(h, time):
+    """A curve with a second order discretization error"""
+    return 350 - 0.001 * time + 0.05 * h ** 2 * (1 + time / 1000)
+
+
+class TestConvergence:
+    def test_observed_order_of_a_second_order_solution(self):
+        # Arrange
+        time = np.linspace(0, 1000, 11)
+        # unequal refinement ratios
+        f1, f2, f3 = solution(1.0, time), solution(1.5, time), solution(2.5, time)
+        # Action
+        p = observed_order(f1, f2, f3, 1.5, 2.5 / 1.5)
+        # Assert
+        np.testing.assert_almost_equal(p, 2.0, 6)
+
+    def test_richardson_extrapolation_removes_the_error(self):
+        # Arrange
+        time = np.linspace(0, 1000, 11)
+        # Action
+        extrapolated = richardson_extrapolation(solution(1.0, time), solution(2.0, time), 2.0, 2.0)
+        # Assert
+        np.testing.assert_almost_equal(extrapolated, solution(0.0, time), 8)
+
+    def test_grid_convergence_index(self):
+        # Arrange
+        f1 = np.array([100.0])
+        f2 = np.array([103.0])
+        # Action
+        gci = grid_convergence_index(f1, f2, 2.0, 2.0)
+        # Assert
+        np.testing.assert_almost_equal(gci, [1.25 * 0.03 / 3], 8)
+
+    def test_study_converges_once_the_finest_grids_meet_the_tolerance(self):
+        # Arrange
+        time = np.linspace(0, 1000, 11)
+        study = GridConvergenceStudy(tolerance=1e-4)
+        # Action
+        estimates = [study.add(h, solution(h, time), time=time) for h in [8.0, 4.0, 2.0, 1.0, 0.5]]
+        # Assert
+        assert estimates[:2] == [None, None]
+        assert [estimate['converged'] for estimate in estimates[2:]] == [False, False, True]
+        np.testing.assert_almost_equal(estimates[-1]['order'], 2.0, 6)
+        assert study.converged
+
+    def test_study_interpolates_onto_the_times_of_the_finest_grid(self):
+        # Arrange
+        study = GridConvergenceStudy(tolerance=1e-3)
+        fine_time = np.linspace(0, 1000, 21)
+        coarse_time = np.linspace(0, 1000, 11)
+        # Action
+        study.add(4.0, solution(4.0, coarse_time), time=coarse_time)
+        study.add(2.0, solution(2.0, coarse_time), time=coarse_time)
+        estimate = study.add(1.0, solution(1.0, fine_time), time=fine_time)
+        # Assert
+        assert estimate['gci'].shape == fine_time.shape
+        np.testing.assert_almost_equal(estimate['extrapolated'], solution(0.0, fine_time), 8)
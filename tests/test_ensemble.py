@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from src.ensemble import EnsembleSummary, QuantileSketch, RunningMoments, breakthrough_time
+from src.math_rel import krige_layers
+
+
+def member_temperature(time, breakthrough):
+    """A production temperature which falls by 2 K per 1000 days after the breakthrough at 0 K drop"""
+    return 350.0 - np.maximum(time - breakthrough, 0.0) * 2e-3
+
+
+class TestEnsemble:
+    def test_running_moments_match_the_batch_moments(self):
+        # Arrange
+        rng = np.random.default_rng(7)
+        values = rng.normal(350.0, 2.0, size=(200, 5))
+        moments = RunningMoments((5,))
+        # Action
+        for row in values:
+            moments.add(row)
+        # Assert
+        assert moments.count == 200
+        np.testing.assert_almost_equal(moments.mean, values.mean(axis=0), 8)
+        np.testing.assert_almost_equal(moments.variance, values.var(axis=0, ddof=1), 8)
+
+    def test_quantile_sketch_is_accurate_to_a_bin(self):
+        # Arrange
+        rng = np.random.default_rng(7)
+        values = rng.uniform(300.0, 350.0, size=5000)
+        sketch = QuantileSketch(295.0, 355.0, n_bins=600)
+        # Action
+        for value in values:
+            sketch.add(value)
+        # Assert
+        for q in (0.0, 0.1, 0.5, 0.9, 1.0):
+            assert abs(sketch.quantile(q) - np.quantile(values, q)) <= 0.1
+        assert np.isnan(QuantileSketch(0.0, 1.0, shape=(3,)).quantile(0.5)).all()
+
+    def test_quantile_sketch_outside_the_range(self):
+        # Arrange
+        sketch = QuantileSketch(0.0, 1.0, n_bins=10)
+        # Action
+        for value in (-5.0, 0.55, 7.0):
+            sketch.add(value)
+        # Assert
+        assert sketch.quantile(0.0) == -5.0
+        assert 0.5 <= sketch.quantile(0.5) <= 0.6
+        assert sketch.quantile(1.0) == 7.0
+
+    def test_breakthrough_time(self):
+        # Arrange
+        time = np.arange(100.0, 10001.0, 100.0)
+        # Action
+        actual = breakthrough_time(time, member_temperature(time, 3000.0), drop=1.0)
+        never = breakthrough_time(time, np.full(len(time), 350.0))
+        # Assert
+        assert actual == pytest.approx(3500.0)
+        assert np.isnan(never)
+
+    def test_summary_of_the_members(self):
+        # Arrange
+        time = np.arange(100.0, 10001.0, 100.0)
+        breakthroughs = [2000.0, 3000.0, 4000.0, 20000.0]
+        summary = EnsembleSummary(quantiles=(0.5,))
+        # Action
+        actual_breakthroughs = [summary.add(time, member_temperature(time, b)) for b in breakthroughs]
+        # Assert
+        np.testing.assert_almost_equal(actual_breakthroughs[:3], [2500.0, 3500.0, 4500.0], 8)
+        table = summary.temperature_table()
+        assert list(table.columns) == ['time', 'mean', 'std', 'p50']
+        np.testing.assert_almost_equal(table['mean'].iloc[-1], 350 - (8000 + 7000 + 6000) * 2e-3 / 4, 8)
+        statistics = summary.breakthrough_summary()
+        assert (statistics['members'], statistics['without_breakthrough']) == (4, 1)
+        assert statistics['mean'] == pytest.approx(3500.0)
+        assert statistics['std'] == pytest.approx(1000.0)
+        assert abs(statistics['p50'] - 3500.0) <= 10000 / 600
+
+    def test_summary_throw_exception(self):
+        # Arrange
+        summary = EnsembleSummary()
+        summary.add([100.0, 200.0], [350.0, 349.0])
+        # Assert
+        with pytest.raises(ValueError) as context:
+            summary.add([100.0, 300.0], [350.0, 349.0])
+        assert 'The report times of the member do not match the report times of the ensemble...' in str(context.value)
+
+    def test_every_seed_is_another_realization(self):
+        # Arrange
+        layers_poro = [[0.2, 0.25, 0.3, 0.15, 0.22, 0.18, 0.27]]
+        # Action
+        first = krige_layers(900, 900, layers_poro, target_shape=(20, 30), seed=1)
+        again = krige_layers(900, 900, layers_poro, target_shape=(20, 30), seed=1)
+        second = krige_layers(900, 900, layers_poro, target_shape=(20, 30), seed=2)
+        # Assert
+        np.testing.assert_array_equal(first, again)
+        assert np.abs(first - second).max() > 0.01
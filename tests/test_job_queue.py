@@ -0,0 +1,130 @@
+import sqlite3
+import time
+
+from src.job_queue import JobQueue, work
+
+
+def make_queue(tmp_path, names=('a', 'b', 'c'), **kwargs):
+    queue = JobQueue(str(tmp_path / 'queue.sqlite'), **kwargs)
+    for name in names:
+        queue.enqueue(name, {'name': name, 'nz': len(name)})
+    return queue
+
+
+class TestJobQueue:
+    def test_enqueue_a_job_once(self, tmp_path):
+        # Arrange
+        queue = make_queue(tmp_path)
+        # Action
+        added = queue.enqueue('a', {'name': 'a', 'nz': 5})
+        # Assert
+        assert not added
+        assert queue.counts() == {'pending': 3, 'running': 0, 'done': 0, 'failed': 0}
+        assert queue.jobs()[0]['payload'] == {'name': 'a', 'nz': 1}
+
+    def test_claim_the_jobs_in_order_until_none_is_pending(self, tmp_path):
+        # Arrange
+        queue = make_queue(tmp_path)
+        # Action
+        claims = [queue.claim('worker-1', now=0.0) for _ in range(4)]
+        # Assert
+        assert [claim[0] for claim in claims[:3]] == ['a', 'b', 'c']
+        assert claims[1][1] == {'name': 'b', 'nz': 1}
+        assert claims[3] is None
+        assert {job['worker'] for job in queue.jobs('running')} == {'worker-1'}
+
+    def test_requeue_the_expired_leases(self, tmp_path):
+        # Arrange
+        queue = make_queue(tmp_path, names=('a', 'b'), lease_time=100.0)
+        queue.claim('worker-1', now=0.0)
+        queue.claim('worker-1', now=0.0)
+        # Action
+        renewed = queue.renew('b', 'worker-1', now=90.0)
+        not_expired = queue.requeue_expired(now=150.0)
+        claim = queue.claim('worker-2', now=150.0)
+        lost = queue.renew('a', 'worker-1', now=160.0)
+        # Assert
+        assert renewed
+        assert not_expired == 1
+        assert claim[0] == 'a'
+        assert not lost
+        assert [job['attempts'] for job in queue.jobs()] == [2, 1]
+
+    def test_an_expired_job_fails_after_the_maximum_attempts(self, tmp_path):
+        # Arrange
+        queue = make_queue(tmp_path, names=('a',), lease_time=10.0, max_attempts=2)
+        # Action
+        first = queue.claim('worker-1', now=0.0)
+        second = queue.claim('worker-2', now=20.0)
+        third = queue.claim('worker-3', now=40.0)
+        # Assert
+        assert first[0] == second[0] == 'a'
+        assert third is None
+        assert queue.jobs()[0]['status'] == 'failed'
+        assert queue.jobs()[0]['error'] == 'the lease expired'
+
+    def test_only_the_first_completion_counts(self, tmp_path):
+        # Arrange
+        queue = make_queue(tmp_path, names=('a',), lease_time=10.0)
+        queue.claim('worker-1', now=0.0)
+        queue.claim('worker-2', now=20.0)
+        # Action
+        first = queue.complete('a', result='Results/a.csv')
+        second = queue.complete('a', result='Results/other.csv')
+        # Assert
+        assert first and not second
+        assert queue.jobs()[0]['status'] == 'done'
+        assert queue.jobs()[0]['result'] == 'Results/a.csv'
+
+    def test_work_runs_every_job_and_retries_the_failed_ones(self, tmp_path):
+        # Arrange
+        queue = make_queue(tmp_path, names=('a', 'bb', 'bad'), max_attempts=2)
+        results = {}
+
+        def run(job):
+            if job['name'] == 'bad':
+                raise ValueError('The simulation did not converge...')
+            return job['nz'] * 10
+
+        def write(job, result):
+            results[job['name']] = result
+            return f'{job["name"]}.csv'
+        # Action
+        finished = work(queue, run, on_result=write, worker='worker-1')
+        # Assert
+        assert finished == 2
+        assert results == {'a': 10, 'bb': 20}
+        assert queue.counts() == {'pending': 0, 'running': 0, 'done': 2, 'failed': 1}
+        failed, = queue.jobs('failed')
+        assert failed['attempts'] == 2
+        assert failed['error'] == 'ValueError: The simulation did not converge...'
+
+    def test_fail_needs_the_lease(self, tmp_path):
+        # Arrange
+        queue = make_queue(tmp_path, names=('a',))
+        queue.claim('worker-1')
+        # Action
+        status = queue.fail('a', 'error', worker='worker-2')
+        # Assert
+        assert status is None
+        assert queue.jobs()[0]['status'] == 'running'
+
+    def test_keep_renewing_the_lease_after_a_failed_renewal(self, tmp_path):
+        # Arrange
+        queue = make_queue(tmp_path, names=('a',), lease_time=0.3)
+        renew = queue.renew
+        renewals = []
+
+        def locked_once(name, worker=None, now=None):
+            renewals.append(name)
+            if len(renewals) == 1:
+                raise sqlite3.OperationalError('database is locked')
+            return renew(name, worker, now)
+
+        queue.renew = locked_once
+        # Action
+        finished = work(queue, lambda job: time.sleep(0.6), worker='worker-1')
+        # Assert
+        assert finished == 1
+        assert len(renewals) > 1
+        assert queue.counts()['done'] == 1
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from src.jobs import job_fields, job_spacing, write_result
+from src.result_store import ResultStore
+from src.scenario import DEFAULTS
+
+
+def make_job(**params):
+    return {**DEFAULTS, 'nx': 4, 'ny': 2, 'nz': 3, 'name': 'test_nz-3', 'scenario': 'test', **params}
+
+
+class TestJobs:
+    def test_homogeneous_fields_per_layer(self):
+        # Action
+        poro, perm = job_fields(make_job(poro=0.25, perm=1000))
+        # Assert
+        np.testing.assert_almost_equal(poro, [0.25] * 3, 8)
+        np.testing.assert_almost_equal(perm, [1000] * 3, 8)
+
+    def test_job_spacing(self):
+        # Action
+        spacing = job_spacing(make_job(dy=75))
+        # Assert
+        np.testing.assert_almost_equal(spacing, [4500 / 4, 75, 100 / 3], 8)
+
+    def test_write_result_to_the_store_and_csv(self, tmp_path):
+        # Arrange
+        job = make_job()
+        td = pd.DataFrame({'time': [100.0, 200.0], 'PRD : temperature (K)': [350.0, 349.5]})
+        # Action
+        write_result(job, td, 'store', str(tmp_path))
+        csv_path = write_result(job, td, 'csv', str(tmp_path))
+        # Assert
+        table = ResultStore(str(tmp_path / 'test')).read()
+        np.testing.assert_almost_equal(table['test_nz-3'].values, [350.0, 349.5], 8)
+        assert ResultStore(str(tmp_path / 'test')).entries()[0]['params']['nz'] == 3
+        pd.testing.assert_frame_equal(pd.read_csv(csv_path), td)
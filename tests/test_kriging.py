@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from gstools import Gaussian
+from pykrige.uk import UniversalKriging
+
+from src.kriging import KrigingEngine
+from src.math_rel import apply_kriging, krige_layers
+
+
+class TestKriging:
+    def test_kriging_engine_gives_the_same_field_as_pykrige(self):
+        # Arrange
+        rng = np.random.default_rng(0)
+        test_x = rng.integers(60, size=7).astype(float)
+        test_y = rng.integers(40, size=7).astype(float)
+        test_values = rng.uniform(0.1, 0.3, 7)
+        test_cov_model = Gaussian(dim=2, len_scale=30, anis=6.8, angles=-0.2, var=0.5, nugget=0.5)
+        gridx = np.arange(0, 60, 1.0)
+        gridy = np.arange(0, 40, 1.0)
+        expected_z, _ = UniversalKriging(test_x, test_y, test_values, test_cov_model).execute('grid', gridx, gridy)
+        # Action
+        actual_z = KrigingEngine(test_x, test_y, test_cov_model).execute(test_values, gridx, gridy, chunk_size=500,
+                                                                          n_workers=2)
+        # Assert
+        np.testing.assert_almost_equal(expected_z, actual_z, 10)
+
+    def test_krige_layers_gives_the_same_layers_as_apply_kriging(self):
+        # Arrange
+        test_layers = np.array([[0.2, 0.25, 0.3, 0.15, 0.22, 0.18, 0.35],
+                                [0.12, 0.3, 0.28, 0.2, 0.11, 0.25, 0.3]])
+        expected_layers = [apply_kriging(50, 50, 7, layer) for layer in test_layers]
+        # Action
+        actual_layers = krige_layers(50, 50, test_layers)
+        # Assert
+        np.testing.assert_almost_equal(expected_layers, actual_layers, 10)
+
+    def test_apply_kriging_on_the_target_grid(self):
+        # Arrange
+        test_poro = np.array([0.2, 0.25, 0.3, 0.15, 0.22, 0.18, 0.35])
+        # Action
+        actual_z = apply_kriging(90, 90, 7, test_poro, target_shape=(30, 45))
+        # Assert
+        assert actual_z.shape == (30, 45)
+        assert np.all((actual_z == 0.01) | ((actual_z >= 0.1) & (actual_z <= 0.4)))
+
+    def test_kriging_engine_throw_exception(self):
+        # Arrange
+        test_engine = KrigingEngine([0.0, 5.0], [0.0, 5.0], Gaussian(dim=2, len_scale=3))
+        # Assert
+        with pytest.raises(ValueError) as context:
+            test_engine.execute([0.1, 0.2, 0.3], np.arange(3.0), np.arange(3.0))
+        assert 'The number of values does not match the number of samples...' in str(context.value)
@@ -0,0 +1,106 @@
+import os.path
+import pathlib
+
+import numpy as np
+
+from src import las
+from src.las import LasCache, parse_las
+from src.read_files import from_las_to_poro_gamma, read_las
+
+TEST_LAS = """~Version information
+ VERS.   2.0 : CWLS LOG ASCII STANDARD - VERSION 2.0
+ WRAP.    NO : One line per depth step
+~Well information
+ STRT.M   1999.5 : START DEPTH
+ NULL.   -999.25 : NULL VALUE
+~Curve information
+ DEPT.M          : Depth
+ GR  .GAPI       : Gamma ray
+ DT  .US/F       : Sonic
+~A  DEPT  GR  DT
+1999.5  80.0  90.0
+2000.0  81.0  -999.25
+2050.0  82.0  91.0
+2100.0  83.0  92.0
+2100.5  84.0  93.0
+"""
+
+
+class TestLas:
+    def test_parse_las_with_sections(self, tmp_path):
+        # Arrange
+        path_to_input = tmp_path / 'test.las'
+        path_to_input.write_text(TEST_LAS)
+        # Action
+        actual_dataframe = parse_las(str(path_to_input))
+        # Assert
+        assert list(actual_dataframe.columns) == ['DEPT', 'GR', 'DT']
+        np.testing.assert_almost_equal(actual_dataframe['GR'], [80.0, 81.0, 82.0, 83.0, 84.0], 8)
+        assert np.isnan(actual_dataframe['DT'][1])
+
+    def test_cached_depth_window_and_columns_match_the_parsed_log(self, tmp_path):
+        # Arrange
+        path_to_input = tmp_path / 'test.las'
+        path_to_input.write_text(TEST_LAS)
+        expected_dataframe = read_las(str(path_to_input), depth_range=(2000, 2100), columns=['DT'])
+        # Action
+        first_dataframe = read_las(str(path_to_input), depth_range=(2000, 2100), columns=['DT'],
+                                   cache_dir=str(tmp_path / 'cache'))
+        actual_dataframe = read_las(str(path_to_input), depth_range=(2000, 2100), columns=['DT'],
+                                    cache_dir=str(tmp_path / 'cache'))
+        # Assert
+        assert len(os.listdir(tmp_path / 'cache')) == 1
+        assert list(actual_dataframe.index) == [1, 2, 3]
+        np.testing.assert_almost_equal(expected_dataframe['DT'].values, actual_dataframe['DT'].values, 8)
+        np.testing.assert_almost_equal(first_dataframe['DT'].values, actual_dataframe['DT'].values, 8)
+
+    def test_cache_of_a_plain_table(self, tmp_path):
+        # Arrange
+        path_to_input = os.path.join(pathlib.Path(__file__).parent.resolve(), 'test_data/test_las.las')
+        test_cache = LasCache(str(tmp_path))
+        # Action
+        actual_dataframe = test_cache.read(path_to_input, columns=['DEPT', 'DT'])
+        # Assert
+        assert test_cache.columns(path_to_input) == ['DEPT', 'CALI', 'DT', 'GR', 'PEF', 'RHOB', 'RT', 'RXO', 'SP']
+        np.testing.assert_almost_equal(actual_dataframe['DT'][:2], [90.0, 89.9973], 8)
+        assert np.isnan(actual_dataframe['DT'][2])
+
+    def test_the_temporary_entry_is_removed_when_another_process_won(self, tmp_path, monkeypatch):
+        # Arrange
+        path_to_input = tmp_path / 'test.las'
+        path_to_input.write_text(TEST_LAS)
+        test_cache = LasCache(str(tmp_path / 'cache'))
+        rename = os.rename
+
+        def rename_after_another_process(source, target):
+            # the other process renamed its own conversion into place first
+            os.makedirs(target)
+            for name in os.listdir(source):
+                with open(os.path.join(source, name), 'rb') as f, open(os.path.join(target, name), 'wb') as g:
+                    g.write(f.read())
+            monkeypatch.setattr(las.os, 'rename', rename)
+            raise OSError('Directory not empty')
+        monkeypatch.setattr(las.os, 'rename', rename_after_another_process)
+        # Action
+        actual_dataframe = test_cache.read(str(path_to_input), columns=['GR'])
+        # Assert
+        assert len(os.listdir(tmp_path / 'cache')) == 1
+        np.testing.assert_almost_equal(actual_dataframe['GR'], [80.0, 81.0, 82.0, 83.0, 84.0], 8)
+
+    def test_gamma_porosity_reads_only_the_gamma_ray_from_the_cache(self, tmp_path, monkeypatch):
+        # Arrange
+        path_to_input = tmp_path / 'test.las'
+        path_to_input.write_text(TEST_LAS)
+        expected_porosity = from_las_to_poro_gamma(str(path_to_input), 1)
+        read_columns = []
+        read = LasCache.read
+
+        def recording_read(self, path_to_las, depth_range=None, columns=None):
+            read_columns.append(columns)
+            return read(self, path_to_las, depth_range=depth_range, columns=columns)
+        monkeypatch.setattr(LasCache, 'read', recording_read)
+        # Action
+        actual_porosity = from_las_to_poro_gamma(str(path_to_input), 1, cache_dir=str(tmp_path / 'cache'))
+        # Assert
+        assert read_columns == [['GR']]
+        np.testing.assert_almost_equal(expected_porosity, actual_porosity, 8)
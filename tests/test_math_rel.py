@@ -2,7 +2,7 @@ import pytest
 
 import numpy as np
 
-from src.math_rel import harmonic_average, arithmetic_average
+from src.math_rel import harmonic_average, arithmetic_average, upscale, coarsen
 
 
 class TestReadFiles:
@@ -44,3 +44,55 @@ class TestReadFiles:
             arithmetic_average(test_input_array, test_upscaling_amount)
         assert 'Can not upscale the input, please check upscaled amount...' in str(context.value)
 
+    def test_upscale_with_thickness_weights(self):
+        # Arrange
+        test_input_array = np.array([100.0, 10.0, 1.0, 1.0])
+        test_thickness = np.array([1.0, 3.0, 2.0, 2.0])
+        expected_harmonic = [4.0 / (1.0 / 100 + 3.0 / 10), 1.0]
+        expected_geometric = [np.exp((np.log(100) + 3 * np.log(10)) / 4), 1.0]
+        # Action
+        actual_harmonic = upscale(test_input_array, 2, method='harmonic', weights=test_thickness)
+        actual_geometric = upscale(test_input_array, 2, method='geometric', weights=test_thickness)
+        # Assert
+        np.testing.assert_almost_equal(expected_harmonic, actual_harmonic, 8)
+        np.testing.assert_almost_equal(expected_geometric, actual_geometric, 8)
+
+    def test_upscale_power_average_with_exponent_minus_one_is_harmonic(self):
+        # Arrange
+        test_input_array = np.array([0.2, 0.1, 1, 0.5, 0.5])
+        # Action
+        actual_groups = upscale(test_input_array, 2, method='power', power=-1.0)
+        # Assert
+        np.testing.assert_almost_equal(upscale(test_input_array, 2, method='harmonic'), actual_groups, 8)
+
+    def test_coarsen_a_3d_field_along_every_axis(self):
+        # Arrange
+        test_field = np.random.default_rng(0).uniform(1.0, 2.0, (4, 6, 9))
+        expected_field = test_field.reshape(2, 2, 3, 2, 3, 3).mean(axis=(1, 3, 5))
+        # Action
+        actual_field = coarsen(test_field, (2, 3, 3))
+        # Assert
+        np.testing.assert_almost_equal(expected_field, actual_field, 8)
+
+    def test_coarsen_to_a_shape_which_does_not_divide_the_field(self):
+        # Arrange
+        test_field = np.arange(900.0)[None, :].repeat(2, axis=0)
+        # Action
+        actual_field = coarsen(test_field, (2, 160))
+        actual_ones = coarsen(np.ones((10, 90, 90)), (10, 53, 16))
+        # Assert
+        assert actual_field.shape == (2, 160)
+        assert actual_ones.shape == (10, 53, 16)
+        np.testing.assert_almost_equal(actual_ones, np.ones((10, 53, 16)), 8)
+        # the groups have 5 or 6 cells and cover the field without gaps
+        np.testing.assert_almost_equal(actual_field[0, 0], 2.0, 8)
+        np.testing.assert_almost_equal(actual_field[0, -1], 896.5, 8)
+        np.testing.assert_almost_equal(np.diff(np.linspace(0, 900, 161).astype(int)).min(), 5, 8)
+
+    def test_upscale_throw_exception(self):
+        # Arrange
+        test_input_array = np.array([0.2, 0.1, 1, 0.5, 0.5])
+        # Assert
+        with pytest.raises(ValueError) as context:
+            upscale(test_input_array, 2, method='median')
+        assert 'Unknown averaging method median...' in str(context.value)
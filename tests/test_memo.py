@@ -0,0 +1,133 @@
+import os
+
+import numpy as np
+
+from src.memo import ResultMemo, array_digest, input_hash, memo_key
+from src.monitor import ConvergenceMonitor, temperature_spread
+from src.recorder import StateRecorder
+
+
+class FakeModel:
+    """Stands in for Model, with the state of a run and the checkpoint_state and restore of Model"""
+
+    def __init__(self, n_cells, t=0.0):
+        self.X = np.zeros(2 * n_cells)
+        self.t = t
+        self.time_data = {}
+
+    def checkpoint_state(self):
+        return {'X': self.X.copy(), 't': self.t, 'time_data': dict(self.time_data), 'inj_rate': 7500}
+
+    def restore(self, state):
+        self.X[:] = state['X']
+        self.t = state['t']
+        self.time_data = state['time_data']
+
+
+def make_input(perm):
+    return {'shape': [3, 2, 4], 'spacing': [10.0, 75.0, 20.0], 'perm': perm, 'physics': {'n_points': 64}}
+
+
+class TestMemo:
+    def test_the_hash_depends_on_every_input(self):
+        # Arrange
+        perm = np.full(24, 3000.0)
+        changed_perm = perm.copy()
+        changed_perm[5] = 2999.0
+        # Action
+        key = input_hash(make_input(perm))
+        # Assert
+        assert key == input_hash(make_input(perm.copy()))
+        assert key != input_hash(make_input(changed_perm))
+        assert key != input_hash(make_input(perm.astype(np.float32)))
+        assert key != input_hash({**make_input(perm), 'spacing': [10.0, 75.0, 10.0]})
+        assert array_digest(perm) != array_digest(perm.reshape(4, 6))
+
+    def test_the_key_depends_on_the_recorder_and_the_monitor(self):
+        # Arrange
+        model_input = make_input(np.ones(24))
+        # Action
+        key = memo_key(model_input)
+        # Assert
+        assert key != memo_key(model_input, recorder=StateRecorder(slice(0, 8), 3))
+        spread = temperature_spread(slice(0, 8))
+        assert key != memo_key(model_input, monitor=ConvergenceMonitor({'spread': spread}, 0.1))
+        assert memo_key(model_input, monitor=ConvergenceMonitor({'spread': spread}, 0.1)) != \
+            memo_key(model_input, monitor=ConvergenceMonitor({'spread': spread}, 0.01))
+
+    def test_the_key_depends_on_the_monitored_quantities(self):
+        # Arrange
+        model_input = make_input(np.ones(24))
+        top_monitor = ConvergenceMonitor({'spread': temperature_spread(slice(0, 8))}, 0.1)
+        bottom_monitor = ConvergenceMonitor({'spread': temperature_spread(slice(16, 24))}, 0.1)
+        undescribed_monitor = ConvergenceMonitor({'spread': max}, 0.1)
+        # Action
+        top_key = memo_key(model_input, monitor=top_monitor)
+        bottom_key = memo_key(model_input, monitor=bottom_monitor)
+        undescribed_key = memo_key(model_input, monitor=undescribed_monitor)
+        # Assert
+        assert top_key != bottom_key
+        assert top_key == memo_key(model_input, monitor=ConvergenceMonitor({'spread': temperature_spread(slice(0, 8))},
+                                                                           0.1))
+        assert undescribed_key is None
+
+    def test_load_the_saved_run(self, tmp_path):
+        # Arrange
+        memo = ResultMemo(str(tmp_path))
+        key = memo_key(make_input(np.ones(24)))
+        model = FakeModel(4, t=200.0)
+        model.X[:] = np.arange(8)
+        model.time_data = {'time': [100.0, 200.0], 'PRD : temperature (K)': [350.0, 349.5]}
+        recorder = StateRecorder(slice(0, 2), 3)
+        for step_time in (0.0, 100.0, 200.0):
+            recorder.record(step_time, {'Temperature': np.array([350.0, 350.0 - step_time / 100])})
+        monitor = ConvergenceMonitor({'spread': temperature_spread(slice(0, 2))}, 0.1)
+        monitor.finish(200.0)
+        new_model = FakeModel(4)
+        new_recorder = StateRecorder(slice(0, 2), 3)
+        new_monitor = ConvergenceMonitor({'spread': temperature_spread(slice(0, 2))}, 0.1)
+        # Action
+        hit_before_save = memo.load(key, new_model)
+        memo.save(key, model, recorder=recorder, monitor=monitor)
+        hit = memo.load(key, new_model, recorder=new_recorder, monitor=new_monitor)
+        # Assert
+        assert not hit_before_save
+        assert hit
+        np.testing.assert_almost_equal(new_model.X, np.arange(8), 8)
+        assert new_model.t == 200.0
+        assert new_model.time_data == model.time_data
+        np.testing.assert_almost_equal(new_recorder.times, [0.0, 100.0, 200.0], 8)
+        np.testing.assert_almost_equal(new_recorder.result('Temperature'), recorder.result('Temperature'), 8)
+        assert (new_monitor.stop_time, new_monitor.stop_reason) == (200.0, 'total time reached')
+
+    def test_evict_the_least_recently_used_entries(self, tmp_path):
+        # Arrange
+        memo = ResultMemo(str(tmp_path))
+        model = FakeModel(1000)
+        keys = [memo_key(make_input(np.full(24, perm))) for perm in (1.0, 2.0, 3.0)]
+        for i, key in enumerate(keys):
+            memo.put(key, model.checkpoint_state())
+            os.utime(memo.entry_path(key), (1000 + i, 1000 + i))
+        # the first entry is used again, so the second is the least recently used
+        memo.get(keys[0])
+        memo.max_bytes = 2.5 * os.path.getsize(memo.entry_path(keys[0]))
+        # Action
+        memo.evict()
+        # Assert
+        assert memo.get(keys[0]) is not None
+        assert memo.get(keys[1]) is None
+        assert memo.get(keys[2]) is not None
+
+    def test_a_truncated_entry_is_a_miss(self, tmp_path):
+        # Arrange
+        memo = ResultMemo(str(tmp_path))
+        key = memo_key(make_input(np.ones(24)))
+        memo.put(key, FakeModel(1000).checkpoint_state())
+        with open(memo.entry_path(key), 'r+b') as f:
+            f.truncate(os.path.getsize(memo.entry_path(key)) // 2)
+        # Action
+        entry = memo.get(key)
+        hit = memo.load(key, FakeModel(1000))
+        # Assert
+        assert entry is None
+        assert not hit
@@ -0,0 +1,37 @@
+import numpy as np
+
+from src.monitor import ConvergenceMonitor
+
+
+class TestMonitor:
+    def test_stop_once_the_quantity_is_steady_over_the_window(self):
+        # Arrange
+        monitor = ConvergenceMonitor({'spread': None}, tolerance=0.01, window=2)
+        test_spread = [1.0, 0.5, 0.3, 0.295, 0.28, 0.279, 0.2785, 0.278]
+        # Action
+        actual_stops = [monitor.update_values(100.0 * i, {'spread': v}) for i, v in enumerate(test_spread)]
+        # Assert
+        assert actual_stops == [False, False, False, False, False, False, True, True]
+        assert monitor.stop_time == 600.0
+        assert monitor.stop_reason.startswith('steady state')
+
+    def test_every_element_of_an_array_has_to_be_steady(self):
+        # Arrange
+        monitor = ConvergenceMonitor({'temperature': None, 'rate': None}, tolerance={'temperature': 0.1, 'rate': 1.0},
+                                     window=1)
+        # Action
+        monitor.update_values(0.0, {'temperature': np.array([350.0, 349.0]), 'rate': 10.0})
+        actual_stop = monitor.update_values(100.0, {'temperature': np.array([350.0, 348.5]), 'rate': 10.0})
+        # Assert
+        assert not actual_stop
+
+    def test_finish_records_the_total_time(self):
+        # Arrange
+        monitor = ConvergenceMonitor({'spread': None}, tolerance=0.01, min_time=500.0)
+        # Action
+        for i in range(5):
+            monitor.update_values(100.0 * i, {'spread': 0.0})
+        monitor.finish(10000.0)
+        # Assert
+        assert monitor.stop_reason == 'total time reached'
+        assert monitor.stop_time == 10000.0
@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src import operator_cache
+from src.operator_cache import OperatorCache, operator_cache_key
+
+
+class FakeInterpolator:
+    """Stands in for a DARTS interpolator, the points are the computed operator values by point index"""
+
+    def __init__(self, point_data=None):
+        self.point_data = dict(point_data or {})
+
+
+class FakePhysics:
+    """Stands in for a DARTS physics constructed with cache=True"""
+
+    def __init__(self, *interpolators):
+        self.created_itors = [(itor, f'obl_point_data_{i}.pkl') for i, itor in enumerate(interpolators)]
+
+
+def save_points(path, first_index):
+    cache = OperatorCache(path)
+    key = operator_cache_key('Geothermal', n_points=64)
+    for index in range(first_index, first_index + 20):
+        cache.save(FakePhysics(FakeInterpolator({index: [float(index)]})), key)
+
+
+class TestOperatorCache:
+    def test_key_depends_on_the_parameters(self):
+        # Action
+        key = operator_cache_key('Geothermal', n_points=64, min_p=1, max_p=1000)
+        # Assert
+        assert key == operator_cache_key('Geothermal', max_p=1000, min_p=1, n_points=64)
+        assert key != operator_cache_key('Geothermal', n_points=128, min_p=1, max_p=1000)
+
+    def test_key_depends_on_the_darts_version(self, monkeypatch):
+        # Arrange
+        key = operator_cache_key('Geothermal', n_points=64)
+        monkeypatch.setattr(operator_cache, 'darts_version', lambda: '0.0.0-other-build')
+        # Action
+        other_key = operator_cache_key('Geothermal', n_points=64)
+        # Assert
+        assert key != other_key
+
+    def test_load_the_saved_tables(self, tmp_path):
+        # Arrange
+        cache = OperatorCache(str(tmp_path))
+        key = operator_cache_key('Geothermal', n_points=64)
+        physics = FakePhysics(FakeInterpolator({3: [1.0, 2.0], 7: [3.0, 4.0]}), FakeInterpolator({1: [5.0]}))
+        new_physics = FakePhysics(FakeInterpolator(), FakeInterpolator())
+        # Action
+        cache.save(physics, key)
+        n_points = cache.load(new_physics, key)
+        # Assert
+        assert n_points == 3
+        first_itor = new_physics.created_itors[0][0]
+        assert sorted(first_itor.point_data) == [3, 7]
+        np.testing.assert_almost_equal(first_itor.point_data[7], [3.0, 4.0], 8)
+        assert not cache.read(key, 'obl_point_data_0.pkl').flags.writeable
+
+    def test_save_merges_the_points_of_several_runs(self, tmp_path):
+        # Arrange
+        cache = OperatorCache(str(tmp_path))
+        key = operator_cache_key('Geothermal', n_points=64)
+        # Action
+        cache.save(FakePhysics(FakeInterpolator({3: [1.0], 7: [3.0]})), key)
+        n_points = cache.save(FakePhysics(FakeInterpolator({7: [3.0], 9: [4.0]})), key)
+        # Assert
+        assert n_points == 3
+        np.testing.assert_almost_equal(cache.read(key, 'obl_point_data_0.pkl'), [[3, 1.0], [7, 3.0], [9, 4.0]], 8)
+
+    def test_concurrent_saves_keep_the_points_of_every_worker(self, tmp_path):
+        # Action
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(save_points, [str(tmp_path)] * 4, [0, 100, 200, 300]))
+        # Assert
+        table = OperatorCache(str(tmp_path)).read(operator_cache_key('Geothermal', n_points=64),
+                                                  'obl_point_data_0.pkl')
+        assert len(table) == 80
+
+    def test_save_without_file_locks(self, tmp_path, monkeypatch):
+        # Arrange
+        monkeypatch.setattr(operator_cache, 'fcntl', None)
+        cache = OperatorCache(str(tmp_path))
+        key = operator_cache_key('Geothermal', n_points=64)
+        # Action
+        n_points = cache.save(FakePhysics(FakeInterpolator({3: [1.0]})), key)
+        # Assert
+        assert n_points == 1
+        assert not os.path.exists(os.path.join(str(tmp_path), key, 'obl_point_data_0.npy.lock'))
+
+    def test_load_without_tables(self, tmp_path):
+        # Arrange
+        physics = FakePhysics(FakeInterpolator())
+        # Action
+        n_points = OperatorCache(str(tmp_path)).load(physics, operator_cache_key('Geothermal'))
+        # Assert
+        assert n_points == 0
+        assert physics.created_itors[0][0].point_data == {}
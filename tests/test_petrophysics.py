@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from src.petrophysics import pad_layers, porosity_to_permeability
+
+
+def reference_permeability(poro):
+    return np.exp(110.744 * poro ** 3 - 171.8268 * poro ** 2 + 92.9227 * poro - 2.047)
+
+
+class TestPetrophysics:
+    def test_porosity_to_permeability_with_the_cubic_exponential_law(self):
+        # Arrange
+        test_poro = np.array([[0.01, 0.1], [0.2, 0.4]])
+        expected_perm = reference_permeability(test_poro)
+        # Action
+        actual_perm = porosity_to_permeability(test_poro)
+        # Assert
+        assert actual_perm.shape == test_poro.shape
+        np.testing.assert_allclose(expected_perm, actual_perm, rtol=1e-12)
+
+    def test_porosity_to_permeability_in_place_and_in_chunks(self):
+        # Arrange
+        test_poro = np.linspace(0.01, 0.4, 1001)
+        expected_perm = reference_permeability(test_poro)
+        # Action
+        actual_perm = porosity_to_permeability(test_poro, out=test_poro, chunk_size=64)
+        # Assert
+        assert actual_perm is test_poro
+        np.testing.assert_allclose(expected_perm, actual_perm, rtol=1e-12)
+
+    def test_porosity_to_permeability_in_float32(self):
+        # Arrange
+        test_poro = np.linspace(0.01, 0.4, 100)
+        expected_perm = reference_permeability(test_poro)
+        # Action
+        actual_perm = porosity_to_permeability(test_poro, dtype=np.float32)
+        # Assert
+        assert actual_perm.dtype == np.float32
+        np.testing.assert_allclose(expected_perm, actual_perm, rtol=1e-4)
+
+    def test_porosity_to_permeability_throw_exception(self):
+        # Arrange
+        test_poro = np.ones(10) * 0.2
+        # Assert
+        with pytest.raises(ValueError) as context:
+            porosity_to_permeability(test_poro, out=np.empty(5))
+        assert 'The output does not have the same shape as the porosity...' in str(context.value)
+
+    def test_pad_layers_of_a_field_per_cell(self):
+        # Arrange
+        test_field = np.arange(6, dtype=np.float32)
+        expected_field = np.array([-1, -1, 0, 1, 2, 3, 4, 5, -1, -1], dtype=float)
+        # Action
+        actual_field = pad_layers(test_field, 2, 1, 1, -1)
+        # Assert
+        assert actual_field.dtype == np.float64
+        np.testing.assert_almost_equal(actual_field, expected_field, 8)
+
+    def test_pad_layers_of_a_field_per_layer(self):
+        # Arrange
+        expected_field = np.array([1e-5] * 6 + [0.1] * 3 + [0.2] * 3 + [1e-5] * 3)
+        # Action
+        actual_field = pad_layers([0.1, 0.2], 3, 2, 1, 1e-5, n_layers=2)
+        # Assert
+        np.testing.assert_almost_equal(actual_field, expected_field, 8)
+
+    def test_pad_layers_throw_exception(self):
+        # Assert
+        with pytest.raises(ValueError) as context:
+            pad_layers(np.ones(5), 2, 1, 1, 1e-5, n_layers=2)
+        assert 'The field does not have one value per cell or one value per layer...' in str(context.value)
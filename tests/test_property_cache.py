@@ -0,0 +1,87 @@
+import os
+import pickle
+import time
+
+import numpy as np
+
+from src.property_cache import PropertyCache
+from src.read_files import read_pickle_file, read_pickle_file_upscaling_z
+
+
+def write_test_pickles(path, n_layers=3):
+    os.makedirs(path, exist_ok=True)
+    rng = np.random.default_rng(0)
+    for i in range(n_layers):
+        with open(os.path.join(path, f'layer_poro_{i}.pkl'), 'wb') as file:
+            pickle.dump(rng.uniform(0.1, 0.3, (30, 30)), file)
+
+
+class TestPropertyCache:
+    def test_read_pickle_file_with_cache_gives_the_same_fields(self, tmp_path):
+        # Arrange
+        write_test_pickles(str(tmp_path / 'Porosity'))
+        test_cache = PropertyCache(str(tmp_path / 'cache'))
+        expected_poro, expected_perm = read_pickle_file(10, 12, str(tmp_path / 'Porosity'))
+        # Action
+        first_poro, first_perm = read_pickle_file(10, 12, str(tmp_path / 'Porosity'), cache=test_cache)
+        actual_poro, actual_perm = read_pickle_file(10, 12, str(tmp_path / 'Porosity'), cache=test_cache)
+        # Assert
+        assert isinstance(actual_poro, np.memmap)
+        assert len(os.listdir(test_cache.path)) == 1
+        np.testing.assert_almost_equal(expected_poro, actual_poro, 12)
+        np.testing.assert_almost_equal(expected_perm, actual_perm, 12)
+        np.testing.assert_almost_equal(first_perm, actual_perm, 12)
+
+    def test_key_changes_with_the_source_and_the_shape(self, tmp_path):
+        # Arrange
+        write_test_pickles(str(tmp_path / 'Porosity'))
+        test_cache = PropertyCache(str(tmp_path / 'cache'))
+        # Action
+        read_pickle_file_upscaling_z(10, 12, 2, str(tmp_path / 'Porosity'), cache=test_cache)
+        read_pickle_file_upscaling_z(10, 12, 3, str(tmp_path / 'Porosity'), cache=test_cache)
+        write_test_pickles(str(tmp_path / 'Porosity'), n_layers=4)
+        read_pickle_file_upscaling_z(10, 12, 3, str(tmp_path / 'Porosity'), cache=test_cache)
+        # Assert
+        assert len(os.listdir(test_cache.path)) == 3
+
+    def test_evict_the_least_recently_used_entries(self, tmp_path):
+        # Arrange
+        test_cache = PropertyCache(str(tmp_path), max_bytes=3000)
+        test_cache.put('a', np.zeros(100), np.zeros(100))
+        os.utime(os.path.join(test_cache.path, 'a'), (time.time() - 10, time.time() - 10))
+        # Action
+        test_cache.put('b', np.zeros(100), np.zeros(100))
+        # Assert
+        assert test_cache.get('a') is None
+        assert test_cache.get('b') is not None
+
+    def test_evict_entries_older_than_max_age(self, tmp_path):
+        # Arrange
+        test_cache = PropertyCache(str(tmp_path), max_age=60)
+        test_cache.put('a', np.zeros(10), np.zeros(10))
+        os.utime(os.path.join(test_cache.path, 'a'), (time.time() - 120, time.time() - 120))
+        # Action
+        test_cache.evict()
+        # Assert
+        assert test_cache.get('a') is None
+
+    def test_evict_skips_entries_removed_by_another_process(self, tmp_path, monkeypatch):
+        # Arrange
+        test_cache = PropertyCache(str(tmp_path), max_age=60)
+        test_cache.put('a', np.zeros(10), np.zeros(10))
+        test_cache.put('b', np.zeros(10), np.zeros(10))
+        os.utime(os.path.join(test_cache.path, 'b'), (time.time() - 120, time.time() - 120))
+        getsize = os.path.getsize
+
+        def removed_getsize(path):
+            # the entry 'a' is removed by another process while it is listed
+            if os.path.basename(os.path.dirname(path)) == 'a':
+                raise FileNotFoundError(path)
+            return getsize(path)
+
+        monkeypatch.setattr(os.path, 'getsize', removed_getsize)
+        # Action
+        test_cache.evict()
+        # Assert
+        assert test_cache.get('b') is None
+        assert test_cache.get('a') is not None
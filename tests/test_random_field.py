@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from gstools import Gaussian
+
+from src.math_rel import porosity_cov_model, sample_locations, simulate_layers
+from src.random_field import CirculantEmbedding, correlation_range
+
+
+class TestRandomField:
+    def test_the_fields_have_the_covariance_of_the_model(self):
+        # Arrange
+        cov_model = Gaussian(dim=2, len_scale=10, anis=2.0, angles=0.5, var=1.0, nugget=0.2)
+        generator = CirculantEmbedding(cov_model, (40, 50))
+        rng = np.random.default_rng(0)
+        # Action
+        fields = np.array([generator.sample(rng) for _ in range(3000)])
+        # Assert
+        assert fields.shape == (3000, 40, 50)
+        assert fields[:, 20, 20].var() == pytest.approx(1.2, abs=0.1)
+        # the rotated anisotropy makes the lags (3, 3) and (3, -3) differ
+        for lag_y, lag_x in [(0, 5), (5, 0), (3, 3), (3, -3)]:
+            expected = cov_model.cov_spatial(np.array([[lag_x], [lag_y]], dtype=float))[0]
+            actual = np.mean(fields[:, 20, 20] * fields[:, 20 + lag_y, 20 + lag_x])
+            assert actual == pytest.approx(expected, abs=0.1)
+
+    def test_3d_fields_with_the_spacing_of_the_grid(self):
+        # Arrange
+        generator = CirculantEmbedding(porosity_cov_model(dim=3), (4, 30, 40), spacing=(2.0, 10.0, 10.0))
+        # Action
+        field = generator.sample(np.random.default_rng(1))
+        again = generator.sample(np.random.default_rng(1))
+        # Assert
+        assert field.shape == (4, 30, 40)
+        np.testing.assert_array_equal(field, again)
+        assert all(m >= n for m, n in zip(generator.embedded_shape, (4, 30, 40)))
+
+    def test_correlation_range_along_the_longest_axis(self):
+        # Action
+        actual = correlation_range(Gaussian(dim=2, len_scale=30, anis=6.8))
+        # Assert
+        assert 2 * 204 < actual < 4 * 204
+
+    def test_the_dimension_has_to_match_the_grid(self):
+        # Assert
+        with pytest.raises(ValueError) as context:
+            CirculantEmbedding(porosity_cov_model(), (3, 20, 20))
+        assert 'The dimension of the covariance model does not match the grid...' in str(context.value)
+
+    def test_simulated_layers_honour_the_samples(self):
+        # Arrange
+        layers_poro = np.array([[0.2, 0.25, 0.3, 0.15, 0.22, 0.18, 0.27]]) + np.arange(3)[:, None] * 0.01
+        x, y = sample_locations(100, 100, 7)
+        # Action
+        field = simulate_layers(100, 100, layers_poro, seed=5)
+        other = simulate_layers(100, 100, layers_poro, seed=6)
+        # Assert
+        assert field.shape == (3, 100, 100)
+        np.testing.assert_almost_equal(field[:, y, x], layers_poro, 8)
+        assert field.min() >= 0.01 and field.max() <= 0.4
+        assert np.abs(field - other).max() > 0.01
+
+    def test_simulated_layers_on_the_model_grid(self):
+        # Arrange
+        layers_poro = [[0.2, 0.25, 0.3, 0.15, 0.22, 0.18, 0.27]]
+        # Action
+        field = simulate_layers(900, 900, layers_poro, target_shape=(30, 45), seed=5)
+        # Assert
+        assert field.shape == (1, 30, 45)
+        assert set(np.unique(field[field < 0.1])) <= {0.01}
+        assert abs(field.mean() - np.mean(layers_poro)) < 0.05
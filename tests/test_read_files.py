@@ -1,8 +1,11 @@
 import os.path
 import pathlib
+import pickle
 import numpy as np
 import pandas as pd
-from src.read_files import read_las
+from src.math_rel import krige_layers, simulate_layers
+from src.read_files import read_las, from_las_to_poro_gamma, get_porosity_values, read_pickle_file, \
+    WELL_LAS_FILES, POROSITY_LAYERS_FILE
 
 
 class TestReadFiles:
@@ -23,3 +26,51 @@ class TestReadFiles:
                 assert True
             else:
                 assert i == j
+
+    def test_get_porosity_values_writes_all_layers_into_one_file(self, tmp_path, monkeypatch):
+        # Arrange
+        monkeypatch.chdir(tmp_path)
+        os.mkdir('LogData')
+        rng = np.random.default_rng(0)
+        depth = np.arange(1990.0, 2110.0, 0.5)
+        for path in WELL_LAS_FILES:
+            pd.DataFrame({'DEPT': depth, 'GR': rng.uniform(20, 150, len(depth))}).to_csv(path, sep=' ', index=False)
+        expected_data_points = np.column_stack([from_las_to_poro_gamma(path, 3) for path in WELL_LAS_FILES])
+        # Action
+        actual_layers = get_porosity_values(3, output_dir='Porosity3', max_workers=2, seed=7)
+        # Assert
+        assert actual_layers.shape == (3, 900, 900)
+        np.testing.assert_almost_equal(krige_layers(900, 900, expected_data_points, seed=7), actual_layers, 10)
+        np.testing.assert_almost_equal(np.load(os.path.join('Porosity3', POROSITY_LAYERS_FILE)), actual_layers, 10)
+
+    def test_get_porosity_values_with_a_random_field(self, tmp_path, monkeypatch):
+        # Arrange
+        monkeypatch.chdir(tmp_path)
+        os.mkdir('LogData')
+        rng = np.random.default_rng(0)
+        depth = np.arange(1990.0, 2110.0, 0.5)
+        for path in WELL_LAS_FILES:
+            pd.DataFrame({'DEPT': depth, 'GR': rng.uniform(20, 150, len(depth))}).to_csv(path, sep=' ', index=False)
+        expected_data_points = np.column_stack([from_las_to_poro_gamma(path, 2) for path in WELL_LAS_FILES])
+        # Action
+        actual_layers = get_porosity_values(2, output_dir='Porosity2', max_workers=2, method='srf', seed=3)
+        # Assert
+        assert actual_layers.shape == (2, 900, 900)
+        np.testing.assert_almost_equal(simulate_layers(900, 900, expected_data_points, seed=3), actual_layers, 10)
+        np.testing.assert_almost_equal(np.load(os.path.join('Porosity2', POROSITY_LAYERS_FILE)), actual_layers, 10)
+
+    def test_read_pickle_file_from_the_layers_file(self, tmp_path):
+        # Arrange
+        test_layers = np.random.default_rng(0).uniform(0.1, 0.3, (2, 30, 30))
+        os.mkdir(tmp_path / 'pickles')
+        os.mkdir(tmp_path / 'layers')
+        for i, layer in enumerate(test_layers):
+            with open(tmp_path / 'pickles' / f'layer_poro_{i}.pkl', 'wb') as file:
+                pickle.dump(layer, file)
+        np.save(tmp_path / 'layers' / POROSITY_LAYERS_FILE, test_layers)
+        expected_poro, expected_perm = read_pickle_file(10, 12, str(tmp_path / 'pickles'))
+        # Action
+        actual_poro, actual_perm = read_pickle_file(10, 12, str(tmp_path / 'layers'))
+        # Assert
+        np.testing.assert_almost_equal(expected_poro, actual_poro, 12)
+        np.testing.assert_almost_equal(expected_perm, actual_perm, 12)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from src.recorder import StateRecorder, layer_cells, cross_section_cells
+
+
+class TestRecorder:
+    def test_layer_cells_select_the_same_cells_as_the_reshaped_grid(self):
+        # Arrange
+        test_field = np.arange(4 * 3 * 5, dtype=float)
+        expected_layer = test_field.reshape(4, 3, 5, order='F')[:, :, 1].flatten(order='F')
+        # Action
+        actual_layer = test_field[layer_cells(4, 3, 1)]
+        # Assert
+        assert np.shares_memory(actual_layer, test_field)
+        np.testing.assert_almost_equal(expected_layer, actual_layer, 8)
+
+    def test_cross_section_cells_select_the_xz_plane(self):
+        # Arrange
+        test_field = np.arange(4 * 3 * 5, dtype=float)
+        expected_section = test_field.reshape(4, 3, 5, order='F')[:, 2, :].flatten(order='F')
+        # Action
+        actual_section = test_field[cross_section_cells(4, 3, 5, 2)]
+        # Assert
+        np.testing.assert_almost_equal(expected_section, actual_section, 8)
+
+    def test_record_into_memory_mapped_arrays(self, tmp_path):
+        # Arrange
+        recorder = StateRecorder(layer_cells(2, 2, 1), 3, fields=('Temperature', 'Pressure'), path=str(tmp_path))
+        # Action
+        recorder.record(0.0, {'Temperature': np.ones(4) * 350, 'Pressure': np.ones(4) * 200})
+        recorder.record(100.0, {'Temperature': np.ones(4) * 349, 'Pressure': np.ones(4) * 201})
+        recorder.flush()
+        # Assert
+        assert recorder.result('Temperature').shape == (2, 4)
+        np.testing.assert_almost_equal(recorder.times[:2], [0.0, 100.0], 8)
+        np.testing.assert_almost_equal(np.load(str(tmp_path / 'Pressure.npy'))[1], np.ones(4) * 201, 8)
+
+    def test_record_throw_exception(self):
+        # Arrange
+        recorder = StateRecorder([0, 3], 1)
+        recorder.record(0.0, {'Temperature': np.ones(2)})
+        # Assert
+        with pytest.raises(ValueError) as context:
+            recorder.record(100.0, {'Temperature': np.ones(2)})
+        assert 'The recorder is full, please check the number of steps...' in str(context.value)
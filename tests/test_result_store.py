@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.result_store import ResultStore, read_time_data, write_time_data
+
+
+def append_runs(path, worker):
+    store = ResultStore(path)
+    for run in range(5):
+        store.append(f'{worker}_{run}', np.full(3, run), worker=worker)
+
+
+class TestResultStore:
+    def test_read_gives_the_wide_table_with_the_index_column(self, tmp_path):
+        # Arrange
+        test_store = ResultStore(str(tmp_path / 'temperature_resolution_dz'))
+        test_time = pd.Series([0.0, 100.0, 200.0], name='time')
+        # Action
+        test_store.append('100.00', [350.0, 349.0, 348.0], index=test_time, nz=1)
+        test_store.append('50.00', [350.0, 349.5, 348.5], index=test_time, nz=2)
+        actual_table = test_store.read()
+        # Assert
+        assert list(actual_table.columns) == ['time', '100.00', '50.00']
+        np.testing.assert_almost_equal(actual_table['time'], [0.0, 100.0, 200.0], 8)
+        np.testing.assert_almost_equal(actual_table['50.00'], [350.0, 349.5, 348.5], 8)
+
+    def test_read_runs_of_different_lengths(self, tmp_path):
+        # Arrange
+        test_store = ResultStore(str(tmp_path))
+        # Action
+        test_store.append('steady', [350.0, 349.0], index=pd.Series([0.0, 100.0], name='time'))
+        test_store.append('full', [350.0, 349.5, 349.0], index=pd.Series([0.0, 100.0, 200.0], name='time'))
+        actual_table = test_store.read()
+        # Assert
+        assert list(actual_table.columns) == ['time', 'steady', 'full']
+        np.testing.assert_almost_equal(actual_table['time'], [0.0, 100.0, 200.0], 8)
+        np.testing.assert_almost_equal(actual_table['full'], [350.0, 349.5, 349.0], 8)
+        np.testing.assert_almost_equal(actual_table['steady'][:2], [350.0, 349.0], 8)
+        assert np.isnan(actual_table['steady'][2])
+
+    def test_append_does_not_rewrite_earlier_partitions(self, tmp_path):
+        # Arrange
+        test_store = ResultStore(str(tmp_path))
+        first_partition = test_store.append(0, np.ones(4), overburden=0)
+        first_modified = os.path.getmtime(first_partition)
+        # Action
+        test_store.append(2, np.zeros(4), overburden=2)
+        # Assert
+        assert os.path.getmtime(first_partition) == first_modified
+        assert [e['params']['overburden'] for e in test_store.entries()] == [0, 2]
+        assert list(test_store.read().columns) == ['0', '2']
+
+    def test_concurrent_appends_keep_the_runs_of_every_worker(self, tmp_path):
+        # Action
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(append_runs, [str(tmp_path)] * 4, range(4)))
+        # Assert
+        entries = ResultStore(str(tmp_path)).entries()
+        assert len(entries) == 20
+        assert len({entry['file'] for entry in entries}) == 20
+        assert len(ResultStore(str(tmp_path)).read().columns) == 20
+
+    def test_read_empty_store(self, tmp_path):
+        # Action
+        actual_table = ResultStore(str(tmp_path)).read()
+        # Assert
+        assert actual_table.empty
+
+    def test_append_the_same_partition_again_replaces_it(self, tmp_path):
+        # Arrange
+        test_store = ResultStore(str(tmp_path))
+        # Action
+        first_partition = test_store.append('job_a', np.ones(3), partition='job_a', nz=1)
+        second_partition = test_store.append('job_a', np.zeros(3), partition='job_a', nz=1)
+        test_store.append('job_b', np.ones(3), partition='job_b', nz=2)
+        # Assert
+        assert first_partition == second_partition
+        assert [e['column'] for e in test_store.entries()] == ['job_a', 'job_b']
+        np.testing.assert_almost_equal(test_store.read()['job_a'], [0.0, 0.0, 0.0], 8)
+
+
+class TestTimeData:
+    @pytest.mark.parametrize('time_data_format', ['parquet', 'feather'])
+    def test_read_the_written_time_data_and_metadata(self, tmp_path, time_data_format):
+        # Arrange
+        td = pd.DataFrame({'time': [100.0, 200.0], 'PRD : temperature (K)': [350.0, 349.5]})
+        # Action
+        path = write_time_data(td, str(tmp_path / 'RealBase' / 'base_resolution_ho'), metadata={'nx': 225},
+                               format=time_data_format)
+        actual_td, actual_metadata = read_time_data(path)
+        # Assert
+        assert path.endswith(f'base_resolution_ho.{time_data_format}')
+        pd.testing.assert_frame_equal(actual_td, td)
+        assert actual_metadata == {'nx': 225}
+
+    def test_write_the_excel_file_on_request(self, tmp_path):
+        # Arrange
+        td = pd.DataFrame({'time': [100.0, 200.0], 'PRD : temperature (K)': [350.0, 349.5]})
+        # Action
+        path = write_time_data(td, str(tmp_path / 'base_resolution_ho'), excel=True)
+        # Assert
+        actual_td = pd.read_excel(str(tmp_path / 'base_resolution_ho.xlsx'), sheet_name='Sheet1', index_col=0)
+        pd.testing.assert_frame_equal(actual_td, td, check_dtype=False)
+        assert path.endswith('.parquet')
+
+    def test_write_time_data_throw_exception(self, tmp_path):
+        # Assert
+        with pytest.raises(ValueError) as context:
+            write_time_data(pd.DataFrame({'time': [1.0]}), str(tmp_path / 'td'), format='xlsx')
+        assert 'Unknown time data format xlsx...' in str(context.value)
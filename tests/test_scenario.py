@@ -0,0 +1,69 @@
+import pytest
+
+from src.scenario import expand_jobs, load_scenarios
+
+SCENARIOS = '''
+[defaults]
+total_time = 1000
+
+[[scenario]]
+name = "resolution"
+nx = 225
+ny = 75
+nz = [1, 3]
+reservoir_type = ["ho", "layered"]
+
+[[scenario]]
+name = "layers"
+nx = 10
+ny = 10
+nz = 2
+overburden = [0, 2, 4]
+total_time = 500
+'''
+
+
+class TestScenario:
+    def test_expand_lists_into_one_job_per_combination(self, tmp_path):
+        # Arrange
+        path = tmp_path / 'scenarios.toml'
+        path.write_text(SCENARIOS)
+        # Action
+        jobs = expand_jobs(load_scenarios(str(path)))
+        # Assert
+        assert [job['name'] for job in jobs] == ['resolution_reservoir_type-ho_nz-1', 'resolution_reservoir_type-ho_nz-3',
+                                                 'resolution_reservoir_type-layered_nz-1',
+                                                 'resolution_reservoir_type-layered_nz-3',
+                                                 'layers_overburden-0', 'layers_overburden-2', 'layers_overburden-4']
+        assert [job['total_time'] for job in jobs] == [1000] * 4 + [500] * 3
+        assert jobs[0]['report_time'] == 100
+        assert jobs[-1]['scenario'] == 'layers'
+
+    def test_expand_only_the_given_scenarios(self, tmp_path):
+        # Arrange
+        path = tmp_path / 'scenarios.toml'
+        path.write_text(SCENARIOS)
+        # Action
+        jobs = expand_jobs(load_scenarios(str(path)), only=['layers'])
+        # Assert
+        assert [job['overburden'] for job in jobs] == [0, 2, 4]
+
+    @pytest.mark.parametrize('scenario, message', [
+        ('nx = 1\nny = 1', 'The grid parameter nz is missing in scenario test...'),
+        ('nx = 1\nny = 1\nnz = 1\nnx_typo = 2', 'Unknown parameter nx_typo in scenario test...'),
+        ('nx = 1\nny = 1\nnz = 1\nreservoir_type = "fractured"', 'Unknown reservoir type fractured in scenario test...'),
+        ('nx = 1\nny = 1\nnz = 1\ndx = [1, 2]', 'The parameter dx of scenario test cannot be a list...')])
+    def test_load_scenarios_throw_exception(self, tmp_path, scenario, message):
+        # Arrange
+        path = tmp_path / 'scenarios.toml'
+        path.write_text(f'[[scenario]]\nname = "test"\n{scenario}\n')
+        # Assert
+        with pytest.raises(ValueError) as context:
+            load_scenarios(str(path))
+        assert message in str(context.value)
+
+    def test_the_example_scenarios_expand(self):
+        # Action
+        jobs = expand_jobs(load_scenarios('scenarios/serial_studies.toml'))
+        # Assert
+        assert len(jobs) == 8 + 6 + 3
@@ -0,0 +1,89 @@
+import numpy as np
+
+from src.search import bracket_and_bisect, refine_resolution
+
+
+def discretization_result(shape):
+    """A curve whose error decreases with the number of cells of each direction, most slowly in y"""
+    nx, ny, nz = shape
+    return 350 + np.ones(5) * (10 / nx + 40 / ny + 5 / nz)
+
+
+class TestSearch:
+    def test_bracket_and_bisect_finds_the_same_minimum_as_the_linear_search(self):
+        # Arrange
+        test_spread = {n: 1.0 / (n + 1) for n in range(0, 100, 2)}
+        expected_minimum = 20
+        # Action
+        actual_minimum, actual_evaluated = bracket_and_bisect(lambda n: test_spread[n], threshold=0.05)
+        # Assert
+        assert actual_minimum == expected_minimum
+        assert len(actual_evaluated) < expected_minimum // 2 + 1
+        assert all(actual_evaluated[n] == test_spread[n] for n in actual_evaluated)
+
+    def test_bracket_and_bisect_accepts_the_start(self):
+        # Action
+        actual_minimum, actual_evaluated = bracket_and_bisect(lambda n: 0.0, threshold=0.05, start=4)
+        # Assert
+        assert actual_minimum == 4
+        assert list(actual_evaluated) == [4]
+
+    def test_bracket_and_bisect_with_every_value(self):
+        # Arrange
+        expected_minima = range(0, 70, 2)
+        # Action
+        actual_minima = [bracket_and_bisect(lambda n: float(n < m), threshold=0.5)[0] for m in expected_minima]
+        # Assert
+        assert list(actual_minima) == list(expected_minima)
+
+    def test_refine_resolution_refines_each_direction_until_it_is_converged(self):
+        # Arrange
+        evaluated_shapes = []
+
+        def evaluate(shapes):
+            evaluated_shapes.extend(shapes)
+            return [discretization_result(shape) for shape in shapes]
+        # Action
+        actual_shape, actual_evaluated, history, converged = refine_resolution(evaluate, (8, 8, 2), tolerance=0.1)
+        # Assert
+        assert actual_shape == (64, 256, 32)
+        assert converged
+        assert all(max(changes.values()) > 0.1 for _, changes in history[:-1])
+        assert max(history[-1][1].values()) <= 0.1
+        # every shape is evaluated once, far fewer than the 4 x 6 x 5 grids of the tensor sweep
+        assert len(evaluated_shapes) == len(set(evaluated_shapes)) == len(actual_evaluated)
+        assert len(evaluated_shapes) < 4 * 6 * 5 // 2
+
+    def test_refine_resolution_reuses_earlier_results(self):
+        # Arrange
+        _, evaluated, _, _ = refine_resolution(lambda shapes: [discretization_result(s) for s in shapes], (8, 8, 2),
+                                               tolerance=0.1)
+        evaluated_shapes = []
+
+        def evaluate(shapes):
+            evaluated_shapes.extend(shapes)
+            return [discretization_result(shape) for shape in shapes]
+        # Action
+        actual_shape, _, _, _ = refine_resolution(evaluate, (8, 8, 2), tolerance=0.1, evaluated=evaluated)
+        # Assert
+        assert actual_shape == (64, 256, 32)
+        assert evaluated_shapes == []
+
+    def test_refine_resolution_stops_at_the_largest_shape(self):
+        # Action
+        actual_shape, _, _, converged = refine_resolution(lambda shapes: [discretization_result(s) for s in shapes],
+                                                          (8, 8, 2), tolerance=0.1, max_shape=(100, 64, 100))
+        # Assert
+        assert actual_shape == (64, 64, 32)
+        # y was still changing the result by more than the tolerance when it reached the largest shape
+        assert not converged
+
+    def test_refine_resolution_at_the_largest_shape_is_not_converged(self):
+        # Action
+        actual_shape, _, history, converged = refine_resolution(
+            lambda shapes: [discretization_result(s) for s in shapes], (8, 8, 2), tolerance=0.1,
+            max_shape=(8, 8, 2))
+        # Assert
+        assert actual_shape == (8, 8, 2)
+        assert history == []
+        assert not converged
@@ -0,0 +1,34 @@
+import os
+
+from src.sweep import run_sweep
+
+
+def fake_simulation(nx, ny, nz):
+    return {'time': [0.0, 100.0], 'PRD : temperature (K)': [350.0, 350.0 - nx * ny * nz],
+            'threads': os.environ.get('OMP_NUM_THREADS')}
+
+
+class TestSweep:
+    def test_run_sweep_keeps_the_order_of_the_cases(self):
+        # Arrange
+        test_cases = [(1, 1, 3), (1, 2, 1), (2, 2, 2)]
+        finished = []
+        # Action
+        actual_results = run_sweep(fake_simulation, test_cases, max_workers=2, threads_per_worker=3,
+                                   on_result=lambda case, result: finished.append(case))
+        # Assert
+        assert [r['PRD : temperature (K)'][1] for r in actual_results] == [347.0, 348.0, 342.0]
+        assert all(r['threads'] == '3' for r in actual_results)
+        assert sorted(finished) == sorted(test_cases)
+
+    def test_run_sweep_without_keeping_the_results(self):
+        # Arrange
+        test_cases = [(1, 1, 3), (1, 2, 1)]
+        finished = {}
+        # Action
+        actual_results = run_sweep(fake_simulation, test_cases, max_workers=2, keep_results=False,
+                                   on_result=lambda case, result: finished.update({case: result}))
+        # Assert
+        assert actual_results == [None, None]
+        assert finished[(1, 2, 1)]['PRD : temperature (K)'][1] == 348.0
+
@@ -0,0 +1,59 @@
+import json
+
+from src.telemetry import RunTelemetry, flatten_timer_tree, timer_tree
+
+
+class FakeTimer:
+    """Stands in for a darts timer node"""
+
+    def __init__(self, seconds, **children):
+        self.seconds = seconds
+        self.node = children
+
+    def get_timer(self):
+        return self.seconds
+
+
+class TestTelemetry:
+    def test_timer_tree_by_path(self):
+        # Arrange
+        timer = FakeTimer(3.0, initialization=FakeTimer(1.0),
+                          simulation=FakeTimer(2.0, jacobian=FakeTimer(1.5), linear=FakeTimer(0.4)))
+        # Action
+        times = flatten_timer_tree(timer_tree(timer))
+        # Assert
+        assert times == {'initialization': 1.0, 'simulation': 2.0, 'simulation/jacobian': 1.5,
+                         'simulation/linear': 0.4}
+
+    def test_report_steps_record_the_iterations_of_each_step(self, tmp_path):
+        # Arrange
+        path = str(tmp_path / 'telemetry.jsonl')
+        telemetry = RunTelemetry(path, run_id='run-1', labels={'nz': 10})
+        # Action
+        telemetry.start_counters({'newton': 4, 'linear': 20})
+        telemetry.step_counters(100.0, {'newton': 10, 'linear': 50})
+        telemetry.step_counters(200.0, {'newton': 13, 'linear': 62})
+        telemetry.finish_counters(200.0, {'newton': 13, 'linear': 62}, timer_tree(FakeTimer(1.0)))
+        # Assert
+        with open(path) as f:
+            events = [json.loads(line) for line in f]
+        assert [event['event'] for event in events] == ['report_step', 'report_step', 'run']
+        assert [event['newton'] for event in events] == [6, 3, 9]
+        assert [event['linear'] for event in events] == [30, 12, 42]
+        assert all(event['run'] == 'run-1' and event['nz'] == 10 for event in events)
+        assert events[2]['steps'] == 2
+        assert events[2]['timers'] == {'seconds': 1.0, 'children': {}}
+
+    def test_write_prometheus_textfile(self, tmp_path):
+        # Arrange
+        prometheus_path = str(tmp_path / 'run.prom')
+        telemetry = RunTelemetry(str(tmp_path / 'telemetry.jsonl'), run_id='run-1', prometheus_path=prometheus_path)
+        timers = timer_tree(FakeTimer(2.0, simulation=FakeTimer(2.0)))
+        # Action
+        telemetry.start_counters({'newton': 0})
+        telemetry.finish_counters(100.0, {'newton': 7}, timers)
+        # Assert
+        with open(prometheus_path) as f:
+            lines = f.read().splitlines()
+        assert 'dugs_run_newton{run="run-1"} 7' in lines
+        assert 'dugs_timer_seconds{run="run-1",timer="simulation"} 2.0' in lines
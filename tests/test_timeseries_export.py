@@ -0,0 +1,51 @@
+import h5py
+import numpy as np
+import pytest
+
+from src.timeseries_export import TimeSeriesExporter
+
+
+class TestTimeSeriesExporter:
+    def test_write_every_nth_step_of_the_selected_fields(self, tmp_path):
+        # Arrange
+        test_path = str(tmp_path / 'base' / 'run')
+        test_temperature = np.arange(24.0)
+        # Action
+        with TimeSeriesExporter(test_path, (2, 3, 4), (10.0, 75.0, 20.0), fields=['Temperature'], every=2) as exporter:
+            for step in range(5):
+                # the simulation changes its state in place after every step
+                test_temperature += 1
+                exporter.write(100.0 * step, {'Temperature': test_temperature, 'Pressure': np.zeros(24)})
+        # Assert
+        assert exporter.times == [0.0, 200.0, 400.0]
+        with h5py.File(f'{test_path}.h5', 'r') as f:
+            assert list(f.keys()) == ['Temperature']
+            assert f['Temperature'].shape == (3, 2, 3, 4)
+            np.testing.assert_almost_equal(f['Temperature'][1].ravel(), np.arange(24.0) + 3, 8)
+        with open(f'{test_path}.xdmf') as f:
+            xdmf = f.read()
+        assert xdmf.count('<Time Value=') == 3
+        assert 'run.h5:/Temperature' in xdmf
+
+    def test_cell_data_is_only_computed_for_written_steps(self, tmp_path):
+        # Arrange
+        computed = []
+
+        def cell_data():
+            computed.append(1)
+            return {'Pressure': np.zeros(6)}
+        # Action
+        with TimeSeriesExporter(str(tmp_path / 'run'), (1, 2, 3), (1.0, 1.0, 1.0), every=3) as exporter:
+            for step in range(7):
+                exporter.write(step, cell_data)
+        # Assert
+        assert len(computed) == 3
+
+    def test_write_throw_exception(self, tmp_path):
+        # Arrange
+        exporter = TimeSeriesExporter(str(tmp_path / 'run'), (1, 2, 3), (1.0, 1.0, 1.0))
+        # Assert
+        with pytest.raises(ValueError) as context:
+            exporter.write(0.0, {'Pressure': np.zeros(5)})
+        assert 'The field Pressure does not have one value per cell...' in str(context.value)
+        exporter.close()